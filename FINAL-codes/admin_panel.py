@@ -1,17 +1,25 @@
 import sqlite3
+from collections import OrderedDict
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QTableView, QMessageBox, QInputDialog, QHeaderView
 )
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import Qt, pyqtSignal, QModelIndex
 from PyQt5.QtSql import (
     QSqlDatabase, QSqlRelationalTableModel, QSqlRelation, QSqlTableModel
 )
 
-def connect_to_database():
-    db = QSqlDatabase.addDatabase("QSQLITE")
-    db.setDatabaseName("transport_app.db")
+def connect_to_database(database_name="transport_app.db"):
+    """Opens (once) the default QtSql connection the admin table models run on"""
+    db = QSqlDatabase.database("qt_sql_default_connection", False)
+    if db.isValid():
+        if db.isOpen() and db.databaseName() == database_name:
+            return True
+        db.close()
+    else:
+        db = QSqlDatabase.addDatabase("QSQLITE")
+    db.setDatabaseName(database_name)
     if not db.open():
         QMessageBox.critical(
             None,
@@ -21,19 +29,76 @@ def connect_to_database():
         return False
     return True
 
-if not connect_to_database():
-    raise SystemExit("Database connection failed.")
+DEFAULT_FETCH_WINDOW = 500
+DEFAULT_MAX_LIVE_MODELS = 4
+
+class IncrementalFetchMixin:
+    """Fetches rows in fetch_window-sized steps as the view scrolls instead of all at once"""
+
+    def __init__(self, fetch_window=DEFAULT_FETCH_WINDOW, parent=None):
+        super().__init__(parent)
+        self.fetch_window = fetch_window
+
+    def fetchMore(self, parent=QModelIndex()):
+        target = self.rowCount() + self.fetch_window
+        while super().canFetchMore(parent) and self.rowCount() < target:
+            super().fetchMore(parent)
+
+class IncrementalTableModel(IncrementalFetchMixin, QSqlTableModel):
+    pass
+
+class IncrementalRelationalTableModel(IncrementalFetchMixin, QSqlRelationalTableModel):
+    pass
+
+ADMIN_TABLE_CONFIGS = {
+    'users': {'model_type': IncrementalRelationalTableModel, 'relations': {}},
+    'admins': {'model_type': IncrementalRelationalTableModel, 'relations': {
+        1: ('users', 'user_id', 'username')
+    }},
+    'drivers': {'model_type': IncrementalRelationalTableModel, 'relations': {
+        1: ('users', 'user_id', 'username')
+    }},
+    'commuters': {'model_type': IncrementalTableModel, 'relations': {}},
+    'conductors': {'model_type': IncrementalRelationalTableModel, 'relations': {
+        1: ('users', 'user_id', 'username')
+    }},
+    'vehicles': {'model_type': IncrementalRelationalTableModel, 'relations': {}},
+    'routes': {'model_type': IncrementalRelationalTableModel, 'relations': {}},
+    'fares': {'model_type': IncrementalRelationalTableModel, 'relations': {
+        1: ('route_view', 'route_id', 'origin_to_destination')
+    }},
+    'transactions': {'model_type': IncrementalRelationalTableModel, 'relations': {
+        1: ('commuters', 'commuter_id', 'commuter_id'),
+        2: ('route_view', 'route_id', 'origin_to_destination'),
+        3: ('vehicles', 'vehicle_id', 'plate_no'),
+        4: ('conductors', 'conductor_id', 'conductor_id'),
+        5: ('fares', 'fare_id', 'price_fare')
+    }},
+    'feedbacks': {'model_type': IncrementalRelationalTableModel, 'relations': {
+        1: ('commuters', 'commuter_id', 'commuter_id'),
+        2: ('drivers', 'driver_id', 'driver_id'),
+        3: ('conductors', 'conductor_id', 'conductor_id')
+    }},
+    'vehicle_assignment': {'model_type': IncrementalRelationalTableModel, 'relations': {
+        1: ('vehicles', 'vehicle_id', 'plate_no'),
+        2: ('drivers', 'driver_id', 'driver_id'),
+        3: ('conductors', 'conductor_id', 'conductor_id')
+    }}
+}
 
 class AdminPanel(QWidget):
     logout_requested = pyqtSignal()
 
-    def __init__(self, db_manager, user_data):
+    def __init__(self, db_manager, user_data, fetch_window=DEFAULT_FETCH_WINDOW, max_live_models=DEFAULT_MAX_LIVE_MODELS):
         super().__init__()
         self.db_manager = db_manager
         self.user_data = user_data
         self.current_table = None
-        self.models = {}
+        self.fetch_window = fetch_window
+        self.max_live_models = max_live_models
+        self.models = OrderedDict()
         self.views = {}
+        self.sql_connected = False
         self.setWindowTitle("Admin Panel")
         self.init_ui()
         self.init_db_model()
@@ -83,63 +148,63 @@ class AdminPanel(QWidget):
         self.save_button = QPushButton("Save Changes")
         self.save_button.setStyleSheet(self.logout_button.styleSheet())
         self.save_button.clicked.connect(self.save_changes)
+        self.reprice_button = QPushButton("Reprice Fares")
+        self.reprice_button.setStyleSheet(self.logout_button.styleSheet())
+        self.reprice_button.clicked.connect(self.reprice_fares)
         control_layout.addWidget(self.add_button)
         control_layout.addWidget(self.delete_button)
         control_layout.addWidget(self.save_button)
+        control_layout.addWidget(self.reprice_button)
         main_layout.addLayout(control_layout)
         self.setLayout(main_layout)
 
     def init_db_model(self):
-        table_configs = {
-            'users': {'model_type': QSqlRelationalTableModel, 'relations': {}},
-            'admins': {'model_type': QSqlRelationalTableModel, 'relations': {
-                1: ('users', 'user_id', 'username')
-            }},
-            'drivers': {'model_type': QSqlRelationalTableModel, 'relations': {
-                1: ('users', 'user_id', 'username')
-            }},
-            'commuters': {'model_type': QSqlTableModel, 'relations': {}},
-            'conductors': {'model_type': QSqlRelationalTableModel, 'relations': {
-                1: ('users', 'user_id', 'username')
-            }},
-            'vehicles': {'model_type': QSqlRelationalTableModel, 'relations': {}},
-            'routes': {'model_type': QSqlRelationalTableModel, 'relations': {}},
-            'fares': {'model_type': QSqlRelationalTableModel, 'relations': {
-                1: ('route_view', 'route_id', 'origin_to_destination')
-            }},
-            'transactions': {'model_type': QSqlRelationalTableModel, 'relations': {
-                1: ('commuters', 'commuter_id', 'commuter_id'),
-                2: ('route_view', 'route_id', 'origin_to_destination'),
-                3: ('vehicles', 'vehicle_id', 'plate_no'),
-                4: ('conductors', 'conductor_id', 'conductor_id'),
-                5: ('fares', 'fare_id', 'price_fare')
-            }},
-            'feedbacks': {'model_type': QSqlRelationalTableModel, 'relations': {
-                1: ('commuters', 'commuter_id', 'commuter_id'),
-                2: ('drivers', 'driver_id', 'driver_id'),
-                3: ('conductors', 'conductor_id', 'conductor_id')
-            }},
-            'vehicle_assignment': {'model_type': QSqlRelationalTableModel, 'relations': {
-                1: ('vehicles', 'vehicle_id', 'plate_no'),
-                2: ('drivers', 'driver_id', 'driver_id'),
-                3: ('conductors', 'conductor_id', 'conductor_id')
-            }}
-        }
-        for table_name, config in table_configs.items():
-            model = config['model_type']()
-            model.setTable(table_name)
-            model.setEditStrategy(QSqlRelationalTableModel.OnManualSubmit)
-            if 'relations' in config:
-                for column, relation in config['relations'].items():
-                    model.setRelation(column, QSqlRelation(*relation))
-            model.select()
-            self.models[table_name] = model
+        """Models are built on first use; see get_model"""
+        self.models = OrderedDict()
+
+    def ensure_sql_connection(self):
+        if not self.sql_connected:
+            self.sql_connected = connect_to_database(self.db_manager.database_name)
+        return self.sql_connected
+
+    def showEvent(self, event):
+        # The QtSql connection is opened the first time the panel is shown, not at import
+        self.ensure_sql_connection()
+        super().showEvent(event)
+
+    def get_model(self, table_name):
+        model = self.models.get(table_name)
+        if model is not None:
+            self.models.move_to_end(table_name)
+            return model
+        config = ADMIN_TABLE_CONFIGS[table_name]
+        model = config['model_type'](fetch_window=self.fetch_window, parent=self)
+        model.setTable(table_name)
+        model.setEditStrategy(QSqlRelationalTableModel.OnManualSubmit)
+        if 'relations' in config:
+            for column, relation in config['relations'].items():
+                model.setRelation(column, QSqlRelation(*relation))
+        self.models[table_name] = model
+        self.evict_models()
+        return model
+
+    def evict_models(self):
+        """Drops least recently used models beyond max_live_models, keeping unsaved edits"""
+        for table_name in list(self.models):
+            if len(self.models) <= self.max_live_models:
+                break
+            model = self.models[table_name]
+            if table_name == self.current_table or model.isDirty():
+                continue
+            del self.models[table_name]
+            model.deleteLater()
 
     def show_table(self, table_name):
+        if not self.ensure_sql_connection():
+            return
         self.current_table = table_name
-        model = self.models[table_name]
+        model = self.get_model(table_name)
         model.select()
-        print(f"Row count for {table_name}: {model.rowCount()}")
         for i in range(model.columnCount()):
             model.setHeaderData(i, Qt.Horizontal, model.headerData(i, Qt.Horizontal))
         self.table_view.setModel(model)
@@ -188,7 +253,7 @@ class AdminPanel(QWidget):
                 if not all([vehicle_id, driver_id, conductor_id]):
                     QMessageBox.warning(self, "Error", "Invalid license/plate number(s)")
                     return
-                model = self.models[self.current_table]
+                model = self.get_model(self.current_table)
                 record = model.record()
                 record.setValue("vehicle_id", str(vehicle_id))
                 record.setValue("driver_id", str(driver_id))
@@ -204,7 +269,7 @@ class AdminPanel(QWidget):
                         QMessageBox.critical(self, "Error", f"Failed to save: {error}")
                 else:
                     QMessageBox.critical(self, "Error", "Failed to insert record into model")
-            model = self.models[self.current_table]
+            model = self.get_model(self.current_table)
             row_count = model.rowCount()
             model.insertRow(row_count)
             index = model.index(row_count, 0)
@@ -292,17 +357,24 @@ class AdminPanel(QWidget):
         if not self.current_table:
             return
         try:
-            model = self.models[self.current_table]
+            model = self.get_model(self.current_table)
             current_row = self.table_view.currentIndex().row()
             if current_row >= 0:
                 model.removeRow(current_row)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to delete row: {str(e)}")
 
+    def reprice_fares(self):
+        # Imported here so numpy only loads when an admin actually reprices
+        from fare_reprice_dialog import FareRepriceDialog
+        FareRepriceDialog(self.db_manager, self).exec_()
+        if "fares" in self.models:
+            self.models["fares"].select()
+
     def save_changes(self):
         if not self.current_table:
             return
-        model = self.models[self.current_table]
+        model = self.get_model(self.current_table)
         if model.submitAll():
             model.select()
             QMessageBox.information(self, "Success", "Changes saved successfully")
@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from database_manager import DatabaseManager
+from generate_data import generate
+from session import Session
+
+HISTORY_FILE = 'benchmark_history.json'
+BENCH_DIR = 'bench_data'
+SIZES = {
+    'small': 10000,
+    'medium': 1000000,
+    'large': 10000000,
+}
+DEFAULT_THRESHOLD = 0.20
+BURST_THREADS = 8
+BURST_TICKETS = 50
+
+def bench_database(size_name, transactions, bench_dir=BENCH_DIR, seed=42, workers=1):
+    """Builds (once) and returns a generated database with the given transaction count"""
+    os.makedirs(bench_dir, exist_ok=True)
+    path = os.path.join(bench_dir, f"bench_{size_name}_{transactions}_{seed}.db")
+    if not os.path.exists(path):
+        generate(
+            database_name=path, seed=seed,
+            commuters=max(1000, transactions // 100),
+            drivers=max(50, transactions // 20000),
+            conductors=max(50, transactions // 20000),
+            vehicles=max(50, transactions // 20000),
+            assignments=max(200, transactions // 5000),
+            transactions=transactions,
+            feedbacks=max(1000, transactions // 10),
+            end_date=None, workers=workers,
+        )
+    return path
+
+def sample_keys(db):
+    """Real keys from the database so every lookup benchmark hits existing rows"""
+    def first(query, params=()):
+        rows = db.execute_query(query, params)
+        return rows[0] if rows else None
+    conductor = first('''SELECT k.conductor_id, k.user_id, k.license_no, u.username, u.password
+        FROM conductors k JOIN users u ON k.user_id = u.user_id
+        JOIN transactions t ON t.conductor_id = k.conductor_id LIMIT 1''')
+    commuter = first('''SELECT c.commuter_id, c.user_id, u.username, u.password
+        FROM commuters c JOIN users u ON c.user_id = u.user_id
+        JOIN feedbacks f ON f.commuter_id = c.commuter_id LIMIT 1''')
+    driver = first('''SELECT d.driver_id, d.user_id, d.license_no, u.username
+        FROM drivers d JOIN users u ON d.user_id = u.user_id
+        JOIN feedbacks f ON f.driver_id = d.driver_id LIMIT 1''')
+    vehicle = first("SELECT vehicle_id, plate_no FROM vehicles LIMIT 1")
+    route = first('''SELECT r.route_id, r.origin, r.destination, f.fare_id
+        FROM routes r JOIN fares f ON f.route_id = r.route_id WHERE r.distance > 0 LIMIT 1''')
+    return {
+        'conductor': dict(conductor), 'commuter': dict(commuter), 'driver': dict(driver),
+        'vehicle': dict(vehicle), 'route': dict(route),
+    }
+
+def build_cases(db, keys):
+    """(name, callable, heavy) for every public DatabaseManager access path"""
+    k, c, d = keys['conductor'], keys['commuter'], keys['driver']
+    v, r = keys['vehicle'], keys['route']
+    matrix = db.get_fare_matrix()
+    graph = db.get_route_graph()
+    rollup = db.get_revenue_rollup()
+    def ticket():
+        return db.insert_conductor_transaction(
+            c['commuter_id'], r['route_id'], v['vehicle_id'], k['conductor_id'], r['fare_id'], 15.0
+        )
+    def burst():
+        # Conductors ticketing at once: the write queue folds these into group commits
+        threads = [
+            threading.Thread(target=lambda: [ticket() for _ in range(BURST_TICKETS)])
+            for _ in range(BURST_THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    def drain(iterator):
+        for _ in iterator:
+            pass
+    return [
+        ('authenticate_user', lambda: db.authenticate_user(k['username'], k['password']), False),
+        ('session_login', lambda: Session.login(db, k['username'], k['password']), False),
+        ('get_users', db.get_users, True),
+        ('get_user_by_username', lambda: db.get_user_by_username(k['username']), False),
+        ('get_user_by_id', lambda: db.get_user_by_id(k['user_id']), False),
+        ('get_user_id_by_username', lambda: db.get_user_id_by_username(k['username']), False),
+        ('get_admins', db.get_admins, False),
+        ('get_drivers', db.get_drivers, False),
+        ('get_conductors', db.get_conductors, False),
+        ('get_commuters', db.get_commuters, True),
+        ('get_vehicles', db.get_vehicles, False),
+        ('get_routes', db.get_routes, False),
+        ('get_fares', db.get_fares, False),
+        ('get_fares_with_routes', db.get_fares_with_routes, False),
+        ('get_transactions', db.get_transactions, True),
+        ('iter_transactions', lambda: drain(db.iter_transactions()), True),
+        ('get_transactions_page', lambda: db.get_transactions_page(), False),
+        ('get_feedbacks', db.get_feedbacks, True),
+        ('get_feedbacks_page', lambda: db.get_feedbacks_page(), False),
+        ('get_commuter_data', lambda: db.get_commuter_data(c['user_id']), False),
+        ('get_driver_data', lambda: db.get_driver_data(d['user_id']), False),
+        ('get_conductor_data', lambda: db.get_conductor_data(k['user_id']), False),
+        ('get_commuter_transactions', lambda: db.get_commuter_transactions(c['commuter_id']), False),
+        ('get_driver_feedbacks', lambda: db.get_driver_feedbacks(d['driver_id']), False),
+        ('get_conductor_feedbacks', lambda: db.get_conductor_feedbacks(k['conductor_id']), False),
+        ('get_conductor_transactions', lambda: db.get_conductor_transactions(k['conductor_id']), False),
+        ('get_conductor_transactions_page', lambda: db.get_conductor_transactions_page(k['conductor_id']), False),
+        ('get_commuter_feedbacks', lambda: db.get_commuter_feedbacks(c['commuter_id']), False),
+        ('get_commuter_feedbacks_page', lambda: db.get_commuter_feedbacks_page(c['commuter_id']), False),
+        ('get_vehicle_id_by_plate', lambda: db.get_vehicle_id_by_plate(v['plate_no'].lower()), False),
+        ('get_driver_id_by_license', lambda: db.get_driver_id_by_license(str(d['license_no'])), False),
+        ('get_conductor_id_by_license', lambda: db.get_conductor_id_by_license(str(k['license_no'])), False),
+        ('get_all_commuter_ids', db.get_all_commuter_ids, True),
+        ('get_all_driver_ids', db.get_all_driver_ids, False),
+        ('get_all_conductor_ids', db.get_all_conductor_ids, False),
+        ('get_all_vehicle_ids', db.get_all_vehicle_ids, False),
+        ('get_all_route_ids', db.get_all_route_ids, False),
+        ('get_all_fare_ids', db.get_all_fare_ids, False),
+        ('get_all_user_ids', db.get_all_user_ids, True),
+        ('get_commuter_id_by_user_id', lambda: db.get_commuter_id_by_user_id(c['user_id']), False),
+        ('get_driver_id_by_user_id', lambda: db.get_driver_id_by_user_id(d['user_id']), False),
+        ('get_conductor_id_by_user_id', lambda: db.get_conductor_id_by_user_id(k['user_id']), False),
+        ('get_commuter_by_username', lambda: db.get_commuter_by_username(c['username']), False),
+        ('get_driver_by_username', lambda: db.get_driver_by_username(d['username']), False),
+        # FareCalculatorApp.calculate_fare resolves the quote through the shared fare matrix
+        ('fare_lookup', lambda: matrix.lookup(r['origin'], r['destination']), False),
+        ('route_itinerary', lambda: graph.itinerary(r['origin'], r['destination']), False),
+        ('get_driver_rating_stats', lambda: db.get_driver_rating_stats(d['driver_id']), False),
+        ('get_conductor_rating_stats', lambda: db.get_conductor_rating_stats(k['conductor_id']), False),
+        # Warmup folds the whole table in; timed runs measure catch-up plus the bucket query
+        ('revenue_by_day', rollup.revenue_by_day, False),
+        ('revenue_by_route', rollup.revenue_by_route, False),
+        ('conductor_ticket_insert', ticket, False),
+        ('ticket_insert_burst', burst, True),
+    ]
+
+def time_case(func, repeat, warmup=1):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    samples.sort()
+    return {
+        'runs': repeat,
+        'min_ms': round(samples[0], 4),
+        'median_ms': round(statistics.median(samples), 4),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        'max_ms': round(samples[-1], 4),
+    }
+
+def run_size(size_name, transactions, repeat, heavy_repeat, only=None, bench_dir=BENCH_DIR, workers=1,
+             query_cache=False):
+    path = bench_database(size_name, transactions, bench_dir=bench_dir, workers=workers)
+    db = DatabaseManager()
+    if not db.use_database(path):
+        raise SystemExit(f"Could not open {path}")
+    # With the cache on, warmup fills it and every timed run of a cached getter is a dictionary hit
+    db.query_cache.enabled = query_cache
+    keys = sample_keys(db)
+    max_rowid = db.execute_query("SELECT COALESCE(MAX(rowid), 0) FROM transactions")[0][0]
+    results = {}
+    try:
+        for name, func, heavy in build_cases(db, keys):
+            if only and name not in only:
+                continue
+            results[name] = time_case(func, heavy_repeat if heavy else repeat)
+            print(f"  {size_name:>6} {name:<34} median {results[name]['median_ms']:>10.3f} ms")
+    finally:
+        # Tickets inserted by the benchmark must not leak into the next run's dataset
+        db.execute_insert_update_delete("DELETE FROM transactions WHERE rowid > ?", (max_rowid,))
+        db.query_cache.enabled = True
+        db.close()
+    return results
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_history(path, history):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+
+def current_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def find_regressions(history, run, threshold):
+    """Compares each median against the most recent earlier run of the same size and cache mode"""
+    regressions = []
+    for size_name, results in run['sizes'].items():
+        baseline = None
+        for previous in reversed(history):
+            # Runs recorded before the mode was stored had the query cache on
+            if previous.get('query_cache', 'warm') != run['query_cache']:
+                continue
+            if size_name in previous.get('sizes', {}):
+                baseline = previous['sizes'][size_name]['results']
+                break
+        if baseline is None:
+            continue
+        for name, stats in results['results'].items():
+            before = baseline.get(name)
+            if not before or before['median_ms'] <= 0:
+                continue
+            change = stats['median_ms'] / before['median_ms'] - 1.0
+            if change > threshold:
+                regressions.append((size_name, name, before['median_ms'], stats['median_ms'], change))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every DatabaseManager access path.")
+    parser.add_argument('--sizes', nargs='+', default=['small'],
+                        help=f"named sizes ({', '.join(SIZES)}) or raw transaction counts")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--heavy-repeat', type=int, default=3, help="runs for full-table reads")
+    parser.add_argument('--only', nargs='+', help="benchmark names to run")
+    parser.add_argument('--history', default=HISTORY_FILE)
+    parser.add_argument('--bench-dir', default=BENCH_DIR)
+    parser.add_argument('--workers', type=int, default=1, help="generator processes for new databases")
+    parser.add_argument('--label', default=None, help="free-form note stored with the run, e.g. the schema change")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="fractional median slowdown that counts as a regression")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--warm-cache', action='store_true',
+                        help="leave the query cache on, timing cache hits instead of the SQL paths")
+    args = parser.parse_args(argv)
+
+    run = {
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'revision': current_revision(),
+        'label': args.label,
+        'python': sys.version.split()[0],
+        'query_cache': 'warm' if args.warm_cache else 'cold',
+        'sizes': {},
+    }
+    for size in args.sizes:
+        transactions = SIZES[size] if size in SIZES else int(size)
+        size_name = size if size in SIZES else f"{transactions}"
+        print(f"Benchmarking {size_name} ({transactions} transactions)")
+        run['sizes'][size_name] = {
+            'transactions': transactions,
+            'results': run_size(size_name, transactions, args.repeat, args.heavy_repeat,
+                                only=args.only, bench_dir=args.bench_dir, workers=args.workers,
+                                query_cache=args.warm_cache),
+        }
+
+    history = load_history(args.history)
+    regressions = find_regressions(history, run, args.threshold)
+    history.append(run)
+    save_history(args.history, history)
+    for size_name, name, before, after, change in regressions:
+        print(f"REGRESSION {size_name} {name}: {before:.3f} ms -> {after:.3f} ms (+{change:.0%})")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
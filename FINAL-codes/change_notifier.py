@@ -0,0 +1,190 @@
+import sqlite3
+import threading
+import traceback
+from collections import namedtuple
+from migrations import CHANGE_LOG_TABLES
+
+ChangeEvent = namedtuple('ChangeEvent', ['seq', 'table', 'op', 'row_id', 'changed_at'])
+# Published per table when the log was pruned past a notifier's cursor: changes were missed,
+# so subscribers should reload everything they show from that table
+RESET = 'RESET'
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_RETAIN = 50000
+DEFAULT_PRUNE_EVERY = 10000
+
+CHANGE_LOG_QUERY = '''
+SELECT seq, table_name, op, row_id, changed_at
+FROM change_log
+WHERE seq > ?
+ORDER BY seq
+LIMIT ?
+'''
+
+PRUNE_CHANGE_LOG_QUERY = "DELETE FROM change_log WHERE seq <= MIN((SELECT MAX(seq) FROM change_log) - ?, ?)"
+# Highest seq a prune may remove when no notifier cursor caps it
+NO_CURSOR = 1 << 62
+
+def prune_change_log(conn, retain=DEFAULT_RETAIN, cursor=None):
+    """Deletes log rows more than retain entries behind the newest one, and never past cursor
+    (a notifier's position) when given, without committing.
+
+    ChangeNotifier only prunes behind its own cursor, so writers that run with no notifier
+    (journal sync, rollup refresh, the generator) call this to keep the log bounded. A notifier
+    in another process can still fall behind such a prune; it sees the gap and publishes RESET.
+    """
+    conn.execute(PRUNE_CHANGE_LOG_QUERY, (retain, NO_CURSOR if cursor is None else cursor))
+
+class ChangeBus:
+    """Fans change events out to subscribers, one call per subscriber per poll with all its events"""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._next_token = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback, tables=None, ops=None):
+        """Registers callback(events) for the given tables/ops (None means all); returns a token.
+
+        RESET events reach every subscriber of their table whatever ops it asked for.
+        """
+        with self._lock:
+            self._next_token += 1
+            token = self._next_token
+            self._subscribers[token] = (
+                callback,
+                frozenset(tables) if tables else None,
+                frozenset(ops) if ops else None,
+            )
+        return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            return self._subscribers.pop(token, None) is not None
+
+    def publish(self, events):
+        if not events:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for token, (callback, tables, ops) in subscribers:
+            matched = [
+                e for e in events
+                if (tables is None or e.table in tables) and (ops is None or e.op in ops or e.op == RESET)
+            ]
+            if not matched:
+                continue
+            try:
+                callback(matched)
+            except RuntimeError as e:
+                # Qt widgets deleted without unsubscribing raise "wrapped C/C++ object ... has been deleted"
+                print(f"Dropping change subscriber {token}: {e}")
+                self.unsubscribe(token)
+            except Exception:
+                traceback.print_exc()
+
+class ChangeNotifier:
+    """Watches PRAGMA data_version and publishes new change_log rows to a ChangeBus.
+
+    poll() is cheap when nothing changed (one pragma on a private connection), so it can be
+    driven from a QTimer on the GUI thread, which keeps subscriber callbacks there too; headless
+    consumers can use start() to poll from a background thread instead.
+    """
+
+    def __init__(self, db_manager, bus=None, batch_size=DEFAULT_BATCH_SIZE,
+                 retain=DEFAULT_RETAIN, prune_every=DEFAULT_PRUNE_EVERY):
+        self.db_manager = db_manager
+        self.bus = bus or ChangeBus()
+        self.batch_size = batch_size
+        self.retain = retain
+        self.prune_every = prune_every
+        self.cursor = None
+        self._probe = None
+        self._data_version = None
+        self._pruned_at = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def subscribe(self, callback, tables=None, ops=None):
+        return self.bus.subscribe(callback, tables, ops)
+
+    def unsubscribe(self, token):
+        return self.bus.unsubscribe(token)
+
+    def _open(self):
+        self._probe = sqlite3.connect(self.db_manager.database_name, check_same_thread=False)
+        self._data_version = None
+        if self.cursor is None:
+            # Start from the current end of the log: subscribers only hear about new changes. The
+            # last seq handed out, not MAX(seq), so a log pruned empty does not look like a gap
+            row = self._probe.execute(
+                "SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'change_log'), 0)"
+            ).fetchone()
+            self.cursor = row[0]
+            self._pruned_at = self.cursor
+
+    def poll(self):
+        """Publishes every change since the last poll; returns the number of events.
+
+        seq is AUTOINCREMENT, so a first new row past cursor + 1 means another process pruned
+        entries this notifier never read; a RESET per logged table goes out ahead of the rest.
+        """
+        with self._lock:
+            try:
+                if self._probe is None:
+                    self._open()
+                data_version = self._probe.execute("PRAGMA data_version").fetchone()[0]
+                if data_version == self._data_version:
+                    return 0
+                self._data_version = data_version
+                start = self.cursor
+                events = []
+                while True:
+                    rows = self._probe.execute(CHANGE_LOG_QUERY, (self.cursor, self.batch_size)).fetchall()
+                    events.extend(ChangeEvent(*row) for row in rows)
+                    if rows:
+                        self.cursor = rows[-1][0]
+                    if len(rows) < self.batch_size:
+                        break
+                if events and events[0].seq > start + 1:
+                    print(f"Change log pruned past seq {start}; resetting subscribers")
+                    events = [ChangeEvent(start, table, RESET, None, None) for table in CHANGE_LOG_TABLES] + events
+            except sqlite3.Error as e:
+                print(f"Change notifier error: {e}")
+                return 0
+        self.bus.publish(events)
+        if self.cursor - self._pruned_at >= self.prune_every:
+            self.prune()
+        return len(events)
+
+    def prune(self):
+        """Deletes log rows more than retain entries behind this notifier's cursor"""
+        cutoff = self.cursor - self.retain
+        self._pruned_at = self.cursor
+        if cutoff > 0:
+            self.db_manager.execute_insert_update_delete("DELETE FROM change_log WHERE seq <= ?", (cutoff,))
+
+    def start(self, interval=0.5):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                self.poll()
+        self._thread = threading.Thread(target=run, name='change-notifier', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            if self._probe is not None:
+                self._probe.close()
+                self._probe = None
@@ -21,7 +21,17 @@ def drop_all_tables():
         'drivers',
         'admins',
         'commuters',
-        'users'
+        'users',
+        'table_versions',
+        'driver_rating_stats',
+        'conductor_rating_stats',
+        'revenue_rollup',
+        'rollup_watermarks',
+        'transaction_partitions',
+        'change_log',
+        'fare_snapshot_rows',
+        'fare_snapshots',
+        'transaction_seq'
     ]
 
     for table in tables:
@@ -31,6 +41,9 @@ def drop_all_tables():
     # If you have views, drop them as well (example for route_view)
     cursor.execute('DROP VIEW IF EXISTS route_view;')
 
+    # Reset the schema version so migrations run again on the recreated tables
+    cursor.execute('PRAGMA user_version = 0;')
+
     # Re-enable foreign key constraints
     cursor.execute('PRAGMA foreign_keys = ON;')
 
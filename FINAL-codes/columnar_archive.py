@@ -0,0 +1,334 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+DATABASE_NAME = 'transport_app.db'
+ARCHIVE_DIR = 'transactions_columnar'
+DEFAULT_CHUNK_SIZE = 100000
+META_FILE = 'meta.json'
+FORMAT_VERSION = 1
+TRANSACTION_ID_WIDTH = 32
+NULL_CODE = -1
+
+# name -> (dtype, source column); ids that repeat heavily are dictionary encoded instead
+FIXED_COLUMNS = {
+    'row_id': ('<i8', 'rowid'),
+    'transaction_id': (f'S{TRANSACTION_ID_WIDTH}', 'transaction_id'),
+    'route_id': ('<i4', 'route_id'),
+    'fare_id': ('<i4', 'fare_id'),
+    'total_fare': ('<f8', 'total_fare'),
+    'timestamp': ('<i8', 'transaction_date'),
+}
+DICTIONARY_COLUMNS = {
+    'vehicle_id': '<i4',
+    'conductor_id': '<i4',
+    'commuter_id': '<i4',
+}
+
+# Keyed on transaction_seq rather than rowid: rowids of deleted newest rows are handed out again
+EXPORT_QUERY = '''
+SELECT s.seq, t.rowid, t.transaction_id, t.route_id, t.fare_id, t.total_fare,
+    CAST(strftime('%s', t.transaction_date) AS INTEGER) AS epoch,
+    t.vehicle_id, t.conductor_id, t.commuter_id
+FROM transaction_seq s
+JOIN transactions t ON t.rowid = s.row_id
+WHERE s.seq > ?
+ORDER BY s.seq
+LIMIT ?
+'''
+
+# Archived months have no transaction_seq; a new archive backfills them whole, in rowid order
+PARTITION_EXPORT_QUERY = '''
+SELECT rowid, transaction_id, route_id, fare_id, total_fare,
+    CAST(strftime('%s', transaction_date) AS INTEGER) AS epoch,
+    vehicle_id, conductor_id, commuter_id
+FROM {alias}.transactions
+WHERE rowid > ?
+ORDER BY rowid
+LIMIT ?
+'''
+
+def default_archive_dir(database_name):
+    """Archive directory next to a database, like its monthly partitions"""
+    return os.path.join(os.path.dirname(os.path.abspath(database_name)), ARCHIVE_DIR)
+
+def _column_path(archive_dir, name):
+    return os.path.join(archive_dir, f"{name}.bin")
+
+def _dictionary_path(archive_dir, name):
+    return os.path.join(archive_dir, f"{name}.dict.json")
+
+def _read_meta(archive_dir):
+    path = os.path.join(archive_dir, META_FILE)
+    if not os.path.exists(path):
+        # backfill stays None until the first append lists the partitions that exist by then
+        return {'version': FORMAT_VERSION, 'rows': 0, 'last_seq': 0, 'backfill': None, 'backfill_rowid': 0}
+    with open(path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported archive format {meta.get('version')}")
+    return meta
+
+def _write_json_atomic(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class ColumnarExporter:
+    """Appends transactions past the archive's transaction_seq watermark to flat column files.
+
+    Column data is written first and meta.json last, so a crash mid-append leaves the
+    old row count authoritative; the next append trims the partial tail before writing.
+    A new archive first backfills the months already moved to partitions; months archived
+    afterwards were exported while still live, since archive_month() appends before moving.
+    """
+
+    def __init__(self, archive_dir=ARCHIVE_DIR, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.archive_dir = archive_dir
+        self.chunk_size = chunk_size
+        os.makedirs(archive_dir, exist_ok=True)
+        self.meta = _read_meta(archive_dir)
+        self.dictionaries = {}
+        for name in DICTIONARY_COLUMNS:
+            path = _dictionary_path(archive_dir, name)
+            values = []
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    values = json.load(f)
+            self.dictionaries[name] = (values, {value: code for code, value in enumerate(values)})
+        self._trim_to_meta()
+
+    def _trim_to_meta(self):
+        rows = self.meta['rows']
+        dtypes = {name: spec[0] for name, spec in FIXED_COLUMNS.items()}
+        dtypes.update(DICTIONARY_COLUMNS)
+        for name, dtype in dtypes.items():
+            path = _column_path(self.archive_dir, name)
+            size = rows * np.dtype(dtype).itemsize
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+            if os.path.getsize(path) != size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def _encode(self, name, values):
+        known, index = self.dictionaries[name]
+        codes = np.empty(len(values), dtype=DICTIONARY_COLUMNS[name])
+        for i, value in enumerate(values):
+            if value is None:
+                codes[i] = NULL_CODE
+                continue
+            code = index.get(value)
+            if code is None:
+                code = index[value] = len(known)
+                known.append(value)
+            codes[i] = code
+        return codes
+
+    def _append_chunk(self, rows):
+        row_ids, transaction_ids, route_ids, fare_ids, fares, epochs, vehicles, conductors, commuters = zip(*rows)
+        # Fixed-width bytes have no NULL, so a missing id is stored empty and read back as None
+        encoded_ids = [b'' if t is None else str(t).encode('utf-8') for t in transaction_ids]
+        if max(len(t) for t in encoded_ids) > TRANSACTION_ID_WIDTH:
+            raise ValueError(f"transaction_id longer than {TRANSACTION_ID_WIDTH} bytes")
+        columns = {
+            'row_id': np.array(row_ids, dtype='<i8'),
+            'transaction_id': np.array(encoded_ids, dtype=f'S{TRANSACTION_ID_WIDTH}'),
+            'route_id': np.array([NULL_CODE if v is None else v for v in route_ids], dtype='<i4'),
+            'fare_id': np.array([NULL_CODE if v is None else v for v in fare_ids], dtype='<i4'),
+            'total_fare': np.array(fares, dtype='<f8'),
+            'timestamp': np.array([0 if v is None else v for v in epochs], dtype='<i8'),
+            'vehicle_id': self._encode('vehicle_id', vehicles),
+            'conductor_id': self._encode('conductor_id', conductors),
+            'commuter_id': self._encode('commuter_id', commuters),
+        }
+        for name, values in columns.items():
+            with open(_column_path(self.archive_dir, name), 'ab') as f:
+                values.tofile(f)
+        self.meta['rows'] += len(rows)
+
+    def _commit(self):
+        for name, (values, _) in self.dictionaries.items():
+            _write_json_atomic(_dictionary_path(self.archive_dir, name), values)
+        self.meta['updated_at'] = time.strftime("%Y-%m-%d %H:%M:%S")
+        _write_json_atomic(os.path.join(self.archive_dir, META_FILE), self.meta)
+
+    def append(self, db_manager, progress=None):
+        """Exports every transaction newer than the archive; returns the number of rows added"""
+        if not db_manager.ensure_connection():
+            return 0
+        added = self._backfill_partitions(db_manager, progress)
+        while True:
+            rows = db_manager.execute_query(EXPORT_QUERY, (self.meta['last_seq'], self.chunk_size)) or []
+            if not rows:
+                break
+            self._append_chunk([tuple(row)[1:] for row in rows])
+            self.meta['last_seq'] = int(rows[-1][0])
+            self._commit()
+            added += len(rows)
+            if progress:
+                progress(added)
+        return added
+
+    def _backfill_partitions(self, db_manager, progress=None):
+        partitions = db_manager.get_partition_manager()
+        if self.meta.get('backfill') is None:
+            self.meta['backfill'] = [p['month'] for p in partitions.partitions()]
+            self.meta['backfill_rowid'] = 0
+            self._commit()
+        by_month = {p['month']: p for p in partitions.partitions()}
+        added = 0
+        while self.meta['backfill']:
+            partition = by_month.get(self.meta['backfill'][0])
+            if partition is not None:
+                with partitions.attached(partition) as (conn, alias):
+                    query = PARTITION_EXPORT_QUERY.format(alias=alias)
+                    while True:
+                        rows = conn.execute(query, (self.meta['backfill_rowid'], self.chunk_size)).fetchall()
+                        if not rows:
+                            break
+                        self._append_chunk([tuple(row) for row in rows])
+                        self.meta['backfill_rowid'] = int(rows[-1][0])
+                        self._commit()
+                        added += len(rows)
+                        if progress:
+                            progress(added)
+            self.meta['backfill'].pop(0)
+            self.meta['backfill_rowid'] = 0
+            self._commit()
+        return added
+
+class ColumnarArchive:
+    """Read-only, memory-mapped view of an exported archive; scans never build Python rows"""
+
+    def __init__(self, archive_dir=ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        self.meta = _read_meta(archive_dir)
+        self.rows = self.meta['rows']
+        self._columns = {}
+        self._dictionaries = {}
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, name):
+        """Zero-copy array over the first rows entries of a column file"""
+        if name not in self._columns:
+            if name in FIXED_COLUMNS:
+                dtype = FIXED_COLUMNS[name][0]
+            elif name in DICTIONARY_COLUMNS:
+                dtype = DICTIONARY_COLUMNS[name]
+            else:
+                raise KeyError(name)
+            if self.rows == 0:
+                self._columns[name] = np.empty(0, dtype=dtype)
+            else:
+                self._columns[name] = np.memmap(
+                    _column_path(self.archive_dir, name), dtype=dtype, mode='r', shape=(self.rows,)
+                )
+        return self._columns[name]
+
+    def dictionary(self, name):
+        if name not in self._dictionaries:
+            with open(_dictionary_path(self.archive_dir, name), 'r', encoding='utf-8') as f:
+                self._dictionaries[name] = json.load(f)
+        return self._dictionaries[name]
+
+    def decode(self, name, codes):
+        if name == 'transaction_id':
+            return [c.decode('utf-8') or None for c in codes]
+        if name not in DICTIONARY_COLUMNS:
+            return [None if c == NULL_CODE else int(c) for c in codes]
+        values = self.dictionary(name)
+        return [None if c == NULL_CODE else values[c] for c in codes]
+
+    def time_mask(self, start=None, end=None):
+        """Boolean mask for start <= timestamp < end (epoch seconds), or None for everything"""
+        if start is None and end is None:
+            return None
+        timestamps = self.column('timestamp')
+        mask = np.ones(self.rows, dtype=bool)
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps < end
+        return mask
+
+    def revenue_by(self, name, start=None, end=None):
+        """{key: (transactions, revenue)} grouped by a route/fare or dictionary-encoded column"""
+        codes = np.asarray(self.column(name), dtype=np.int64)
+        fares = self.column('total_fare')
+        mask = self.time_mask(start, end)
+        if mask is not None:
+            codes, fares = codes[mask], fares[mask]
+        # Shift by one so NULL_CODE lands in bin 0
+        counts = np.bincount(codes + 1)
+        revenue = np.bincount(codes + 1, weights=fares, minlength=len(counts))
+        present = np.nonzero(counts)[0]
+        keys = self.decode(name, present - 1)
+        return {key: (int(counts[i]), float(revenue[i])) for key, i in zip(keys, present)}
+
+    def revenue_by_day(self, start=None, end=None):
+        """{'YYYY-MM-DD': (transactions, revenue)} using UTC day boundaries of the stored epochs"""
+        days = self.column('timestamp') // 86400
+        fares = self.column('total_fare')
+        mask = self.time_mask(start, end)
+        if mask is not None:
+            days, fares = days[mask], fares[mask]
+        if len(days) == 0:
+            return {}
+        first = int(days.min())
+        counts = np.bincount(days - first)
+        revenue = np.bincount(days - first, weights=fares, minlength=len(counts))
+        present = np.nonzero(counts)[0]
+        labels = (present + first).astype('datetime64[D]').astype(str).tolist()
+        return {label: (int(counts[i]), float(revenue[i])) for label, i in zip(labels, present)}
+
+def _epoch(value):
+    return int(np.datetime64(value, 's').astype(np.int64)) if value else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export transactions to, or report from, the columnar archive.")
+    parser.add_argument('command', choices=['export', 'report'])
+    parser.add_argument('--database', default=DATABASE_NAME)
+    parser.add_argument('--archive-dir', default=None, help=f"defaults to {ARCHIVE_DIR}/ next to the database")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--by', choices=['day', 'route_id', 'fare_id', 'vehicle_id', 'conductor_id', 'commuter_id'],
+                        default='day')
+    parser.add_argument('--start', help="YYYY-MM-DD, inclusive")
+    parser.add_argument('--end', help="YYYY-MM-DD, exclusive")
+    args = parser.parse_args(argv)
+    archive_dir = args.archive_dir or default_archive_dir(args.database)
+
+    if args.command == 'export':
+        from database_manager import DatabaseManager
+        db = DatabaseManager()
+        if not db.use_database(args.database):
+            raise SystemExit(f"Could not open {args.database}")
+        exporter = ColumnarExporter(archive_dir, chunk_size=args.chunk_size)
+        started = time.perf_counter()
+        added = exporter.append(db, progress=lambda total: print(f"  exported {total}", end='\r'))
+        print(f"Appended {added} transactions in {time.perf_counter() - started:.1f}s "
+              f"({exporter.meta['rows']} archived, last seq {exporter.meta['last_seq']})")
+        db.close()
+        return
+
+    archive = ColumnarArchive(archive_dir)
+    started = time.perf_counter()
+    start, end = _epoch(args.start), _epoch(args.end)
+    if args.by == 'day':
+        result = archive.revenue_by_day(start, end)
+    else:
+        result = archive.revenue_by(args.by, start, end)
+    elapsed = time.perf_counter() - started
+    for key, (count, revenue) in sorted(result.items(), key=lambda item: str(item[0])):
+        print(f"{str(key):<16} {count:>10} {revenue:>14,.2f}")
+    print(f"Scanned {len(archive)} archived transactions in {elapsed * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
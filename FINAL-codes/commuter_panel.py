@@ -4,16 +4,19 @@ from PyQt5.QtWidgets import (
     QComboBox, QFormLayout, QGroupBox, QMessageBox, QTableView, QHeaderView, QApplication
 )
 from PyQt5.QtCore import Qt, pyqtSignal
-from PyQt5.QtGui import QStandardItemModel, QStandardItem
+from table_models import ColumnTableModel
+from workers import JobRunner
 from routes_fares import FareCalculatorApp
+from session import Session
 
 class CommuterPanel(QWidget):
     logout_requested = pyqtSignal()
 
-    def __init__(self, db_manager, user_data):
+    def __init__(self, db_manager, user_data, session=None):
         super().__init__()
         self.db_manager = db_manager
         self.user_data = user_data
+        self.session = session or Session.for_user(db_manager, user_data.get('user_id'))
         self.commuter_id = self.user_data.get('commuter_id')
         self.user_id = self.user_data.get('user_id')
         self.setWindowTitle("Commuter Panel")
@@ -22,8 +25,25 @@ class CommuterPanel(QWidget):
         height = int(screen.height() * 0.75)
         self.setFixedSize(width, height)
         self.routes_fares_window = None
+        self.runner = JobRunner(self)
         self.init_ui()
         self.load_commuter_data()
+        notifier = self.db_manager.get_change_notifier()
+        tokens = [notifier.subscribe(lambda events: self.refresh_feedbacks(), ['feedbacks'], ['INSERT'])]
+        list_tables = self.session.list_tables() if self.session else []
+        if list_tables:
+            # Routes, drivers and conductors added after login show up in the combos
+            tokens.append(notifier.subscribe(self.on_reference_changes, list_tables))
+        self.destroyed.connect(lambda: [notifier.unsubscribe(token) for token in tokens])
+
+    def on_reference_changes(self, events):
+        refreshed = self.session.refresh_lists({e.table for e in events})
+        if 'routes' in refreshed:
+            self.populate_route_combo(self.preferred_route_combo.currentData())
+        if 'drivers' in refreshed:
+            self.populate_driver_combo()
+        if 'conductors' in refreshed:
+            self.populate_conductor_combo()
 
     def init_ui(self):
         image_path = os.path.join(os.path.dirname(__file__), "OIP.jpg")
@@ -146,10 +166,26 @@ class CommuterPanel(QWidget):
         my_feedbacks_group = QGroupBox("My Submitted Feedback")
         my_feedbacks_group.setStyleSheet("QGroupBox { color: #1976D2; font-weight: bold; font-size: 16px; }")
         my_feedbacks_layout = QVBoxLayout()
+        self.my_feedbacks_loading_label = QLabel("Loading feedback...")
+        self.my_feedbacks_loading_label.setStyleSheet("color: #64B5F6; font-style: italic;")
+        self.my_feedbacks_loading_label.hide()
+        my_feedbacks_layout.addWidget(self.my_feedbacks_loading_label)
         self.my_feedbacks_table = QTableView()
         self.my_feedbacks_table.setEditTriggers(QTableView.NoEditTriggers)
         self.my_feedbacks_table.setSelectionBehavior(QTableView.SelectRows)
-        self.my_feedbacks_table_model = QStandardItemModel()
+        self.my_feedbacks_table_model = ColumnTableModel(
+            ["Feedback ID", "Driver ID", "Conductor ID", "Rating", "Comment", "Date"],
+            ["feedback_id", "driver_id", "conductor_id", "rating", "comment", "date"],
+            page_loader=lambda before, limit: self.db_manager.get_commuter_feedbacks_page(
+                self.commuter_id, before, limit
+            ),
+            page_key=lambda row: row['feedback_id'],
+            runner=self.runner,
+            delta_loader=lambda after: self.db_manager.get_commuter_feedbacks_since(
+                self.commuter_id, after
+            )
+        )
+        self.my_feedbacks_table_model.loading_changed.connect(self.my_feedbacks_loading_label.setVisible)
         self.my_feedbacks_table.setModel(self.my_feedbacks_table_model)
         self.my_feedbacks_table.verticalHeader().setVisible(False)
         self.my_feedbacks_table.horizontalHeader().setStyleSheet(
@@ -173,23 +209,17 @@ class CommuterPanel(QWidget):
         header.setSectionResizeMode(QHeaderView.Stretch)
         table_view.resizeRowsToContents()
 
-    def populate_table_view(self, model, data, headers, table_view, keys=None):
+    def load_feedbacks(self):
         try:
-            model.clear()
-            model.setHorizontalHeaderLabels(headers)
-            if data:
-                if keys is None:
-                    keys = headers
-                for row_data in data:
-                    row_dict = dict(row_data) if hasattr(row_data, 'keys') else row_data
-                    items = [QStandardItem(str(row_dict.get(k, ""))) for k in keys]
-                    for item in items:
-                        item.setTextAlignment(Qt.AlignCenter)
-                    model.appendRow(items)
-            self.resize_table_view_uniform(table_view)
+            self.my_feedbacks_table_model.reload()
+            self.resize_table_view_uniform(self.my_feedbacks_table)
         except Exception as e:
             QMessageBox.critical(self, "Table Error", f"Could not populate table: {e}")
 
+    def refresh_feedbacks(self):
+        """Adds only feedback newer than the top row instead of reloading the history"""
+        self.my_feedbacks_table_model.refresh_delta()
+
     def load_commuter_data(self):
         try:
             self.username_value.setText(self.user_data.get('username', 'N/A'))
@@ -206,41 +236,10 @@ class CommuterPanel(QWidget):
             idx = self.discount_combo.findText(discount_type if discount_type else 'None')
             if idx >= 0:
                 self.discount_combo.setCurrentIndex(idx)
-            routes = self.db_manager.get_routes()
-            self.preferred_route_combo.clear()
-            self.preferred_route_combo.addItem("Select Preferred Route", None)
-            current_preferred_route = self.user_data.get('preferred_route')
-            try:
-                if current_preferred_route is not None:
-                    current_preferred_route = int(current_preferred_route)
-            except (TypeError, ValueError):
-                current_preferred_route = None
-            selected_index = 0
-            if routes:
-                for i, route in enumerate(routes):
-                    route_id = int(route['route_id'])
-                    label = f"{route['origin']} to {route['destination']}"
-                    self.preferred_route_combo.addItem(label, route_id)
-                    if current_preferred_route == route_id:
-                        selected_index = i + 1
-            self.preferred_route_combo.setCurrentIndex(selected_index)
+            self.populate_route_combo(self.user_data.get('preferred_route'))
             self.populate_driver_combo()
             self.populate_conductor_combo()
-            if hasattr(self.db_manager, 'get_commuter_feedbacks'):
-                feedbacks = self.db_manager.get_commuter_feedbacks(self.commuter_id)
-                if feedbacks:
-                    feedbacks = [dict(feedback) for feedback in feedbacks]
-                else:
-                    feedbacks = []
-                headers = ["Feedback ID", "Driver ID", "Conductor ID", "Rating", "Comment", "Date"]
-                keys = ["feedback_id", "driver_id", "conductor_id", "rating", "comment", "date"]
-                self.populate_table_view(
-                    self.my_feedbacks_table_model,
-                    feedbacks,
-                    headers,
-                    self.my_feedbacks_table,
-                    keys=keys
-                )
+            self.load_feedbacks()
         except Exception as e:
             QMessageBox.critical(self, "Data Error", f"Failed to load data: {str(e)}")
 
@@ -285,6 +284,8 @@ class CommuterPanel(QWidget):
                     (user_id,)
                 )[0]
                 self.user_data.update(dict(fresh_user_data))
+                if self.session:
+                    self.session.user.update(dict(fresh_user_data))
                 self.load_commuter_data()
             else:
                 self.db_manager.rollback_transaction()
@@ -293,27 +294,50 @@ class CommuterPanel(QWidget):
             self.db_manager.rollback_transaction()
             QMessageBox.critical(self, "Error", f"Update failed: {str(e)}")
 
+    def populate_route_combo(self, current_preferred_route=None):
+        routes = self.session.routes if self.session else []
+        self.preferred_route_combo.clear()
+        self.preferred_route_combo.addItem("Select Preferred Route", None)
+        try:
+            if current_preferred_route is not None:
+                current_preferred_route = int(current_preferred_route)
+        except (TypeError, ValueError):
+            current_preferred_route = None
+        selected_index = 0
+        if routes:
+            for i, route in enumerate(routes):
+                route_id = int(route['route_id'])
+                label = f"{route['origin']} to {route['destination']}"
+                self.preferred_route_combo.addItem(label, route_id)
+                if current_preferred_route == route_id:
+                    selected_index = i + 1
+        self.preferred_route_combo.setCurrentIndex(selected_index)
+
     def populate_driver_combo(self):
         try:
+            selected = self.feedback_driver_combo.currentData()
             self.feedback_driver_combo.clear()
             self.feedback_driver_combo.addItem("Select Driver (Optional)", None)
-            drivers = self.db_manager.get_all_driver_ids()
+            drivers = self.session.driver_ids if self.session else []
             if drivers:
                 for d in drivers:
                     d_dict = dict(d)
                     self.feedback_driver_combo.addItem(str(d_dict.get('driver_id')), d_dict.get('driver_id'))
+            self.feedback_driver_combo.setCurrentIndex(max(self.feedback_driver_combo.findData(selected), 0))
         except Exception as e:
             print(f"Error populating driver combo: {e}")
 
     def populate_conductor_combo(self):
         try:
+            selected = self.feedback_conductor_combo.currentData()
             self.feedback_conductor_combo.clear()
             self.feedback_conductor_combo.addItem("Select Conductor (Optional)", None)
-            conductors = self.db_manager.get_all_conductor_ids()
+            conductors = self.session.conductor_ids if self.session else []
             if conductors:
                 for c in conductors:
                     c_dict = dict(c)
                     self.feedback_conductor_combo.addItem(str(c_dict.get('conductor_id')), c_dict.get('conductor_id'))
+            self.feedback_conductor_combo.setCurrentIndex(max(self.feedback_conductor_combo.findData(selected), 0))
         except Exception as e:
             print(f"Error populating conductor combo: {e}")
 
@@ -347,20 +371,7 @@ class CommuterPanel(QWidget):
                 self.feedback_comment_input.clear()
                 self.feedback_driver_combo.setCurrentIndex(0)
                 self.feedback_conductor_combo.setCurrentIndex(0)
-                feedbacks = self.db_manager.get_commuter_feedbacks(self.commuter_id)
-                if feedbacks:
-                    feedbacks = [dict(feedback) for feedback in feedbacks]
-                else:
-                    feedbacks = []
-                headers = ["Feedback ID", "Driver ID", "Conductor ID", "Rating", "Comment", "Date"]
-                keys = ["feedback_id", "driver_id", "conductor_id", "rating", "comment", "date"]
-                self.populate_table_view(
-                    self.my_feedbacks_table_model,
-                    feedbacks,
-                    headers,
-                    self.my_feedbacks_table,
-                    keys=keys
-                )
+                self.refresh_feedbacks()
             else:
                 QMessageBox.warning(self, "Error", "Failed to submit feedback")
         except Exception as e:
@@ -1,24 +1,105 @@
+import sqlite3
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QTableView, QFormLayout, QGroupBox, QHeaderView, QInputDialog, QMessageBox
 )
-from PyQt5.QtCore import Qt, pyqtSignal
-from PyQt5.QtGui import QStandardItemModel, QStandardItem
+from PyQt5.QtCore import pyqtSignal, QTimer
+from table_models import ColumnTableModel, format_currency, format_datetime
+from workers import JobRunner
+from session import Session
+from change_notifier import RESET
+
+JOURNAL_SYNC_MS = 5000
 
 class ConductorPanel(QWidget):
     logout_requested = pyqtSignal()
     
-    def __init__(self, db_manager, user_data):
+    def __init__(self, db_manager, user_data, session=None):
         super().__init__()
         self.db_manager = db_manager
         self.user_data = user_data
+        self.session = session
         self.conductor_id = self.user_data.get('conductor_id')
+        self.runner = JobRunner(self)
+        self.journal = db_manager.get_ticket_journal()
         self.setWindowTitle("Conductor Panel")
         self.init_ui()
         self.load_conductor_data()
         self.load_assigned_vehicle()
         self.load_transactions()
         self.load_feedbacks()
+        self.subscribe_changes()
+        if self.session is None:
+            self.runner.submit(
+                'session', Session.for_user, self.on_session_loaded,
+                lambda message: print(f"Session load error: {message}"),
+                db_manager, user_data.get('user_id')
+            )
+        # Replays tickets journaled before a crash or outage, then retries on a timer
+        self.sync_timer = QTimer(self)
+        self.sync_timer.timeout.connect(self.sync_journal)
+        self.sync_timer.start(JOURNAL_SYNC_MS)
+        self.sync_journal()
+        self.runner.submit('journal_prune', self.journal.prune)
+    
+    def sync_journal(self):
+        self.runner.submit('journal_sync', self.journal.sync, self.on_journal_synced, self.on_journal_sync_error)
+    
+    def on_journal_synced(self, result):
+        if result.synced:
+            self.refresh_transactions()
+        self.update_sync_status(result.pending)
+    
+    def on_journal_sync_error(self, message):
+        print(f"Ticket sync error: {message}")
+        self.update_sync_status(self.journal.pending_count())
+    
+    def update_sync_status(self, pending):
+        self.sync_status_label.setText(f"{pending} ticket(s) waiting to sync" if pending else "")
+        self.sync_status_label.setVisible(bool(pending))
+    
+    def subscribe_changes(self):
+        """Targeted refreshes driven by the change log instead of reloading on a timer"""
+        notifier = self.db_manager.get_change_notifier()
+        tokens = [
+            notifier.subscribe(lambda events: self.refresh_transactions(), ['transactions'], ['INSERT']),
+            notifier.subscribe(self.on_feedback_changes, ['feedbacks']),
+            notifier.subscribe(self.on_assignment_changes, ['vehicle_assignment']),
+        ]
+        self.change_tokens = tokens
+        self.subscribe_reference_changes()
+        self.destroyed.connect(lambda: [notifier.unsubscribe(token) for token in tokens])
+    
+    def subscribe_reference_changes(self):
+        """Commuters registered or fares added after login show up in the ticket dialog"""
+        list_tables = self.session.list_tables() if self.session else []
+        if list_tables:
+            notifier = self.db_manager.get_change_notifier()
+            self.change_tokens.append(notifier.subscribe(self.on_reference_changes, list_tables))
+    
+    def on_session_loaded(self, session):
+        """Fills in what depends on the session once it has been read on a pool thread"""
+        if session is None:
+            return
+        self.session = session
+        self.load_conductor_data()
+        self.load_assigned_vehicle()
+        self.subscribe_reference_changes()
+    
+    def on_feedback_changes(self, events):
+        if any(e.op == RESET for e in events):
+            self.load_feedbacks()
+        elif any(e.op == 'INSERT' for e in events):
+            self.feedback_model.refresh_tail()
+        self.load_rating_summary()
+    
+    def on_assignment_changes(self, events):
+        if self.session:
+            self.session.refresh_assignment()
+        self.load_assigned_vehicle()
+    
+    def on_reference_changes(self, events):
+        self.session.refresh_lists({e.table for e in events})
     
     def init_ui(self):
         main_layout = QVBoxLayout()
@@ -54,6 +135,9 @@ class ConductorPanel(QWidget):
         self.license_value = QLabel()
         conductor_info_layout.addRow(QLabel("License No:"), self.license_value)
         
+        self.rating_value = QLabel("No ratings yet")
+        conductor_info_layout.addRow(QLabel("Rating:"), self.rating_value)
+        
         conductor_info_group.setLayout(conductor_info_layout)
         main_layout.addWidget(conductor_info_group)
         
@@ -81,12 +165,35 @@ class ConductorPanel(QWidget):
         self.add_transaction_btn.clicked.connect(self.add_transaction)
         transaction_layout.addWidget(self.add_transaction_btn)
         
+        self.sync_status_label = QLabel("")
+        self.sync_status_label.setStyleSheet("color: #F57C00; font-style: italic;")
+        self.sync_status_label.hide()
+        transaction_layout.addWidget(self.sync_status_label)
+        
         transactions_label = QLabel("Recent Transactions:")
         transactions_label.setStyleSheet("color: #1976D2; font-weight: bold;")
         transaction_layout.addWidget(transactions_label)
         
+        self.transactions_loading_label = QLabel("Loading transactions...")
+        self.transactions_loading_label.setStyleSheet("color: #64B5F6; font-style: italic;")
+        self.transactions_loading_label.hide()
+        transaction_layout.addWidget(self.transactions_loading_label)
+        
         self.transactions_table = QTableView()
-        self.transactions_model = QStandardItemModel()
+        self.transactions_model = ColumnTableModel(
+            ["Transaction ID", "Commuter ID", "Route", "Vehicle", "Amount", "Date"],
+            ["transaction_id", "commuter_id", "Route", "Vehicle Plate", "total_fare", "Date"],
+            formatters={"total_fare": format_currency, "Date": format_datetime},
+            page_loader=lambda before, limit: self.db_manager.get_conductor_transactions_page(
+                self.conductor_id, before, limit
+            ),
+            page_key=lambda row: (row['Date'], row['row_id']),
+            runner=self.runner,
+            delta_loader=lambda after: self.db_manager.get_conductor_transactions_since(
+                self.conductor_id, after
+            )
+        )
+        self.transactions_model.loading_changed.connect(self.transactions_loading_label.setVisible)
         self.transactions_table.setModel(self.transactions_model)
         self.transactions_table.setEditTriggers(QTableView.NoEditTriggers)
         self.transactions_table.horizontalHeader().setStyleSheet(
@@ -106,8 +213,23 @@ class ConductorPanel(QWidget):
         feedback_label.setStyleSheet("color: #1976D2; font-weight: bold;")
         feedback_layout.addWidget(feedback_label)
         
+        self.feedback_loading_label = QLabel("Loading feedback...")
+        self.feedback_loading_label.setStyleSheet("color: #64B5F6; font-style: italic;")
+        self.feedback_loading_label.hide()
+        feedback_layout.addWidget(self.feedback_loading_label)
+        
         self.feedback_table = QTableView()
-        self.feedback_model = QStandardItemModel()
+        self.feedback_model = ColumnTableModel(
+            ["Feedback ID", "Commuter ID", "Rating", "Comment", "Date"],
+            ["feedback_id", "commuter_id", "rating", "comment", "feedback_date"],
+            formatters={"feedback_date": format_datetime},
+            page_loader=lambda after, limit: self.db_manager.get_conductor_feedbacks_page(
+                self.conductor_id, after, limit
+            ),
+            page_key=lambda row: row['feedback_id'],
+            runner=self.runner
+        )
+        self.feedback_model.loading_changed.connect(self.feedback_loading_label.setVisible)
         self.feedback_table.setModel(self.feedback_model)
         self.feedback_table.setEditTriggers(QTableView.NoEditTriggers)
         self.feedback_table.horizontalHeader().setStyleSheet(
@@ -124,7 +246,11 @@ class ConductorPanel(QWidget):
     def add_transaction(self):
         """Handles the complete transaction creation workflow"""
         try:
-            commuters = self.db_manager.get_all_commuter_ids()
+            if not self.session:
+                QMessageBox.critical(self, "Session Error", "Could not load your account; please log in again.")
+                return
+            
+            commuters = self.session.commuter_ids
             if not commuters:
                 QMessageBox.warning(self, "No Commuters", "No registered commuters found.")
                 return
@@ -134,7 +260,7 @@ class ConductorPanel(QWidget):
             if not commuter_id:
                 return
             
-            routes = self.db_manager.get_all_route_ids()
+            routes = self.session.route_ids
             if not routes:
                 QMessageBox.warning(self, "No Routes", "No available routes configured.")
                 return
@@ -146,7 +272,7 @@ class ConductorPanel(QWidget):
             
             route_id = int(route_id.split(":")[0])
             
-            fares = self.db_manager.get_all_fare_ids()
+            fares = self.session.fare_ids
             if not fares:
                 QMessageBox.warning(self, "No Fares", "No fare configurations available.")
                 return
@@ -171,19 +297,17 @@ class ConductorPanel(QWidget):
                                   "You must be assigned a vehicle to record transactions.")
                 return
             
-            success = self.db_manager.execute_insert_update_delete(
-                """INSERT INTO transactions (
-                    commuter_id, route_id,
-                    vehicle_id, conductor_id, fare_id, total_fare, transaction_date
-                ) VALUES (?, ?, ?, ?, ?, ?, datetime('now'))""",
-                (commuter_id, route_id, vehicle_id, self.conductor_id, fare_id, total_fare)
-            )
+            # Journaled locally first so the ticket survives a busy or unreachable database
+            try:
+                self.journal.record(
+                    commuter_id, route_id, vehicle_id, self.conductor_id, fare_id, total_fare
+                )
+            except sqlite3.Error as e:
+                QMessageBox.critical(self, "Journal Error", f"Failed to save transaction: {e}")
+                return
             
-            if success:
-                QMessageBox.information(self, "Success", "Transaction recorded successfully!")
-                self.load_transactions()
-            else:
-                QMessageBox.critical(self, "Database Error", "Failed to save transaction.")
+            QMessageBox.information(self, "Success", "Transaction recorded successfully!")
+            self.sync_journal()
         
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Transaction failed: {str(e)}")
@@ -196,12 +320,9 @@ class ConductorPanel(QWidget):
         return item if ok else None
     
     def load_conductor_data(self):
-        """Populates conductor information from DB."""
-        user_id = self.user_data.get('user_id')
-        conductor_data = self.db_manager.get_conductor_data(user_id)
-        
-        if conductor_data and len(conductor_data) > 0:
-            data = dict(conductor_data[0])
+        """Populates conductor information from the login session."""
+        if self.session:
+            data = self.session.user
             self.username_value.setText(data.get('username', 'N/A'))
             self.name_value.setText(f"{data.get('first_name', '')} {data.get('last_name', '')}")
             self.email_value.setText(data.get('email', 'N/A'))
@@ -211,36 +332,33 @@ class ConductorPanel(QWidget):
             self.name_value.setText(f"{self.user_data.get('first_name', '')} {self.user_data.get('last_name', '')}")
             self.email_value.setText(self.user_data.get('email', 'N/A'))
             self.license_value.setText(str(self.user_data.get('license_no', 'N/A')))
+        self.load_rating_summary()
+    
+    def load_rating_summary(self):
+        """Reads the trigger-maintained rating summary instead of scanning feedback"""
+        self.runner.submit(
+            'rating_summary', self.db_manager.get_conductor_rating_stats,
+            self.show_rating_summary, lambda message: print(f"Rating load error: {message}"),
+            self.conductor_id
+        )
+    
+    def show_rating_summary(self, stats):
+        if stats:
+            self.rating_value.setText(f"{stats['average']:.2f} / 5 ({stats['count']} ratings)")
+        else:
+            self.rating_value.setText("No ratings yet")
     
     def get_assigned_vehicle_id(self):
         """Helper method to get the most recently assigned vehicle ID"""
-        query = """
-        SELECT va.vehicle_id
-        FROM vehicle_assignment va
-        WHERE va.conductor_id = ?
-        ORDER BY va.assignment_date DESC
-        LIMIT 1
-        """
-        result = self.db_manager.execute_query(query, (self.conductor_id,))
-        if result and len(result) > 0:
-            return result[0]['vehicle_id']
-        return None
+        return self.session.assigned_vehicle_id if self.session else None
     
     def load_assigned_vehicle(self):
-        """Loads the most recent vehicle assignment data"""
-        query = """
-        SELECT va.vehicle_id, v.plate_no 
-        FROM vehicle_assignment va
-        JOIN vehicles v ON va.vehicle_id = v.vehicle_id
-        WHERE va.conductor_id = ?
-        ORDER BY va.assignment_date DESC
-        LIMIT 1
-        """
-        result = self.db_manager.execute_query(query, (self.conductor_id,))
+        """Loads the most recent vehicle assignment from the session"""
+        vehicle = self.session.assigned_vehicle if self.session else None
         
-        if result and len(result) > 0:
-            vehicle_id = result[0]['vehicle_id']
-            plate_no = result[0]['plate_no']
+        if vehicle:
+            vehicle_id = vehicle['vehicle_id']
+            plate_no = vehicle['plate_no']
             self.vehicle_id_value.setText(str(vehicle_id))
             self.plate_no_value.setText(str(plate_no))
         else:
@@ -248,61 +366,19 @@ class ConductorPanel(QWidget):
             self.plate_no_value.setText("Not Assigned")
     
     def load_transactions(self):
-        """Reloads transaction data into table view"""
-        transactions = self.db_manager.get_conductor_transactions(self.conductor_id)
-        headers = ["Transaction ID", "Commuter ID", "Route", "Vehicle", "Amount", "Date"]
-        self.populate_table(
-            self.transactions_model, transactions, headers,
-            currency_cols=["Amount"], date_cols=["Date"]
-        )
+        """Reloads the first page of transactions; older pages load as the table scrolls"""
+        self.transactions_model.reload()
         self.resize_table_columns(self.transactions_table)
     
+    def refresh_transactions(self):
+        """Adds only transactions newer than the top row, e.g. the ticket just issued"""
+        self.transactions_model.refresh_delta()
+    
     def load_feedbacks(self):
-        """Reloads feedback data into table view"""
-        feedbacks = self.db_manager.get_conductor_feedbacks(self.conductor_id)
-        headers = ["Feedback ID", "Commuter ID", "Rating", "Comment", "Date"]
-        self.populate_table(
-            self.feedback_model, feedbacks, headers,
-            date_cols=["Date"]
-        )
+        """Reloads the first page of feedback"""
+        self.feedback_model.reload()
         self.resize_table_columns(self.feedback_table)
     
-    def populate_table(self, model, data, headers, currency_cols=None, date_cols=None):
-        """Generic table population with formatting"""
-        model.clear()
-        model.setHorizontalHeaderLabels(headers)
-        
-        currency_cols = currency_cols or []
-        date_cols = date_cols or []
-        
-        if data:  
-            for row in data:
-                formatted_row = []
-                for idx, value in enumerate(row):
-                    if idx < len(headers):
-                        col_name = headers[idx]
-                        if col_name in currency_cols:
-                            formatted_value = f"₱{value:,.2f}"
-                        elif col_name in date_cols:
-                            formatted_value = self.format_datetime(value)
-                        else:
-                            formatted_value = str(value)
-                        
-                        item = QStandardItem(formatted_value)
-                        item.setTextAlignment(Qt.AlignCenter)
-                        formatted_row.append(item)
-                
-                model.appendRow(formatted_row)
-    
-    def format_datetime(self, dt_str):
-        """Formats datetime string for display"""
-        try:
-            from datetime import datetime
-            dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
-            return dt.strftime("%b %d, %Y %H:%M")
-        except:
-            return dt_str
-    
     def resize_table_columns(self, table):
         """Uniform column resizing"""
         header = table.horizontalHeader()
@@ -0,0 +1,187 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DATABASE_NAME = 'transport_app.db'
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    pass
+
+class ConnectionPool:
+    """Bounded pool of SQLite reader connections plus one dedicated writer"""
+
+    def __init__(self, database_name=DATABASE_NAME, max_readers=8, timeout=30.0, busy_timeout=5000):
+        self.database_name = database_name
+        self.max_readers = max_readers
+        self.timeout = timeout
+        self.busy_timeout = busy_timeout
+        self._idle = []
+        self._reader_count = 0
+        self._available = threading.Condition(threading.Lock())
+        self._local = threading.local()
+        self._writer = None
+        self._writer_lock = threading.RLock()
+        self._writer_owner = None
+        self._writer_depth = 0
+        self._closed = False
+
+    def _open_connection(self):
+        conn = sqlite3.connect(self.database_name, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        return conn
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _acquire_reader(self):
+        with self._available:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            while not self._idle and self._reader_count >= self.max_readers:
+                if not self._available.wait(self.timeout):
+                    raise PoolTimeoutError(
+                        f"No reader connection available after {self.timeout}s"
+                    )
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = None
+                self._reader_count += 1
+        if conn is not None and self._is_healthy(conn):
+            return conn
+        if conn is not None:
+            self._discard(conn)
+        try:
+            return self._open_connection()
+        except sqlite3.Error:
+            with self._available:
+                self._reader_count -= 1
+                self._available.notify()
+            raise
+
+    def _release_reader(self, conn):
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+        with self._available:
+            if self._closed:
+                self._reader_count -= 1
+                self._discard(conn)
+            else:
+                self._idle.append(conn)
+            self._available.notify()
+
+    @contextmanager
+    def reader(self):
+        """Checks out a reader connection, reusing the one this thread already holds"""
+        held = getattr(self._local, 'reader', None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+        conn = self._acquire_reader()
+        self._local.reader = conn
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.reader = None
+            self._local.depth = 0
+            self._release_reader(conn)
+
+    @contextmanager
+    def private_reader(self):
+        """Checks out a reader that no nested reader() on this thread will be handed.
+
+        For work that ATTACHes and DETACHes: SQLite refuses to detach while any statement on the
+        connection is still open, so an outer cursor on a shared reader would block it.
+        """
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            self._release_reader(conn)
+
+    def acquire_writer(self):
+        self._writer_lock.acquire()
+        try:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Connection pool is closed")
+            if self._writer is None or not self._is_healthy(self._writer):
+                if self._writer is not None:
+                    self._discard(self._writer)
+                self._writer = self._open_connection()
+        except Exception:
+            self._writer_lock.release()
+            raise
+        self._writer_owner = threading.get_ident()
+        self._writer_depth += 1
+        return self._writer
+
+    def release_writer(self):
+        self._writer_depth -= 1
+        if self._writer_depth == 0:
+            self._writer_owner = None
+        self._writer_lock.release()
+
+    def owns_writer(self):
+        """True while the calling thread holds the writer, e.g. inside writer() or a transaction"""
+        return self._writer_owner == threading.get_ident()
+
+    @contextmanager
+    def writer(self):
+        """Serializes access to the single writer connection"""
+        conn = self.acquire_writer()
+        try:
+            yield conn
+        finally:
+            self.release_writer()
+
+    def writer_connection(self):
+        """Returns the writer connection without holding its lock"""
+        conn = self.acquire_writer()
+        self.release_writer()
+        return conn
+
+    def writer_in_transaction(self):
+        return self._writer is not None and self._writer.in_transaction
+
+    def stats(self):
+        with self._available:
+            return {
+                'readers_open': self._reader_count,
+                'readers_idle': len(self._idle),
+                'max_readers': self.max_readers,
+                'writer_open': self._writer is not None,
+            }
+
+    def close(self):
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._reader_count -= len(idle)
+            self._available.notify_all()
+        for conn in idle:
+            self._discard(conn)
+        with self._writer_lock:
+            if self._writer is not None:
+                self._discard(self._writer)
+                self._writer = None
@@ -1,4 +1,5 @@
 import sqlite3
+from migrations import apply_migrations
 
 DATABASE_NAME = 'transport_app.db'
 
@@ -138,6 +139,8 @@ def setup_database():
         conn = sqlite3.connect(DATABASE_NAME)
         create_tables(conn)
         print(f"Database '{DATABASE_NAME}' tables created successfully.")
+        for version, description in apply_migrations(conn):
+            print(f"Applied migration {version}: {description}")
     except sqlite3.Error as e:
         print(f"Database error: {e}")
     finally:
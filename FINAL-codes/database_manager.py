@@ -1,6 +1,64 @@
 import sqlite3
+import threading
+import time
+from itertools import chain, islice
+from contextlib import contextmanager
+from connection_pool import ConnectionPool
+from migrations import RATING_BUCKETS, apply_migrations, rebuild_rating_stats
+from query_stats import QueryStats
+from fare_matrix import FareMatrix
+from partitions import PartitionManager
+from query_cache import QueryCache, cached_query, written_table
+from write_queue import WriteQueue
+from id_generator import new_transaction_id
 
 DATABASE_NAME = 'transport_app.db'
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PAGE_SIZE = 200
+DEFAULT_CHUNK_SIZE = 1000
+
+TRANSACTIONS_QUERY = """
+    SELECT t.*, t.rowid AS row_id, c.commuter_id, r.origin, r.destination, v.plate_no, k.conductor_id
+    FROM transactions t
+    LEFT JOIN commuters c ON t.commuter_id = c.commuter_id
+    LEFT JOIN routes r ON t.route_id = r.route_id
+    LEFT JOIN vehicles v ON t.vehicle_id = v.vehicle_id
+    LEFT JOIN conductors k ON t.conductor_id = k.conductor_id
+"""
+
+# Same shape as TRANSACTIONS_QUERY over live rows plus archived monthly partitions
+HISTORY_TRANSACTIONS_QUERY = """
+    SELECT t.*, c.commuter_id, r.origin, r.destination, v.plate_no, k.conductor_id
+    FROM transactions_history t
+    LEFT JOIN commuters c ON t.commuter_id = c.commuter_id
+    LEFT JOIN routes r ON t.route_id = r.route_id
+    LEFT JOIN vehicles v ON t.vehicle_id = v.vehicle_id
+    LEFT JOIN conductors k ON t.conductor_id = k.conductor_id
+"""
+
+COMMUTER_TRANSACTIONS_QUERY = """
+    SELECT t.*, r.origin, r.destination, v.plate_no, k.conductor_id
+    FROM {table} t
+    LEFT JOIN routes r ON t.route_id = r.route_id
+    LEFT JOIN vehicles v ON t.vehicle_id = v.vehicle_id
+    LEFT JOIN conductors k ON t.conductor_id = k.conductor_id
+    WHERE t.commuter_id = ?
+"""
+
+FEEDBACKS_QUERY = """
+    SELECT f.*, c.commuter_id, d.driver_id, k.conductor_id
+    FROM feedbacks f
+    LEFT JOIN commuters c ON f.commuter_id = c.commuter_id
+    LEFT JOIN drivers d ON f.driver_id = d.driver_id
+    LEFT JOIN conductors k ON f.conductor_id = k.conductor_id
+"""
+
+CONDUCTOR_TRANSACTIONS_PAGE_QUERY = """
+    SELECT t.transaction_id, t.commuter_id, t.route_id AS Route, v.plate_no AS "Vehicle Plate", t.total_fare, t.transaction_date AS Date, t.rowid AS row_id
+    FROM transactions t
+    LEFT JOIN vehicles v ON t.vehicle_id = v.vehicle_id
+    WHERE t.conductor_id = ?
+"""
 
 class DatabaseManager:
     _instance = None
@@ -10,76 +68,351 @@ class DatabaseManager:
             cls._instance = super(DatabaseManager, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self, database_name=DATABASE_NAME):
+    def __init__(self, database_name=DATABASE_NAME, max_readers=8, slow_query_ms=200, slow_log_path=None,
+                 explain_slow=False, max_slow_entries=200,
+                 cache_entries=256, cache_bytes=8 * 1024 * 1024, cache_ttl=300.0,
+                 queue_writes=True, write_batch=256, write_latency=0.002):
+        if getattr(self, '_initialized', False):
+            return
         self.database_name = database_name
+        self.max_readers = max_readers
+        self.stats = QueryStats(
+            slow_threshold_ms=slow_query_ms, slow_log_path=slow_log_path,
+            explain_slow=explain_slow, max_slow_entries=max_slow_entries
+        )
+        self.query_cache = QueryCache(max_entries=cache_entries, max_bytes=cache_bytes, default_ttl=cache_ttl)
+        self.queue_writes = queue_writes
+        self.write_queue = WriteQueue(self, max_batch=write_batch, max_latency=write_latency)
+        self.pool = None
         self.conn = None
+        self._tx_thread = None
+        self._fare_matrix = None
+        self._route_graph = None
+        self._revenue_rollup = None
+        self._partition_manager = None
+        self._change_notifier = None
+        self._ticket_journal = None
+        self._initialized = True
 
     def connect(self):
         try:
-            self.conn = sqlite3.connect(self.database_name)
-            self.conn.row_factory = sqlite3.Row
-            self.conn.execute("PRAGMA foreign_keys = ON")
-            self.conn.execute("PRAGMA journal_mode = WAL")
+            if self.pool is None:
+                self.pool = ConnectionPool(self.database_name, max_readers=self.max_readers)
+            self.conn = self.pool.writer_connection()
+            self.upgrade_schema()
+            self.query_cache.bind(self.database_name)
+            if self.queue_writes:
+                self.write_queue.start()
             return True
         except sqlite3.Error as e:
             print(f"Connection error: {e}")
+            self.pool = None
             return False
 
+    def upgrade_schema(self):
+        with self.write_connection() as conn:
+            try:
+                return apply_migrations(conn)
+            except sqlite3.Error as e:
+                print(f"Migration error: {e}")
+                return []
+
     def close(self):
-        if self.conn:
-            self.conn.close()
-            self.conn = None
+        if self._ticket_journal is not None:
+            self._ticket_journal.close()
+            self._ticket_journal = None
+        self.write_queue.stop()
+        if self.pool:
+            self.pool.close()
+            self.pool = None
+        if self._change_notifier is not None:
+            self._change_notifier.close()
+            self._change_notifier = None
+        self.query_cache.unbind()
+        self.conn = None
+        self._tx_thread = None
+        self._fare_matrix = None
+        self._route_graph = None
+        self._revenue_rollup = None
+        self._partition_manager = None
+
+    def use_database(self, database_name):
+        """Points the shared manager at another database file, e.g. for tools and benchmarks"""
+        self.close()
+        self.database_name = database_name
+        return self.connect()
 
     def ensure_connection(self):
-        if not self.conn:
+        if not self.pool:
             return self.connect()
         return True
 
+    @contextmanager
+    def read_connection(self):
+        """Reader from the pool, or the writer while this thread has a transaction open"""
+        if self._tx_thread == threading.get_ident():
+            with self.pool.writer() as conn:
+                yield conn
+        else:
+            with self.pool.reader() as conn:
+                yield conn
+
+    @contextmanager
+    def private_read_connection(self):
+        """Reader of its own, never shared with nested reads; it does not see this thread's open transaction"""
+        with self.pool.private_reader() as conn:
+            yield conn
+
+    @contextmanager
+    def write_connection(self):
+        started = time.perf_counter()
+        with self.pool.writer() as conn:
+            self.stats.record_lock_wait(time.perf_counter() - started)
+            yield conn
+
+    def get_query_stats(self):
+        return self.stats.snapshot()
+
+    def get_write_queue_stats(self):
+        return self.write_queue.stats()
+
+    def get_cache_stats(self):
+        return self.query_cache.stats()
+
+    def invalidate_cache(self, *tables):
+        """Drops cached reads of the given tables, or everything when none are named"""
+        if tables:
+            self.query_cache.invalidate_tables([t.lower() for t in tables])
+        else:
+            self.query_cache.clear()
+
+    def export_query_stats(self, path):
+        self.stats.export_json(path)
+
     def execute_query(self, query, params=None):
         if not self.ensure_connection():
             return None
+        started = time.perf_counter()
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(query, params or ())
-            return cursor.fetchall()
+            with self.read_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params or ())
+                rows = cursor.fetchall()
+                self.stats.record(query, time.perf_counter() - started, rows=len(rows), conn=conn, params=params)
+                return rows
         except sqlite3.Error as e:
+            self.stats.record(query, time.perf_counter() - started, error=e)
             print(f"Database query error: {e}")
             return None
 
-    def execute_insert_update_delete(self, query, params=None, commit=True):
+    def iter_query(self, query, params=None, batch_size=DEFAULT_BATCH_SIZE):
+        """Yields rows in fetchmany batches so large results are never fully materialized"""
         if not self.ensure_connection():
-            return False
+            return
+        started = time.perf_counter()
+        count = 0
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(query, params or ())
-            if commit:
-                self.conn.commit()
-            return True
+            with self.read_connection() as conn:
+                cursor = conn.cursor()
+                cursor.arraysize = batch_size
+                cursor.execute(query, params or ())
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    count += len(rows)
+                    yield from rows
+                self.stats.record(query, time.perf_counter() - started, rows=count, conn=conn, params=params)
         except sqlite3.Error as e:
-            print(f"Database modification error: {e}")
-            if commit:
-                self.conn.rollback()
+            self.stats.record(query, time.perf_counter() - started, rows=count, error=e)
+            print(f"Database query error: {e}")
+
+    def execute_insert_update_delete(self, query, params=None, commit=True):
+        if not self.ensure_connection():
             return False
+        # Autocommit writes go through the group-commit queue; a thread that already holds the
+        # writer (an open transaction, commit=False batches) must write directly or it would wait on itself
+        if commit and self.write_queue.is_running() and not self.pool.owns_writer():
+            try:
+                self.write_queue.execute(query, params)
+                return True
+            except sqlite3.Error as e:
+                print(f"Database modification error: {e}")
+                return False
+        with self.write_connection() as conn:
+            started = time.perf_counter()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(query, params or ())
+                if commit:
+                    conn.commit()
+                self.stats.record(query, time.perf_counter() - started, rows=max(cursor.rowcount, 0))
+                table = written_table(query)
+                if table:
+                    self.query_cache.invalidate_tables([table])
+                else:
+                    self.query_cache.clear()
+                return True
+            except sqlite3.Error as e:
+                self.stats.record(query, time.perf_counter() - started, error=e)
+                print(f"Database modification error: {e}")
+                if commit:
+                    conn.rollback()
+                return False
+
+    def _table_columns(self, conn, table):
+        columns = [row['name'] for row in conn.execute("SELECT name FROM pragma_table_info(?)", (table,))]
+        if not columns:
+            raise ValueError(f"Unknown table: {table}")
+        return columns
+
+    def _prepare_bulk_rows(self, conn, table, rows, columns):
+        """Validates identifiers against the schema and normalizes rows to tuples"""
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return columns or [], iter(())
+        if columns is None:
+            if not hasattr(first, 'keys'):
+                raise ValueError("columns is required when rows are sequences")
+            columns = list(first.keys())
+        unknown = set(columns) - set(self._table_columns(conn, table))
+        if unknown:
+            raise ValueError(f"Unknown column(s) for {table}: {', '.join(sorted(unknown))}")
+        if hasattr(first, 'keys'):
+            values = (tuple(row[c] for c in columns) for row in chain([first], rows))
+        else:
+            values = (tuple(row) for row in chain([first], rows))
+        return columns, values
+
+    def _bulk_write(self, table, rows, columns, chunk_size, build_statement):
+        """Streams rows through executemany, committing one chunk at a time"""
+        result = {'rows': 0, 'chunks': 0, 'errors': []}
+        if not self.ensure_connection():
+            result['errors'].append((0, "No database connection"))
+            return result
+        with self.write_connection() as conn:
+            columns, values = self._prepare_bulk_rows(conn, table, rows, columns)
+            statement, reorder = build_statement(columns)
+        in_caller_transaction = self._tx_thread == threading.get_ident()
+        chunk_index = 0
+        while True:
+            chunk = list(islice(values, chunk_size))
+            if not chunk:
+                break
+            if reorder:
+                chunk = [reorder(row) for row in chunk]
+            with self.write_connection() as conn:
+                started = time.perf_counter()
+                try:
+                    conn.execute("SAVEPOINT bulk_chunk")
+                    conn.executemany(statement, chunk)
+                    conn.execute("RELEASE bulk_chunk")
+                    if not in_caller_transaction:
+                        conn.commit()
+                    self.stats.record(statement, time.perf_counter() - started, rows=len(chunk))
+                    result['rows'] += len(chunk)
+                except sqlite3.Error as e:
+                    self.stats.record(statement, time.perf_counter() - started, error=e)
+                    print(f"Bulk write error in {table} chunk {chunk_index}: {e}")
+                    conn.execute("ROLLBACK TO bulk_chunk")
+                    conn.execute("RELEASE bulk_chunk")
+                    if not in_caller_transaction:
+                        conn.commit()
+                    result['errors'].append((chunk_index, str(e)))
+            result['chunks'] += 1
+            chunk_index += 1
+        self.query_cache.invalidate_tables([table.lower()])
+        return result
+
+    def bulk_insert(self, table, rows, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Inserts dicts (or sequences matching columns) in chunked, single-commit batches"""
+        def build(cols):
+            placeholders = ", ".join("?" for _ in cols)
+            return f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({placeholders})", None
+        return self._bulk_write(table, rows, columns, chunk_size, build)
+
+    def bulk_upsert(self, table, rows, key_columns, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Inserts rows, updating non-key columns where key_columns already match a unique key"""
+        def build(cols):
+            missing = set(key_columns) - set(cols)
+            if missing:
+                raise ValueError(f"Key column(s) missing from rows: {', '.join(sorted(missing))}")
+            placeholders = ", ".join("?" for _ in cols)
+            updates = [c for c in cols if c not in key_columns]
+            if updates:
+                action = "DO UPDATE SET " + ", ".join(f"{c} = excluded.{c}" for c in updates)
+            else:
+                action = "DO NOTHING"
+            return (
+                f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({placeholders}) "
+                f"ON CONFLICT ({', '.join(key_columns)}) {action}"
+            ), None
+        return self._bulk_write(table, rows, columns, chunk_size, build)
+
+    def bulk_update(self, table, rows, key_columns, columns=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Updates non-key columns of the rows matched by key_columns"""
+        def build(cols):
+            missing = set(key_columns) - set(cols)
+            if missing:
+                raise ValueError(f"Key column(s) missing from rows: {', '.join(sorted(missing))}")
+            updates = [c for c in cols if c not in key_columns]
+            if not updates:
+                raise ValueError("bulk_update needs at least one non-key column")
+            order = [cols.index(c) for c in updates + list(key_columns)]
+            statement = (
+                f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in updates)} "
+                f"WHERE {' AND '.join(f'{c} = ?' for c in key_columns)}"
+            )
+            return statement, lambda row: tuple(row[i] for i in order)
+        return self._bulk_write(table, rows, columns, chunk_size, build)
 
     def begin_transaction(self):
         self.ensure_connection()
-        self.conn.execute("BEGIN TRANSACTION")
+        started = time.perf_counter()
+        self.conn = self.pool.acquire_writer()
+        self.stats.record_lock_wait(time.perf_counter() - started)
+        try:
+            self.conn.execute("BEGIN TRANSACTION")
+        except sqlite3.Error as e:
+            self.stats.record("BEGIN TRANSACTION", time.perf_counter() - started, error=e)
+            self.pool.release_writer()
+            raise
+        self.stats.record("BEGIN TRANSACTION", time.perf_counter() - started)
+        self._tx_thread = threading.get_ident()
+
+    def _end_transaction(self):
+        if self._tx_thread == threading.get_ident():
+            self._tx_thread = None
+            self.pool.release_writer()
 
     def commit_transaction(self):
+        started = time.perf_counter()
         try:
             self.conn.commit()
+            self.stats.record("COMMIT", time.perf_counter() - started)
             print("Transaction committed successfully")
         except sqlite3.Error as e:
+            self.stats.record("COMMIT", time.perf_counter() - started, error=e)
             print(f"Commit error: {e}")
             raise
+        finally:
+            self._end_transaction()
 
     def rollback_transaction(self):
+        started = time.perf_counter()
+        # Reads cached inside the transaction may reflect rows that are about to disappear
+        self.query_cache.clear()
         try:
             self.conn.rollback()
+            self.stats.record("ROLLBACK", time.perf_counter() - started)
             print("Transaction rolled back")
         except sqlite3.Error as e:
+            self.stats.record("ROLLBACK", time.perf_counter() - started, error=e)
             print(f"Rollback error: {e}")
             raise
+        finally:
+            self._end_transaction()
 
     def get_users(self):
         return self.execute_query("SELECT * FROM users")
@@ -102,9 +435,11 @@ class DatabaseManager:
     def get_commuters(self):
         return self.execute_query("SELECT c.*, u.username, u.first_name, u.last_name, u.email FROM commuters c JOIN users u ON c.user_id = u.user_id")
 
+    @cached_query('vehicles')
     def get_vehicles(self):
         return self.execute_query("SELECT * FROM vehicles")
 
+    @cached_query('routes')
     def get_routes(self):
         return self.execute_query("SELECT route_id, origin, destination FROM routes")
 
@@ -112,23 +447,76 @@ class DatabaseManager:
         return self.execute_query("SELECT f.*, r.origin, r.destination FROM fares f JOIN routes r ON f.route_id = r.route_id")
 
     def get_transactions(self):
-        return self.execute_query("""
-            SELECT t.*, c.commuter_id, r.origin, r.destination, v.plate_no, k.conductor_id
-            FROM transactions t
-            LEFT JOIN commuters c ON t.commuter_id = c.commuter_id
-            LEFT JOIN routes r ON t.route_id = r.route_id
-            LEFT JOIN vehicles v ON t.vehicle_id = v.vehicle_id
-            LEFT JOIN conductors k ON t.conductor_id = k.conductor_id
-        """)
+        partitions = self.get_partition_manager()
+        if partitions.has_partitions():
+            return partitions.query_history(HISTORY_TRANSACTIONS_QUERY)
+        return self.execute_query(TRANSACTIONS_QUERY)
+
+    def iter_transactions(self, batch_size=DEFAULT_BATCH_SIZE):
+        partitions = self.get_partition_manager()
+        if partitions.has_partitions():
+            return partitions.iter_history(HISTORY_TRANSACTIONS_QUERY, batch_size=batch_size)
+        return self.iter_query(TRANSACTIONS_QUERY, batch_size=batch_size)
+
+    def get_transactions_page(self, after=None, limit=DEFAULT_PAGE_SIZE):
+        """Keyset page ordered by (transaction_date, rowid); pass the last row's (transaction_date, row_id) as after.
+
+        Once months are archived a row_id can repeat between the live table and a partition, so
+        history pages also order by transaction_id; add the last row's transaction_id to after
+        to break such ties exactly.
+        """
+        partitions = self.get_partition_manager()
+        if partitions.has_partitions():
+            return self._history_transactions_page(partitions, after, limit)
+        if after is None:
+            return self.execute_query(TRANSACTIONS_QUERY + """
+                ORDER BY t.transaction_date, t.rowid
+                LIMIT ?
+            """, (limit,))
+        return self.execute_query(TRANSACTIONS_QUERY + """
+            WHERE (t.transaction_date, t.rowid) > (?, ?)
+            ORDER BY t.transaction_date, t.rowid
+            LIMIT ?
+        """, (after[0], after[1], limit))
+
+    def _history_transactions_page(self, partitions, after, limit):
+        # Partitions are attached in batches that each return their own first page, so the pages are
+        # merged here; months before the key's month cannot hold later rows and are left detached
+        if after is None:
+            rows = partitions.query_history(HISTORY_TRANSACTIONS_QUERY + """
+                ORDER BY t.transaction_date, t.row_id, t.transaction_id
+                LIMIT ?
+            """, (limit,))
+        elif len(after) > 2:
+            rows = partitions.query_history(HISTORY_TRANSACTIONS_QUERY + """
+                WHERE (t.transaction_date, t.row_id, t.transaction_id) > (?, ?, ?)
+                ORDER BY t.transaction_date, t.row_id, t.transaction_id
+                LIMIT ?
+            """, (after[0], after[1], after[2], limit), start_month=str(after[0])[:7])
+        else:
+            rows = partitions.query_history(HISTORY_TRANSACTIONS_QUERY + """
+                WHERE (t.transaction_date, t.row_id) > (?, ?)
+                ORDER BY t.transaction_date, t.row_id, t.transaction_id
+                LIMIT ?
+            """, (after[0], after[1], limit), start_month=str(after[0])[:7])
+        if rows is None:
+            return None
+        rows.sort(key=lambda row: (row['transaction_date'] or '', row['row_id'], row['transaction_id'] or ''))
+        return rows[:limit]
 
     def get_feedbacks(self):
-        return self.execute_query("""
-            SELECT f.*, c.commuter_id, d.driver_id, k.conductor_id
-            FROM feedbacks f
-            LEFT JOIN commuters c ON f.commuter_id = c.commuter_id
-            LEFT JOIN drivers d ON f.driver_id = d.driver_id
-            LEFT JOIN conductors k ON f.conductor_id = k.conductor_id
-        """)
+        return self.execute_query(FEEDBACKS_QUERY)
+
+    def iter_feedbacks(self, batch_size=DEFAULT_BATCH_SIZE):
+        return self.iter_query(FEEDBACKS_QUERY, batch_size=batch_size)
+
+    def get_feedbacks_page(self, after=None, limit=DEFAULT_PAGE_SIZE):
+        """Keyset page ordered by feedback_id; pass the last row's feedback_id as after"""
+        return self.execute_query(FEEDBACKS_QUERY + """
+            WHERE f.feedback_id > ?
+            ORDER BY f.feedback_id
+            LIMIT ?
+        """, (after if after is not None else -1, limit))
 
     def get_commuter_data(self, user_id):
         return self.execute_query("""
@@ -159,14 +547,12 @@ class DatabaseManager:
         """, (user_id,))
 
     def get_commuter_transactions(self, commuter_id):
-        return self.execute_query("""
-            SELECT t.*, r.origin, r.destination, v.plate_no, k.conductor_id
-            FROM transactions t
-            LEFT JOIN routes r ON t.route_id = r.route_id
-            LEFT JOIN vehicles v ON t.vehicle_id = v.vehicle_id
-            LEFT JOIN conductors k ON t.conductor_id = k.conductor_id
-            WHERE t.commuter_id = ?
-        """, (commuter_id,))
+        partitions = self.get_partition_manager()
+        if partitions.has_partitions():
+            return partitions.query_history(
+                COMMUTER_TRANSACTIONS_QUERY.format(table='transactions_history'), (commuter_id,)
+            )
+        return self.execute_query(COMMUTER_TRANSACTIONS_QUERY.format(table='transactions'), (commuter_id,))
 
     def get_driver_feedbacks(self, driver_id):
         return self.execute_query("""
@@ -184,6 +570,67 @@ class DatabaseManager:
             ORDER BY f.feedback_id
         """, (conductor_id,))
 
+    def get_conductor_feedbacks_page(self, conductor_id, after=None, limit=DEFAULT_PAGE_SIZE):
+        """Keyset page ordered by feedback_id; pass the last row's feedback_id as after"""
+        return self.execute_query("""
+            SELECT f.feedback_id, f.commuter_id, f.rating, f.comment, datetime('now') AS feedback_date
+            FROM feedbacks f
+            WHERE f.conductor_id = ? AND f.feedback_id > ?
+            ORDER BY f.feedback_id
+            LIMIT ?
+        """, (conductor_id, after if after is not None else -1, limit))
+
+    def _rating_stats(self, table, key, entity_id=None):
+        query = f"SELECT * FROM {table}"
+        params = ()
+        if entity_id is not None:
+            query += f" WHERE {key} = ?"
+            params = (entity_id,)
+        summaries = []
+        for row in self.execute_query(query + f" ORDER BY {key}", params) or []:
+            count = row['rating_count']
+            average = row['rating_sum'] / count
+            variance = max(row['rating_sum_sq'] / count - average * average, 0.0)
+            summaries.append({
+                key: row[key],
+                'count': count,
+                'average': average,
+                'stddev': variance ** 0.5,
+                'min': row['rating_min'],
+                'max': row['rating_max'],
+                'histogram': [row[f'hist_{b}'] for b in RATING_BUCKETS],
+            })
+        return summaries
+
+    def get_driver_rating_stats(self, driver_id):
+        """Count, average, spread and 0-5 histogram of a driver's ratings, or None if unrated"""
+        result = self._rating_stats('driver_rating_stats', 'driver_id', driver_id)
+        return result[0] if result else None
+
+    def get_conductor_rating_stats(self, conductor_id):
+        result = self._rating_stats('conductor_rating_stats', 'conductor_id', conductor_id)
+        return result[0] if result else None
+
+    def get_driver_rating_summaries(self):
+        return self._rating_stats('driver_rating_stats', 'driver_id')
+
+    def get_conductor_rating_summaries(self):
+        return self._rating_stats('conductor_rating_stats', 'conductor_id')
+
+    def rebuild_rating_stats(self):
+        if not self.ensure_connection():
+            return False
+        with self.write_connection() as conn:
+            try:
+                cursor = conn.cursor()
+                rebuild_rating_stats(cursor)
+                conn.commit()
+                return True
+            except sqlite3.Error as e:
+                print(f"Rating rebuild error: {e}")
+                conn.rollback()
+                return False
+
     def get_conductor_transactions(self, conductor_id):
         return self.execute_query("""
             SELECT t.transaction_id, t.commuter_id, t.route_id AS Route, v.plate_no AS "Vehicle Plate", t.total_fare, t.transaction_date AS Date
@@ -193,6 +640,26 @@ class DatabaseManager:
             ORDER BY t.transaction_date DESC
         """, (conductor_id,))
 
+    def get_conductor_transactions_page(self, conductor_id, before=None, limit=DEFAULT_PAGE_SIZE):
+        """Newest-first keyset page; pass the last row's (Date, row_id) as before"""
+        if before is None:
+            return self.execute_query(CONDUCTOR_TRANSACTIONS_PAGE_QUERY + """
+                ORDER BY t.transaction_date DESC, t.rowid DESC
+                LIMIT ?
+            """, (conductor_id, limit))
+        return self.execute_query(CONDUCTOR_TRANSACTIONS_PAGE_QUERY + """
+                AND (t.transaction_date, t.rowid) < (?, ?)
+            ORDER BY t.transaction_date DESC, t.rowid DESC
+            LIMIT ?
+        """, (conductor_id, before[0], before[1], limit))
+
+    def get_conductor_transactions_since(self, conductor_id, after):
+        """Transactions newer than the (Date, row_id) high-water mark, newest first"""
+        return self.execute_query(CONDUCTOR_TRANSACTIONS_PAGE_QUERY + """
+                AND (t.transaction_date, t.rowid) > (?, ?)
+            ORDER BY t.transaction_date DESC, t.rowid DESC
+        """, (conductor_id, after[0], after[1]))
+
     def get_vehicle_id_by_plate(self, plate_no):
         result = self.execute_query(
             "SELECT vehicle_id FROM vehicles WHERE LOWER(plate_no) = LOWER(?)",
@@ -217,18 +684,23 @@ class DatabaseManager:
     def get_all_commuter_ids(self):
         return self.execute_query("SELECT commuter_id FROM commuters")
 
+    @cached_query('drivers')
     def get_all_driver_ids(self):
         return self.execute_query("SELECT driver_id FROM drivers")
 
+    @cached_query('conductors')
     def get_all_conductor_ids(self):
         return self.execute_query("SELECT conductor_id FROM conductors")
 
+    @cached_query('vehicles')
     def get_all_vehicle_ids(self):
         return self.execute_query("SELECT vehicle_id FROM vehicles")
 
+    @cached_query('routes')
     def get_all_route_ids(self):
         return self.execute_query("SELECT route_id, origin || ' to ' || destination AS route_desc FROM routes")
 
+    @cached_query('fares')
     def get_all_fare_ids(self):
         return self.execute_query("SELECT fare_id FROM fares")
 
@@ -254,16 +726,13 @@ class DatabaseManager:
         return result[0]['conductor_id'] if result else None
 
     def get_commuter_by_username(self, username):
-        if not self.ensure_connection():
-            return None
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        result = self.execute_query("""
             SELECT c.*, u.password, 'Commuter' AS user_type
             FROM commuters c
             JOIN users u ON c.user_id = u.user_id
             WHERE u.username = ?
         """, (username,))
-        return cursor.fetchone()
+        return result[0] if result else None
 
     def get_commuter_feedbacks(self, commuter_id):
         return self.execute_query("""
@@ -273,39 +742,66 @@ class DatabaseManager:
             ORDER BY f.feedback_id DESC
         """, (commuter_id,))
 
+    def get_commuter_feedbacks_page(self, commuter_id, before=None, limit=DEFAULT_PAGE_SIZE):
+        """Newest-first keyset page; pass the last row's feedback_id as before"""
+        if before is None:
+            return self.execute_query("""
+                SELECT f.feedback_id, f.driver_id, f.conductor_id, f.rating, f.comment, datetime('now') AS date
+                FROM feedbacks f
+                WHERE f.commuter_id = ?
+                ORDER BY f.feedback_id DESC
+                LIMIT ?
+            """, (commuter_id, limit))
+        return self.execute_query("""
+            SELECT f.feedback_id, f.driver_id, f.conductor_id, f.rating, f.comment, datetime('now') AS date
+            FROM feedbacks f
+            WHERE f.commuter_id = ? AND f.feedback_id < ?
+            ORDER BY f.feedback_id DESC
+            LIMIT ?
+        """, (commuter_id, before, limit))
+
+    def get_commuter_feedbacks_since(self, commuter_id, after):
+        """Feedback newer than the feedback_id high-water mark, newest first"""
+        return self.execute_query("""
+            SELECT f.feedback_id, f.driver_id, f.conductor_id, f.rating, f.comment, datetime('now') AS date
+            FROM feedbacks f
+            WHERE f.commuter_id = ? AND f.feedback_id > ?
+            ORDER BY f.feedback_id DESC
+        """, (commuter_id, after))
+
     def get_driver_by_username(self, username):
-        if not self.ensure_connection():
-            return None
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        result = self.execute_query("""
             SELECT d.*, u.password, 'Driver' AS user_type
             FROM drivers d
             JOIN users u ON d.user_id = u.user_id
             WHERE u.username = ?
         """, (username,))
-        return cursor.fetchone()
+        return result[0] if result else None
 
     def insert_commuter(self, username, password, first_name, last_name, email):
-        cursor = self.conn.cursor()
-        try:
-            cursor.execute('''
-                INSERT INTO users
-                (username, password, first_name, last_name, email, user_type)
-                VALUES (?, ?, ?, ?, ?, 'Commuter')
-            ''', (username, password, first_name, last_name, email))
-            user_id = cursor.lastrowid
-            cursor.execute('''
-                INSERT INTO commuters (user_id)
-                VALUES (?)
-            ''', (user_id,))
-            self.conn.commit()
-            return user_id
-        except sqlite3.IntegrityError:
-            raise ValueError("Username already exists")
+        self.ensure_connection()
+        with self.write_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('''
+                    INSERT INTO users
+                    (username, password, first_name, last_name, email, user_type)
+                    VALUES (?, ?, ?, ?, ?, 'Commuter')
+                ''', (username, password, first_name, last_name, email))
+                user_id = cursor.lastrowid
+                cursor.execute('''
+                    INSERT INTO commuters (user_id)
+                    VALUES (?)
+                ''', (user_id,))
+                conn.commit()
+                self.query_cache.invalidate_tables(['users', 'commuters'])
+                return user_id
+            except sqlite3.IntegrityError:
+                conn.rollback()
+                raise ValueError("Username already exists")
 
     def authenticate_user(self, username, password):
-        cursor = self.conn.cursor()
-        cursor.execute('''
+        result = self.execute_query('''
             SELECT u.*,
                 c.commuter_id, c.contact_no, c.discount_type,
                 d.driver_id, d.license_no,
@@ -318,9 +814,76 @@ class DatabaseManager:
             LEFT JOIN admins a ON u.user_id = a.user_id
             WHERE u.username = ? AND u.password = ?
         ''', (username, password))
-        user = cursor.fetchone()
-        return dict(user) if user else None
+        return dict(result[0]) if result else None
+
+    def insert_conductor_transaction(self, commuter_id, route_id, vehicle_id, conductor_id, fare_id, total_fare):
+        return self.execute_insert_update_delete(
+            """INSERT INTO transactions (
+                transaction_id, commuter_id, route_id,
+                vehicle_id, conductor_id, fare_id, total_fare, transaction_date
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))""",
+            (new_transaction_id(), commuter_id, route_id, vehicle_id, conductor_id, fare_id, total_fare)
+        )
+
+    def get_fare_matrix(self):
+        """Shared in-memory fare matrix, built on first use and refreshed when routes or fares change"""
+        if self._fare_matrix is None:
+            self._fare_matrix = FareMatrix(self)
+        return self._fare_matrix
+
+    def get_route_graph(self):
+        """Shared route network with precomputed shortest paths for trips no single route covers"""
+        if self._route_graph is None:
+            from route_graph import RouteGraph
+            self._route_graph = RouteGraph(self)
+        return self._route_graph
+
+    def get_partition_manager(self):
+        """Monthly transaction partitions; history reads attach them only once any exist"""
+        if self._partition_manager is None:
+            self._partition_manager = PartitionManager(self)
+        return self._partition_manager
+
+    def get_change_notifier(self):
+        """Shared change_log notifier; the query cache is its first subscriber"""
+        if self._change_notifier is None:
+            from change_notifier import ChangeNotifier
+            self._change_notifier = ChangeNotifier(self)
+            self._change_notifier.subscribe(
+                lambda events: self.query_cache.invalidate_tables({e.table for e in events})
+            )
+        return self._change_notifier
+
+    def prune_change_log(self, retain=None):
+        """Trims change_log to its newest retain entries (change_notifier.DEFAULT_RETAIN by default),
+        never past what this process's notifier has yet to read"""
+        from change_notifier import DEFAULT_RETAIN, NO_CURSOR, PRUNE_CHANGE_LOG_QUERY
+        notifier = self._change_notifier
+        cursor = notifier.cursor if notifier is not None and notifier.cursor is not None else NO_CURSOR
+        return self.execute_insert_update_delete(
+            PRUNE_CHANGE_LOG_QUERY, (DEFAULT_RETAIN if retain is None else retain, cursor)
+        )
 
+    def get_revenue_rollup(self):
+        """Shared revenue rollup; every report first folds in transactions past its watermark"""
+        if self._revenue_rollup is None:
+            from revenue_rollup import RevenueRollup
+            self._revenue_rollup = RevenueRollup(self)
+        return self._revenue_rollup
+
+    def get_ticket_journal(self):
+        """This device's offline ticket journal; tickets land here first and sync in batches"""
+        if self._ticket_journal is None:
+            from ticket_journal import TicketJournal, journal_path
+            self._ticket_journal = TicketJournal(self, journal_path(self.database_name))
+        return self._ticket_journal
+
+    def get_fare_repricer(self):
+        """Bulk fare repricing from a distance formula, with undo snapshots"""
+        from fare_repricing import FareRepricer
+        return FareRepricer(self)
+
+    @cached_query('fares', 'routes')
     def get_fares_with_routes(self):
         return self.execute_query("""
             SELECT
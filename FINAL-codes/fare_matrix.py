@@ -0,0 +1,119 @@
+import math
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from collections import namedtuple
+from migrations import get_table_versions
+
+FareQuote = namedtuple('FareQuote', ['route_id', 'distance', 'price_fare', 'discount_fare'])
+
+FARE_MATRIX_QUERY = '''
+SELECT r.route_id, r.origin, r.destination, r.distance, f.price_fare, f.discount_fare
+FROM routes r
+JOIN fares f ON r.route_id = f.route_id
+ORDER BY f.fare_id
+'''
+
+class FareMatrix:
+    """Sparse stop-by-stop fare table for SQL-free lookups.
+
+    Only stop pairs with a direct route take space: cells maps origin_idx * len(stops) + dest_idx
+    to a slot in flat arrays holding one entry per pair, so memory grows with routes, not stops squared.
+    """
+
+    WATCHED_TABLES = ('routes', 'fares')
+
+    def __init__(self, db_manager, check_interval=2.0):
+        self.db_manager = db_manager
+        self.check_interval = check_interval
+        self.stops = []
+        self.stop_index = {}
+        self.origins = []
+        self.destinations = []
+        self.cells = {}
+        self.route_ids = array('l')
+        self.distances = array('d')
+        self.price_fares = array('d')
+        self.discount_fares = array('d')
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.load()
+
+    def _current_version(self):
+        with self.db_manager.read_connection() as conn:
+            try:
+                versions = get_table_versions(conn, self.WATCHED_TABLES)
+            except sqlite3.Error:
+                return None
+        return tuple(versions.get(t, 0) for t in self.WATCHED_TABLES)
+
+    def load(self):
+        if not self.db_manager.ensure_connection():
+            return
+        version = self._current_version()
+        rows = self.db_manager.execute_query(FARE_MATRIX_QUERY) or []
+        origins = sorted({row['origin'] for row in rows})
+        destinations = sorted({row['destination'] for row in rows})
+        stops = sorted(set(origins) | set(destinations))
+        stop_index = {sys.intern(name): i for i, name in enumerate(stops)}
+        size = len(stops)
+        cells = {}
+        route_ids = array('l')
+        distances = array('d')
+        price_fares = array('d')
+        discount_fares = array('d')
+        for row in rows:
+            cell = stop_index[row['origin']] * size + stop_index[row['destination']]
+            if cell in cells:
+                continue
+            cells[cell] = len(route_ids)
+            route_ids.append(row['route_id'])
+            distances.append(row['distance'] if row['distance'] is not None else math.nan)
+            price_fares.append(row['price_fare'])
+            discount_fares.append(row['discount_fare'] if row['discount_fare'] is not None else row['price_fare'])
+        with self._lock:
+            self.stops = stops
+            self.stop_index = stop_index
+            self.origins = origins
+            self.destinations = destinations
+            self.cells = cells
+            self.route_ids = route_ids
+            self.distances = distances
+            self.price_fares = price_fares
+            self.discount_fares = discount_fares
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def refresh_if_stale(self, force=False):
+        """Reloads when routes or fares changed; checks at most once per check_interval"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        version = self._current_version()
+        if version is None or version != self._version:
+            self.load()
+            return True
+        return False
+
+    def lookup(self, origin, destination):
+        self.refresh_if_stale()
+        with self._lock:
+            size = len(self.stops)
+            i = self.stop_index.get(origin)
+            j = self.stop_index.get(destination)
+            if i is None or j is None:
+                return None
+            slot = self.cells.get(i * size + j)
+            if slot is None:
+                return None
+            return FareQuote(self.route_ids[slot], self.distances[slot], self.price_fares[slot], self.discount_fares[slot])
+
+    def fare_for(self, origin, destination, passenger_type='Regular'):
+        quote = self.lookup(origin, destination)
+        if quote is None:
+            return None
+        return quote.price_fare if passenger_type == 'Regular' else quote.discount_fare
@@ -0,0 +1,146 @@
+from PyQt5.QtWidgets import (
+    QDialog, QFormLayout, QDoubleSpinBox, QComboBox, QHBoxLayout,
+    QPushButton, QMessageBox, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView
+)
+from fare_repricing import FareFormula, ROUNDING_MODES
+
+PREVIEW_LIMIT = 500
+PREVIEW_COLUMNS = ["Fare ID", "Route", "KM", "Price", "New Price", "Discount", "New Discount"]
+
+class FareRepriceDialog(QDialog):
+    """Previews a fare formula against every route, then applies or undoes it in one step"""
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.repricer = db_manager.get_fare_repricer()
+        self.plan = None
+        self.setWindowTitle("Reprice Fares")
+        self.resize(760, 560)
+        self.init_ui()
+
+    def init_ui(self):
+        self.setStyleSheet("background-color: #E3F2FD;")
+        layout = QVBoxLayout()
+        form_layout = QFormLayout()
+        defaults = FareFormula()
+        self.base_fare_input = self._make_spin(defaults.base_fare, 0, 1000, 2)
+        self.base_km_input = self._make_spin(defaults.base_km, 0, 1000, 1)
+        self.per_km_input = self._make_spin(defaults.per_km, 0, 1000, 2)
+        self.discount_input = self._make_spin(defaults.discount_ratio * 100, 0, 100, 1)
+        self.step_input = self._make_spin(defaults.step, 0.01, 100, 2)
+        self.minimum_input = self._make_spin(defaults.minimum_fare, 0, 1000, 2)
+        self.rounding_combo = QComboBox()
+        self.rounding_combo.addItems(ROUNDING_MODES)
+        self.rounding_combo.setStyleSheet("background-color: #BBDEFB;")
+        self.rounding_combo.currentIndexChanged.connect(self.invalidate_preview)
+        form_layout.addRow(self._make_label("Base Fare:"), self.base_fare_input)
+        form_layout.addRow(self._make_label("Base KM:"), self.base_km_input)
+        form_layout.addRow(self._make_label("Per KM:"), self.per_km_input)
+        form_layout.addRow(self._make_label("Discount %:"), self.discount_input)
+        form_layout.addRow(self._make_label("Minimum Fare:"), self.minimum_input)
+        form_layout.addRow(self._make_label("Round To:"), self.step_input)
+        form_layout.addRow(self._make_label("Rounding:"), self.rounding_combo)
+        layout.addLayout(form_layout)
+
+        self.summary_label = QLabel("Preview to see which fares change.")
+        self.summary_label.setStyleSheet("color: #1976D2; font-weight: bold;")
+        layout.addWidget(self.summary_label)
+        self.preview_table = QTableWidget(0, len(PREVIEW_COLUMNS))
+        self.preview_table.setHorizontalHeaderLabels(PREVIEW_COLUMNS)
+        self.preview_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.preview_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.preview_table.setStyleSheet("background-color: white;")
+        layout.addWidget(self.preview_table)
+
+        button_layout = QHBoxLayout()
+        self.preview_button = self._make_button("Preview", self.preview)
+        self.apply_button = self._make_button("Apply", self.apply)
+        self.apply_button.setEnabled(False)
+        self.undo_button = self._make_button("Undo Last Repricing", self.undo)
+        button_layout.addWidget(self.preview_button)
+        button_layout.addWidget(self.apply_button)
+        button_layout.addWidget(self.undo_button)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+    def _make_spin(self, value, minimum, maximum, decimals):
+        spin = QDoubleSpinBox()
+        spin.setDecimals(decimals)
+        spin.setRange(minimum, maximum)
+        spin.setValue(value)
+        spin.setStyleSheet("background-color: #BBDEFB;")
+        spin.valueChanged.connect(self.invalidate_preview)
+        return spin
+
+    def _make_label(self, text):
+        label = QLabel(text)
+        label.setStyleSheet("color: #1976D2; font-weight: bold;")
+        return label
+
+    def _make_button(self, text, handler):
+        button = QPushButton(text)
+        button.setStyleSheet(
+            "QPushButton { background-color: #2196F3; color: white; font-weight: bold; border-radius: 6px; padding: 8px 22px; }"
+            "QPushButton:hover { background-color: #1976D2; }"
+            "QPushButton:disabled { background-color: #90CAF9; }"
+        )
+        button.clicked.connect(handler)
+        return button
+
+    def formula(self):
+        return FareFormula(
+            self.base_fare_input.value(), self.base_km_input.value(), self.per_km_input.value(),
+            self.discount_input.value() / 100.0, self.rounding_combo.currentText(),
+            self.step_input.value(), self.minimum_input.value()
+        )
+
+    def invalidate_preview(self):
+        self.plan = None
+        self.apply_button.setEnabled(False)
+
+    def preview(self):
+        self.plan = self.repricer.preview(self.formula())
+        changes = self.plan.changes(PREVIEW_LIMIT)
+        self.preview_table.setRowCount(len(changes))
+        for row, change in enumerate(changes):
+            values = [
+                str(change.fare_id), f"{change.origin} - {change.destination}", f"{change.distance:g}",
+                f"{change.old_price:.2f}", f"{change.new_price:.2f}",
+                f"{change.old_discount:.2f}", f"{change.new_discount:.2f}",
+            ]
+            for column, value in enumerate(values):
+                self.preview_table.setItem(row, column, QTableWidgetItem(value))
+        summary = self.plan.summary()
+        shown = f" (first {len(changes)} shown)" if summary['changed'] > len(changes) else ""
+        self.summary_label.setText(
+            f"{summary['changed']} of {summary['fares']} fares change{shown}: {summary['increased']} up, "
+            f"{summary['decreased']} down, mean {summary['mean_change']:+.2f} PHP"
+        )
+        self.apply_button.setEnabled(summary['changed'] > 0)
+
+    def apply(self):
+        if self.plan is None:
+            return
+        reply = QMessageBox.question(
+            self, "Apply Fares", f"Update {len(self.plan)} fares? This can be undone.",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        try:
+            self.repricer.apply(self.plan)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Repricing failed:\n{e}")
+            return
+        QMessageBox.information(self, "Success", f"Updated {len(self.plan)} fares")
+        self.preview()
+
+    def undo(self):
+        try:
+            restored = self.repricer.undo()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Undo failed:\n{e}")
+            return
+        QMessageBox.information(self, "Success", f"Restored {restored} fares")
+        self.invalidate_preview()
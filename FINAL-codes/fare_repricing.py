@@ -0,0 +1,244 @@
+import argparse
+import json
+import sqlite3
+from collections import namedtuple
+import numpy as np
+
+DATABASE_NAME = 'transport_app.db'
+# Tolerance when snapping to the rounding step, so 16.75 / 0.01 = 1674.9999 still lands on 16.75
+ROUNDING_EPSILON = 1e-6
+ROUNDING_MODES = ('nearest', 'up', 'down')
+
+# Defaults are the formula behind sampledata.FARES_DATA: 15.00 for the first 4 km, 2.20 per km after,
+# 20% discount (only Anonas -> Cainta, priced like the 6.6 km trip, differs)
+FareFormula = namedtuple(
+    'FareFormula',
+    ['base_fare', 'base_km', 'per_km', 'discount_ratio', 'rounding', 'step', 'minimum_fare'],
+    defaults=(15.0, 4.0, 2.2, 0.2, 'nearest', 0.01, 0.0)
+)
+FareChange = namedtuple(
+    'FareChange',
+    ['fare_id', 'route_id', 'origin', 'destination', 'distance',
+     'old_price', 'new_price', 'old_discount', 'new_discount']
+)
+
+REPRICE_SOURCE_QUERY = '''
+SELECT f.fare_id, f.route_id, r.origin, r.destination, r.distance, f.price_fare,
+    COALESCE(f.discount_fare, f.price_fare) AS discount_fare
+FROM fares f
+JOIN routes r ON f.route_id = r.route_id
+ORDER BY f.fare_id
+'''
+
+def round_fares(values, step=0.01, rounding='nearest'):
+    """Snaps fares to multiples of step (half-up for 'nearest') and trims float noise to cents"""
+    if rounding not in ROUNDING_MODES:
+        raise ValueError(f"rounding must be one of {', '.join(ROUNDING_MODES)}")
+    units = np.asarray(values, dtype=np.float64) / step
+    if rounding == 'nearest':
+        units = np.floor(units + 0.5 + ROUNDING_EPSILON)
+    elif rounding == 'up':
+        units = np.ceil(units - ROUNDING_EPSILON)
+    else:
+        units = np.floor(units + ROUNDING_EPSILON)
+    return np.round(units * step, 2)
+
+def compute_fares(formula, distances):
+    """(price_fare, discount_fare) arrays for every distance in one vectorized pass"""
+    distances = np.nan_to_num(np.asarray(distances, dtype=np.float64))
+    price = formula.base_fare + np.maximum(distances - formula.base_km, 0.0) * formula.per_km
+    price = round_fares(np.maximum(price, formula.minimum_fare), formula.step, formula.rounding)
+    discount = round_fares(price * (1.0 - formula.discount_ratio), formula.step, formula.rounding)
+    return price, discount
+
+class RepricePlan:
+    """Old and new fares for every route under one formula; nothing is written until applied"""
+
+    def __init__(self, formula, rows):
+        self.formula = formula
+        self.rows = rows
+        self.fare_ids = np.array([row['fare_id'] for row in rows], dtype=np.int64)
+        self.distances = np.array([row['distance'] or 0.0 for row in rows], dtype=np.float64)
+        self.old_price = np.array([row['price_fare'] for row in rows], dtype=np.float64)
+        self.old_discount = np.array([row['discount_fare'] for row in rows], dtype=np.float64)
+        self.new_price, self.new_discount = compute_fares(formula, self.distances)
+        self.changed = ~(np.isclose(self.old_price, self.new_price) & np.isclose(self.old_discount, self.new_discount))
+
+    def __len__(self):
+        return int(self.changed.sum())
+
+    def changes(self, limit=None):
+        """FareChange rows for the fares this plan would modify, in fare_id order"""
+        indexes = np.flatnonzero(self.changed)
+        if limit is not None:
+            indexes = indexes[:limit]
+        return [
+            FareChange(
+                int(self.fare_ids[i]), self.rows[i]['route_id'], self.rows[i]['origin'], self.rows[i]['destination'],
+                float(self.distances[i]), float(self.old_price[i]), float(self.new_price[i]),
+                float(self.old_discount[i]), float(self.new_discount[i])
+            )
+            for i in indexes
+        ]
+
+    def summary(self):
+        delta = (self.new_price - self.old_price)[self.changed]
+        return {
+            'fares': len(self.rows),
+            'changed': len(delta),
+            'increased': int((delta > 0).sum()),
+            'decreased': int((delta < 0).sum()),
+            'mean_change': float(delta.mean()) if len(delta) else 0.0,
+            'max_increase': float(max(delta.max(), 0.0)) if len(delta) else 0.0,
+            'max_decrease': float(min(delta.min(), 0.0)) if len(delta) else 0.0,
+        }
+
+class FareRepricer:
+    """Recomputes every route's fares from a formula and applies them as one undoable change.
+
+    apply() snapshots the current fares into fare_snapshot_rows and updates them in the same
+    transaction, so either both land or neither does; undo() restores a snapshot the same way.
+    Snapshots also keep the fares that were applied, and undo() refuses when the live fares
+    no longer match them, just as apply() refuses a stale preview.
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def preview(self, formula=None):
+        rows = self.db_manager.execute_query(REPRICE_SOURCE_QUERY) or []
+        return RepricePlan(formula or FareFormula(), rows)
+
+    def apply(self, plan):
+        """Writes a previewed plan; returns the snapshot id to undo it, or None if nothing changed"""
+        indexes = np.flatnonzero(plan.changed)
+        if len(indexes) == 0:
+            return None
+        fare_ids = [int(plan.fare_ids[i]) for i in indexes]
+        batch = json.dumps(fare_ids)
+        db = self.db_manager
+        db.begin_transaction()
+        try:
+            current = {
+                row[0]: (row[1], row[2]) for row in db.conn.execute(
+                    "SELECT fare_id, price_fare, COALESCE(discount_fare, price_fare) FROM fares "
+                    "WHERE fare_id IN (SELECT value FROM json_each(?))", (batch,)
+                )
+            }
+            for i in indexes:
+                live = current.get(int(plan.fare_ids[i]))
+                if live is None or not np.allclose(live, (plan.old_price[i], plan.old_discount[i])):
+                    raise ValueError("Fares changed since the preview was taken; preview again")
+            cursor = db.conn.execute(
+                "INSERT INTO fare_snapshots (formula, fare_count, created_at) VALUES (?, ?, datetime('now'))",
+                (json.dumps(plan.formula._asdict()), len(fare_ids))
+            )
+            snapshot_id = cursor.lastrowid
+            db.conn.execute('''
+                INSERT INTO fare_snapshot_rows (snapshot_id, fare_id, price_fare, discount_fare)
+                SELECT ?, fare_id, price_fare, discount_fare FROM fares
+                WHERE fare_id IN (SELECT value FROM json_each(?))
+            ''', (snapshot_id, batch))
+            new_fares = [(float(plan.new_price[i]), float(plan.new_discount[i]), int(plan.fare_ids[i])) for i in indexes]
+            db.conn.executemany(
+                "UPDATE fare_snapshot_rows SET new_price_fare = ?, new_discount_fare = ? WHERE snapshot_id = ? AND fare_id = ?",
+                [(price, discount, snapshot_id, fare_id) for price, discount, fare_id in new_fares]
+            )
+            db.conn.executemany("UPDATE fares SET price_fare = ?, discount_fare = ? WHERE fare_id = ?", new_fares)
+            db.commit_transaction()
+        except (sqlite3.Error, ValueError):
+            db.rollback_transaction()
+            raise
+        db.invalidate_cache('fares')
+        return snapshot_id
+
+    def snapshots(self):
+        return [dict(row) for row in self.db_manager.execute_query(
+            "SELECT snapshot_id, formula, fare_count, created_at, restored_at FROM fare_snapshots ORDER BY snapshot_id DESC"
+        ) or []]
+
+    def undo(self, snapshot_id=None):
+        """Restores the fares saved by a snapshot (the latest one by default); returns rows restored.
+
+        Snapshots must be undone newest first, otherwise an older restore would silently
+        overwrite fares a later repricing set.
+        """
+        pending = [s for s in self.snapshots() if s['restored_at'] is None]
+        if not pending:
+            raise ValueError("No repricing to undo")
+        if snapshot_id is None:
+            snapshot_id = pending[0]['snapshot_id']
+        elif snapshot_id != pending[0]['snapshot_id']:
+            raise ValueError(f"Undo snapshot {pending[0]['snapshot_id']} first")
+        db = self.db_manager
+        db.begin_transaction()
+        try:
+            changed = db.conn.execute('''
+                SELECT COUNT(*) FROM fare_snapshot_rows s
+                JOIN fares f ON f.fare_id = s.fare_id
+                WHERE s.snapshot_id = ? AND s.new_price_fare IS NOT NULL AND (
+                    ABS(f.price_fare - s.new_price_fare) > ?
+                    OR ABS(COALESCE(f.discount_fare, f.price_fare) - s.new_discount_fare) > ?
+                )
+            ''', (snapshot_id, ROUNDING_EPSILON, ROUNDING_EPSILON)).fetchone()[0]
+            if changed:
+                raise ValueError(f"Fares changed since snapshot {snapshot_id} was applied ({changed} edited); "
+                                 "undo would overwrite them")
+            cursor = db.conn.execute('''
+                UPDATE fares SET price_fare = s.price_fare, discount_fare = s.discount_fare
+                FROM fare_snapshot_rows s
+                WHERE s.snapshot_id = ? AND fares.fare_id = s.fare_id
+            ''', (snapshot_id,))
+            restored = cursor.rowcount
+            db.conn.execute(
+                "UPDATE fare_snapshots SET restored_at = datetime('now') WHERE snapshot_id = ?", (snapshot_id,)
+            )
+            db.commit_transaction()
+        except (sqlite3.Error, ValueError):
+            db.rollback_transaction()
+            raise
+        db.invalidate_cache('fares')
+        return restored
+
+def main(argv=None):
+    from database_manager import DatabaseManager
+    defaults = FareFormula()
+    parser = argparse.ArgumentParser(description="Reprice every route's fares from a distance formula.")
+    parser.add_argument('--database', default=DATABASE_NAME)
+    parser.add_argument('--base-fare', type=float, default=defaults.base_fare)
+    parser.add_argument('--base-km', type=float, default=defaults.base_km, help="distance covered by the base fare")
+    parser.add_argument('--per-km', type=float, default=defaults.per_km)
+    parser.add_argument('--discount-ratio', type=float, default=defaults.discount_ratio)
+    parser.add_argument('--rounding', choices=ROUNDING_MODES, default=defaults.rounding)
+    parser.add_argument('--step', type=float, default=defaults.step, help="round fares to multiples of this")
+    parser.add_argument('--minimum-fare', type=float, default=defaults.minimum_fare)
+    parser.add_argument('--limit', type=int, default=20, help="changed fares to list in the preview")
+    parser.add_argument('--apply', action='store_true', help="write the new fares (default is preview only)")
+    parser.add_argument('--undo', action='store_true', help="restore the fares before the latest repricing")
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager()
+    if not db.use_database(args.database):
+        raise SystemExit(f"Could not open {args.database}")
+    repricer = FareRepricer(db)
+    if args.undo:
+        print(f"Restored {repricer.undo()} fares")
+        db.close()
+        return
+    formula = FareFormula(args.base_fare, args.base_km, args.per_km, args.discount_ratio,
+                          args.rounding, args.step, args.minimum_fare)
+    plan = repricer.preview(formula)
+    for change in plan.changes(args.limit):
+        print(f"{change.fare_id:>6} {change.origin} -> {change.destination} ({change.distance:g} km): "
+              f"{change.old_price:.2f} -> {change.new_price:.2f}, discount {change.old_discount:.2f} -> {change.new_discount:.2f}")
+    summary = plan.summary()
+    print(f"{summary['changed']} of {summary['fares']} fares change ({summary['increased']} up, "
+          f"{summary['decreased']} down, mean {summary['mean_change']:+.2f})")
+    if args.apply:
+        snapshot_id = repricer.apply(plan)
+        if snapshot_id is not None:
+            print(f"Applied; undo with --undo (snapshot {snapshot_id})")
+    db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from bisect import bisect
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from change_notifier import prune_change_log
+from create_database import create_tables
+from id_generator import NODE_BITS, IdGenerator, timestamp_ms
+from migrations import apply_migrations, base_schema_exists
+from sampledata import ROUTES_DATA, FARES_DATA
+
+DATABASE_NAME = 'transport_app.db'
+DISCOUNT_TYPES = ['None', 'Student', 'Senior', 'PWD']
+DISCOUNT_WEIGHTS = [70, 18, 8, 4]
+# Relative ticket volume per hour of day, peaking on the morning and evening commute
+HOURLY_WEIGHTS = [1, 1, 1, 1, 3, 8, 14, 18, 16, 10, 8, 8, 9, 8, 8, 10, 14, 18, 16, 10, 6, 4, 2, 1]
+FIRST_NAMES = ['Juan', 'Maria', 'Jose', 'Ana', 'Pedro', 'Rosa', 'Carlo', 'Liza', 'Mark', 'Joy']
+LAST_NAMES = ['Santos', 'Reyes', 'Cruz', 'Bautista', 'Garcia', 'Mendoza', 'Torres', 'Flores', 'Ramos', 'Lim']
+COMMENTS = ['Good service', 'Smooth ride', 'Late departure', 'Clean vehicle', 'Rude staff', 'Very helpful', 'Crowded', '']
+
+SHARD_SCHEMA = '''
+CREATE TABLE transactions (
+    transaction_id VARCHAR, commuter_id VARCHAR, route_id INTEGER, vehicle_id VARCHAR,
+    conductor_id VARCHAR, fare_id INTEGER, total_fare REAL, transaction_date TIMESTAMP
+);
+CREATE TABLE feedbacks (
+    commuter_id VARCHAR, driver_id VARCHAR, conductor_id VARCHAR, rating REAL, comment TEXT
+);
+'''
+
+def commuter_id(i):
+    return f"C{i:07d}"
+
+def driver_id(i):
+    return f"D{i:06d}"
+
+def conductor_id(i):
+    return f"K{i:06d}"
+
+def vehicle_id(i):
+    return f"V{i:06d}"
+
+# Table, id column and prefix of every generated id; a new run numbers past the highest one present
+GENERATED_IDS = {
+    'commuter': ('commuters', 'commuter_id', 'C'),
+    'driver': ('drivers', 'driver_id', 'D'),
+    'conductor': ('conductors', 'conductor_id', 'K'),
+    'vehicle': ('vehicles', 'vehicle_id', 'V'),
+}
+
+def id_offsets(conn):
+    """Highest generated index per entity, so a re-run on the same database appends instead of colliding"""
+    offsets = {}
+    for kind, (table, column, prefix) in GENERATED_IDS.items():
+        offsets[kind] = conn.execute(
+            f"SELECT COALESCE(MAX(CAST(substr({column}, 2) AS INTEGER)), 0) FROM {table} "
+            f"WHERE {column} GLOB '{prefix}[0-9]*'"
+        ).fetchone()[0]
+    return offsets
+
+def commuter_discounts(seed, commuters):
+    """Discount flag per commuter; regenerated identically by every shard worker"""
+    rng = random.Random(f"{seed}-discounts")
+    kinds = rng.choices(range(len(DISCOUNT_TYPES)), weights=DISCOUNT_WEIGHTS, k=commuters)
+    return bytearray(kinds)
+
+def route_weights(routes):
+    # Short hops dominate real ridership; same-stop rows are kept but rarely drawn
+    return [0.05 if distance == 0 else 1.0 / (1.0 + distance) for _, distance, _, _, _ in routes]
+
+def _executemany_chunked(conn, statement, rows, chunk_size):
+    """Streams rows through executemany; the caller owns the transaction"""
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            conn.executemany(statement, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        conn.executemany(statement, batch)
+        total += len(batch)
+    return total
+
+def _tune_for_bulk_load(conn):
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -200000")
+
+def ensure_reference_data(conn):
+    if conn.execute("SELECT COUNT(*) FROM routes").fetchone()[0] == 0:
+        conn.executemany("INSERT INTO routes (origin, destination, distance) VALUES (?, ?, ?)", ROUTES_DATA)
+        conn.executemany("INSERT INTO fares (route_id, price_fare, discount_fare) VALUES (?, ?, ?)", FARES_DATA)
+    return [tuple(row) for row in conn.execute('''
+        SELECT r.route_id, r.distance, f.fare_id, f.price_fare, COALESCE(f.discount_fare, f.price_fare)
+        FROM routes r
+        JOIN fares f ON f.fare_id = (SELECT MIN(fare_id) FROM fares WHERE route_id = r.route_id)
+        ORDER BY r.route_id
+    ''')]
+
+def generate_people(conn, seed, offsets, commuters, drivers, conductors, chunk_size):
+    rng = random.Random(f"{seed}-people")
+    row = conn.execute("SELECT MAX(COALESCE((SELECT MAX(user_id) FROM users), 0), "
+                       "COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'users'), 0))").fetchone()
+    next_user_id = row[0] + 1
+    discounts = commuter_discounts(seed, commuters)
+    groups = [
+        ('Commuter', commuters, 'commuter'),
+        ('Driver', drivers, 'driver'),
+        ('Conductor', conductors, 'conductor'),
+    ]
+    first_ids = {}
+    # Usernames and emails carry the same run-offset index as the ids, so they never repeat either
+    def users():
+        user_id = next_user_id
+        for user_type, count, prefix in groups:
+            first_ids[user_type] = user_id
+            for i in range(offsets[prefix] + 1, offsets[prefix] + count + 1):
+                yield (user_id, f"gen_{seed}_{prefix}{i}", rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+                       f"gen_{seed}_{prefix}{i}@ex.com", f"{prefix}pass{i}", user_type)
+                user_id += 1
+    _executemany_chunked(conn, '''INSERT INTO users
+        (user_id, username, first_name, last_name, email, password, user_type)
+        VALUES (?, ?, ?, ?, ?, ?, ?)''', users(), chunk_size)
+    _executemany_chunked(conn, '''INSERT INTO commuters
+        (commuter_id, user_id, contact_no, discount_type, preferred_route) VALUES (?, ?, ?, ?, ?)''',
+        ((commuter_id(offsets['commuter'] + i), first_ids['Commuter'] + i - 1, f"09{rng.randrange(10**9):09d}",
+          DISCOUNT_TYPES[discounts[i - 1]], None) for i in range(1, commuters + 1)),
+        chunk_size)
+    _executemany_chunked(conn, "INSERT INTO drivers (driver_id, user_id, license_no) VALUES (?, ?, ?)",
+        ((driver_id(offsets['driver'] + i), first_ids['Driver'] + i - 1, 100000 + offsets['driver'] + i)
+         for i in range(1, drivers + 1)),
+        chunk_size)
+    _executemany_chunked(conn, "INSERT INTO conductors (conductor_id, user_id, license_no) VALUES (?, ?, ?)",
+        ((conductor_id(offsets['conductor'] + i), first_ids['Conductor'] + i - 1, 200000 + offsets['conductor'] + i)
+         for i in range(1, conductors + 1)),
+        chunk_size)
+
+def generate_fleet(conn, seed, offsets, vehicles, drivers, conductors, assignments, start, chunk_size):
+    rng = random.Random(f"{seed}-fleet")
+    _executemany_chunked(conn, "INSERT INTO vehicles (vehicle_id, plate_no) VALUES (?, ?)",
+        ((vehicle_id(i), f"G{seed % 100:02d}{i:06d}")
+         for i in range(offsets['vehicle'] + 1, offsets['vehicle'] + vehicles + 1)),
+        chunk_size)
+    crews = []
+    for n in range(assignments):
+        v = vehicle_id(offsets['vehicle'] + n % vehicles + 1)
+        d = driver_id(offsets['driver'] + rng.randrange(drivers) + 1)
+        k = conductor_id(offsets['conductor'] + rng.randrange(conductors) + 1)
+        when = start + timedelta(minutes=rng.randrange(24 * 60 * 30))
+        crews.append((v, d, k, when.strftime("%Y-%m-%d %H:%M:%S")))
+    _executemany_chunked(conn, '''INSERT INTO vehicle_assignment
+        (vehicle_id, driver_id, conductor_id, assignment_date) VALUES (?, ?, ?, ?)''',
+        crews, chunk_size)
+    return [(v, d, k) for v, d, k, _ in crews]
+
+def generator_node(seed, shard, first_commuter):
+    """Id node for a shard: fixed by the seed, and new for each re-run since first_commuter advances"""
+    # Never 0, the node reserved for backfilled ids
+    return random.Random(f"{seed}-node-{shard}-{first_commuter}").getrandbits(NODE_BITS) or 1
+
+def transaction_rows(seed, shard, count, first_commuter, commuters, routes, crews, days, start):
+    rng = random.Random(f"{seed}-transactions-{shard}")
+    # Ids come from id_generator like tickets issued in production, stamped with the ticket's own
+    # time, so the same seed reproduces them along with every other column
+    ids = IdGenerator(generator_node(seed, shard, first_commuter))
+    discounts = commuter_discounts(seed, commuters)
+    route_cum = list(accumulate(route_weights(routes)))
+    hour_cum = list(accumulate(HOURLY_WEIGHTS))
+    day_labels = [(start + timedelta(days=d)).isoformat() for d in range(days)]
+    day_ms = [timestamp_ms(label) for label in day_labels]
+    route_total = route_cum[-1]
+    hour_total = hour_cum[-1]
+    random_ = rng.random
+    randrange = rng.randrange
+    for _ in range(count):
+        c = randrange(commuters)
+        route_id, _, fare_id, price, discount = routes[bisect(route_cum, random_() * route_total)]
+        v, _, k = crews[randrange(len(crews))]
+        hour = bisect(hour_cum, random_() * hour_total)
+        seconds = randrange(3600)
+        day = randrange(days)
+        stamp = f"{day_labels[day]} {hour:02d}:{seconds // 60:02d}:{seconds % 60:02d}"
+        yield (ids.new_id(day_ms[day] + (hour * 3600 + seconds) * 1000), commuter_id(first_commuter + c + 1),
+               route_id, v, k, fare_id, discount if discounts[c] else price, stamp)
+
+def feedback_rows(seed, shard, count, first_commuter, commuters, crews):
+    rng = random.Random(f"{seed}-feedbacks-{shard}")
+    for _ in range(count):
+        _, d, k = crews[rng.randrange(len(crews))]
+        rating = min(5.0, max(0.0, round(rng.gauss(4.0, 0.9) * 2) / 2))
+        yield (commuter_id(first_commuter + rng.randrange(commuters) + 1), d, k, rating, rng.choice(COMMENTS))
+
+TRANSACTION_INSERT = '''INSERT INTO {db}transactions
+    (transaction_id, commuter_id, route_id, vehicle_id, conductor_id, fare_id, total_fare, transaction_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)'''
+FEEDBACK_INSERT = '''INSERT INTO {db}feedbacks
+    (commuter_id, driver_id, conductor_id, rating, comment) VALUES (?, ?, ?, ?, ?)'''
+
+def write_shard(args):
+    """Process-pool entry point: fills one throwaway shard file and returns its path"""
+    (path, seed, shard, tx_count, fb_count, first_commuter, commuters, routes, crews, days, start,
+     chunk_size) = args
+    conn = sqlite3.connect(path)
+    _tune_for_bulk_load(conn)
+    conn.executescript(SHARD_SCHEMA)
+    _executemany_chunked(conn, TRANSACTION_INSERT.format(db=''),
+        transaction_rows(seed, shard, tx_count, first_commuter, commuters, routes, crews, days, start),
+        chunk_size)
+    _executemany_chunked(conn, FEEDBACK_INSERT.format(db=''),
+        feedback_rows(seed, shard, fb_count, first_commuter, commuters, crews), chunk_size)
+    conn.commit()
+    conn.close()
+    return path
+
+def merge_shard(conn, path, chunk_size):
+    """Copies a shard into the open transaction; streamed rather than ATTACHed, since a database
+    attached inside a transaction cannot be detached until it ends"""
+    shard = sqlite3.connect(path)
+    try:
+        _executemany_chunked(conn, TRANSACTION_INSERT.format(db=''),
+            shard.execute("SELECT * FROM transactions ORDER BY rowid"), chunk_size)
+        _executemany_chunked(conn, FEEDBACK_INSERT.format(db=''),
+            shard.execute("SELECT * FROM feedbacks ORDER BY rowid"), chunk_size)
+    finally:
+        shard.close()
+
+def _split(total, parts):
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+def generate(database_name=DATABASE_NAME, seed=1, commuters=1000, drivers=50, conductors=50, vehicles=50,
+             assignments=200, transactions=100000, feedbacks=10000, days=365, end_date=None,
+             workers=1, shards=None, chunk_size=10000):
+    """Appends one generated dataset in a single transaction, so a failed run leaves nothing behind"""
+    started = time.perf_counter()
+    end_date = end_date or date.today()
+    start = end_date - timedelta(days=days)
+    conn = sqlite3.connect(database_name)
+    scratch = None
+    try:
+        _tune_for_bulk_load(conn)
+        conn.execute("PRAGMA foreign_keys = OFF")
+        if not base_schema_exists(conn):
+            create_tables(conn)
+            conn.commit()
+        conn.execute("BEGIN")
+        routes = ensure_reference_data(conn)
+        offsets = id_offsets(conn)
+        generate_people(conn, seed, offsets, commuters, drivers, conductors, chunk_size)
+        crews = generate_fleet(conn, seed, offsets, vehicles, drivers, conductors, max(assignments, 1),
+                               datetime.combine(start, datetime.min.time()), chunk_size)
+        print(f"Generated {commuters} commuters, {drivers} drivers, {conductors} conductors, "
+              f"{vehicles} vehicles, {len(crews)} assignments")
+
+        shards = shards or workers
+        tx_split = _split(transactions, shards)
+        fb_split = _split(feedbacks, shards)
+        first_commuter = offsets['commuter']
+        if workers <= 1:
+            for shard in range(shards):
+                _executemany_chunked(conn, TRANSACTION_INSERT.format(db=''),
+                    transaction_rows(seed, shard, tx_split[shard], first_commuter, commuters, routes, crews,
+                                     days, start),
+                    chunk_size)
+                _executemany_chunked(conn, FEEDBACK_INSERT.format(db=''),
+                    feedback_rows(seed, shard, fb_split[shard], first_commuter, commuters, crews), chunk_size)
+        else:
+            # Shards are generated in parallel into scratch files, then merged in shard order
+            scratch = tempfile.mkdtemp(prefix='transport_gen_', dir=os.path.dirname(os.path.abspath(database_name)))
+            jobs = [
+                (os.path.join(scratch, f"shard_{shard}.db"), seed, shard, tx_split[shard], fb_split[shard],
+                 first_commuter, commuters, routes, crews, days, start, chunk_size)
+                for shard in range(shards)
+            ]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                paths = list(pool.map(write_shard, jobs))
+            for path in paths:
+                merge_shard(conn, path, chunk_size)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        conn.close()
+        print("Generation failed; rolled back")
+        raise
+    finally:
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+    print(f"Generated {transactions} transactions and {feedbacks} feedbacks")
+    applied = apply_migrations(conn)
+    # Every generated row was logged; nothing subscribes to a bulk load row by row
+    prune_change_log(conn)
+    conn.commit()
+    if not applied:
+        conn.execute("ANALYZE")
+    conn.execute("PRAGMA synchronous = FULL")
+    conn.commit()
+    conn.close()
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a deterministic, production-sized transport database.")
+    parser.add_argument('--database', default=DATABASE_NAME)
+    parser.add_argument('--seed', type=int, default=1, help="the same seed reproduces every row, transaction ids included")
+    parser.add_argument('--commuters', type=int, default=1000)
+    parser.add_argument('--drivers', type=int, default=50)
+    parser.add_argument('--conductors', type=int, default=50)
+    parser.add_argument('--vehicles', type=int, default=50)
+    parser.add_argument('--assignments', type=int, default=200)
+    parser.add_argument('--transactions', type=int, default=100000)
+    parser.add_argument('--feedbacks', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--end-date', type=date.fromisoformat, default=None)
+    parser.add_argument('--workers', type=int, default=1, help="processes generating shards in parallel")
+    parser.add_argument('--shards', type=int, default=None, help="defaults to one shard per worker")
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    args = parser.parse_args(argv)
+    generate(
+        database_name=args.database, seed=args.seed, commuters=args.commuters, drivers=args.drivers,
+        conductors=args.conductors, vehicles=args.vehicles, assignments=args.assignments,
+        transactions=args.transactions, feedbacks=args.feedbacks, days=args.days, end_date=args.end_date,
+        workers=args.workers, shards=args.shards, chunk_size=args.chunk_size,
+    )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import base64
+import itertools
+import os
+import time
+from datetime import datetime, timezone
+
+# 128-bit ids: 48-bit millisecond timestamp | 40-bit node | 40-bit sequence, written as 26
+# base32hex characters. base32hex keeps byte order, so ids sort as strings in time order.
+TIMESTAMP_BITS = 48
+NODE_BITS = 40
+SEQUENCE_BITS = 40
+ID_LENGTH = 26
+# Node 0 is reserved for ids derived from existing rows by the backfill migration
+BACKFILL_NODE = 0
+
+_NODE_MASK = (1 << NODE_BITS) - 1
+_SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+
+def encode_id(timestamp_ms, node, sequence):
+    value = (timestamp_ms << (NODE_BITS + SEQUENCE_BITS)) | ((node & _NODE_MASK) << SEQUENCE_BITS) | (sequence & _SEQUENCE_MASK)
+    return base64.b32hexencode(value.to_bytes(16, 'big')).decode('ascii')[:ID_LENGTH]
+
+def decode_id(transaction_id):
+    """(timestamp_ms, node, sequence) of a generated id"""
+    value = int.from_bytes(base64.b32hexdecode(transaction_id + '======'), 'big')
+    return (
+        value >> (NODE_BITS + SEQUENCE_BITS),
+        (value >> SEQUENCE_BITS) & _NODE_MASK,
+        value & _SEQUENCE_MASK,
+    )
+
+def id_timestamp(transaction_id):
+    """UTC datetime a generated id was minted at"""
+    return datetime.fromtimestamp(decode_id(transaction_id)[0] / 1000.0, tz=timezone.utc)
+
+def timestamp_ms(value):
+    """Milliseconds since the epoch for a stored 'YYYY-MM-DD HH:MM[:SS]' UTC timestamp (0 if missing)"""
+    if not value:
+        return 0
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return 0
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+def backfill_id(transaction_date, rowid):
+    """Deterministic id for an existing row: its own timestamp, the reserved node and its rowid"""
+    return encode_id(timestamp_ms(transaction_date), BACKFILL_NODE, rowid)
+
+class IdGenerator:
+    """Time-ordered ids that are unique across devices without coordination.
+
+    The node is random per process (never the backfill node), and the sequence comes from
+    itertools.count, whose next() is atomic under the GIL, so no lock is taken. The clock is
+    wall time anchored once and advanced by time.monotonic_ns, so ids from one thread never
+    go backwards when the system clock is adjusted.
+    """
+
+    def __init__(self, node=None):
+        if node is None:
+            node = int.from_bytes(os.urandom(5), 'big') or 1
+        self.node = node & _NODE_MASK
+        self._sequence = itertools.count()
+        self._anchor_ms = time.time_ns() // 1_000_000 - time.monotonic_ns() // 1_000_000
+
+    def now_ms(self):
+        return self._anchor_ms + time.monotonic_ns() // 1_000_000
+
+    def new_id(self, at_ms=None):
+        """Next id; at_ms stamps it with an earlier time, e.g. for imported historical rows"""
+        return encode_id(self.now_ms() if at_ms is None else at_ms, self.node, next(self._sequence))
+
+_default = IdGenerator()
+
+def new_transaction_id(at_ms=None):
+    """Next id from this process's shared generator"""
+    return _default.new_id(at_ms)
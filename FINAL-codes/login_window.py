@@ -4,13 +4,16 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import pyqtSignal, Qt
 from PyQt5.QtGui import QPalette, QColor, QFont
 from commuter_register_dialog import CommuterRegisterDialog
+from session import Session
+from workers import JobRunner
 
 class LoginWindow(QWidget):
-    login_successful = pyqtSignal(str, dict)
+    login_successful = pyqtSignal(str, dict, object)
 
     def __init__(self, db_manager):
         super().__init__()
         self.db_manager = db_manager
+        self.runner = JobRunner(self)
         self.setWindowTitle("Login")
         screen = QApplication.primaryScreen().availableGeometry()
         width = int(screen.width() * 0.75)
@@ -52,12 +55,12 @@ class LoginWindow(QWidget):
         self.password_input.setStyleSheet("background-color: #BBDEFB; padding: 10px; border-radius: 8px;")
         self.password_input.setMinimumHeight(48)
         form_layout.addWidget(self.password_input)
-        login_btn = QPushButton("Login")
-        login_btn.setFont(QFont("Arial", 18))
-        login_btn.clicked.connect(self.attempt_login)
-        login_btn.setStyleSheet("background-color: #2196F3; color: white; padding: 10px; border-radius: 8px;")
-        login_btn.setMinimumHeight(48)
-        form_layout.addWidget(login_btn)
+        self.login_btn = QPushButton("Login")
+        self.login_btn.setFont(QFont("Arial", 18))
+        self.login_btn.clicked.connect(self.attempt_login)
+        self.login_btn.setStyleSheet("background-color: #2196F3; color: white; padding: 10px; border-radius: 8px;")
+        self.login_btn.setMinimumHeight(48)
+        form_layout.addWidget(self.login_btn)
         register_btn = QPushButton("Register as Commuter")
         register_btn.setFont(QFont("Arial", 18))
         register_btn.clicked.connect(self.open_register_dialog)
@@ -79,13 +82,29 @@ class LoginWindow(QWidget):
         if not username or not password:
             QMessageBox.warning(self, "Input Error", "Please enter both username and password.")
             return
-        user = self.db_manager.authenticate_user(username, password)
-        if user:
-            self.login_successful.emit(user['user_type'], user)
+        self.login_btn.setEnabled(False)
+        self.login_btn.setText("Logging in...")
+        self.runner.submit(
+            'login', Session.login, self.on_login_result, self.on_login_error,
+            self.db_manager, username, password
+        )
+
+    def reset_login_button(self):
+        self.login_btn.setEnabled(True)
+        self.login_btn.setText("Login")
+
+    def on_login_result(self, session):
+        self.reset_login_button()
+        if session:
+            self.login_successful.emit(session.user_type, session.user, session)
             self.clear_fields()
         else:
             QMessageBox.warning(self, "Login Failed", "Invalid username or password.")
 
+    def on_login_error(self, message):
+        self.reset_login_button()
+        QMessageBox.critical(self, "Login Error", f"Login failed: {message}")
+
     def clear_fields(self):
         self.username_input.clear()
         self.password_input.clear()
@@ -1,12 +1,24 @@
 import sys
+from importlib import import_module
 from PyQt5.QtWidgets import QApplication, QMainWindow, QStackedWidget, QMessageBox
+from PyQt5.QtCore import QTimer
 from login_window import LoginWindow
-from admin_panel import AdminPanel
-from commuter_panel import CommuterPanel
-from driver_panel import DriverPanel
-from conductor_panel import ConductorPanel
 from database_manager import DatabaseManager
 
+CHANGE_POLL_MS = 500
+
+# Panels (and QtSql / routes_fares behind them) are imported only after that role logs in
+PANEL_MODULES = {
+    'Admin': ('admin_panel', 'AdminPanel'),
+    'Commuter': ('commuter_panel', 'CommuterPanel'),
+    'Driver': ('driver_panel', 'DriverPanel'),
+    'Conductor': ('conductor_panel', 'ConductorPanel'),
+}
+
+def load_panel_class(user_type):
+    module_name, class_name = PANEL_MODULES[user_type]
+    return getattr(import_module(module_name), class_name)
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -16,6 +28,11 @@ class MainWindow(QMainWindow):
         if not self.db_manager.connect():
             QMessageBox.critical(self, "Database Error", "Failed to connect to the database.")
             sys.exit(1)
+        # Polling on the GUI thread keeps change subscribers' callbacks there too
+        self.change_notifier = self.db_manager.get_change_notifier()
+        self.change_timer = QTimer(self)
+        self.change_timer.timeout.connect(self.change_notifier.poll)
+        self.change_timer.start(CHANGE_POLL_MS)
         self.stacked_widget = QStackedWidget()
         self.setCentralWidget(self.stacked_widget)
         self.login_window = LoginWindow(self.db_manager)
@@ -48,27 +65,34 @@ class MainWindow(QMainWindow):
             self.conductor_panel.deleteLater()
             self.conductor_panel = None
 
-    def show_user_panel(self, user_type, user_data):
+    def show_user_panel(self, user_type, user_data, session=None):
+        if user_type in PANEL_MODULES:
+            try:
+                panel_class = load_panel_class(user_type)
+            except (ImportError, AttributeError) as e:
+                QMessageBox.critical(self, "Panel Error", f"The {user_type} panel could not be loaded: {e}")
+                self.show_login()
+                return
         if user_type == 'Admin':
-            self.admin_panel = AdminPanel(self.db_manager, user_data)
+            self.admin_panel = panel_class(self.db_manager, user_data)
             self.admin_panel.logout_requested.connect(self.show_login)
             self.stacked_widget.addWidget(self.admin_panel)
             self.stacked_widget.setCurrentWidget(self.admin_panel)
             self.setWindowTitle("Admin Panel")
         elif user_type == 'Commuter':
-            self.commuter_panel = CommuterPanel(self.db_manager, user_data)
+            self.commuter_panel = panel_class(self.db_manager, user_data, session)
             self.commuter_panel.logout_requested.connect(self.show_login)
             self.stacked_widget.addWidget(self.commuter_panel)
             self.stacked_widget.setCurrentWidget(self.commuter_panel)
             self.setWindowTitle("Commuter Panel")
         elif user_type == 'Driver':
-            self.driver_panel = DriverPanel(self.db_manager, user_data)
+            self.driver_panel = panel_class(self.db_manager, user_data)
             self.driver_panel.logout_requested.connect(self.show_login)
             self.stacked_widget.addWidget(self.driver_panel)
             self.stacked_widget.setCurrentWidget(self.driver_panel)
             self.setWindowTitle("Driver Panel")
         elif user_type == 'Conductor':
-            self.conductor_panel = ConductorPanel(self.db_manager, user_data)
+            self.conductor_panel = panel_class(self.db_manager, user_data, session)
             self.conductor_panel.logout_requested.connect(self.show_login)
             self.stacked_widget.addWidget(self.conductor_panel)
             self.stacked_widget.setCurrentWidget(self.conductor_panel)
@@ -78,6 +102,7 @@ class MainWindow(QMainWindow):
             self.show_login()
 
     def closeEvent(self, event):
+        self.change_timer.stop()
         self.db_manager.close()
         super().closeEvent(event)
 
@@ -0,0 +1,441 @@
+import argparse
+import sqlite3
+from id_generator import backfill_id
+
+DATABASE_NAME = 'transport_app.db'
+BACKFILL_CHUNK_SIZE = 5000
+
+def add_transaction_and_feedback_indexes(cursor):
+    # Conductor history is read newest-first; carrying the displayed columns makes it a covering scan
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_transactions_conductor_date
+    ON transactions (conductor_id, transaction_date, commuter_id, route_id, vehicle_id, total_fare, transaction_id)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_transactions_commuter_date
+    ON transactions (commuter_id, transaction_date)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_transactions_date
+    ON transactions (transaction_date)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_feedbacks_driver
+    ON feedbacks (driver_id, feedback_id, commuter_id, rating)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_feedbacks_conductor
+    ON feedbacks (conductor_id, feedback_id, commuter_id, rating)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_feedbacks_commuter
+    ON feedbacks (commuter_id, feedback_id)
+    ''')
+
+def add_assignment_and_route_indexes(cursor):
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_vehicle_assignment_conductor_date
+    ON vehicle_assignment (conductor_id, assignment_date, vehicle_id)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_vehicle_assignment_driver_date
+    ON vehicle_assignment (driver_id, assignment_date, vehicle_id)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_routes_origin_destination
+    ON routes (origin, destination, distance)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_fares_route
+    ON fares (route_id, price_fare, discount_fare)
+    ''')
+
+def add_lookup_expression_indexes(cursor):
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_vehicles_plate_lower
+    ON vehicles (LOWER(plate_no))
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_drivers_license
+    ON drivers (license_no)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_conductors_license
+    ON conductors (license_no)
+    ''')
+
+def version_triggers(cursor, table):
+    """Bumps table_versions[table] on every row change so caches can detect staleness cheaply"""
+    cursor.execute("INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)", (table,))
+    for op in ('INSERT', 'UPDATE', 'DELETE'):
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{op.lower()}
+        AFTER {op} ON {table}
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+        END
+        ''')
+
+def add_reference_table_versions(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS table_versions (
+        table_name VARCHAR PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    version_triggers(cursor, 'routes')
+    version_triggers(cursor, 'fares')
+
+# Ratings are 0.0-5.0; bucket n counts ratings in [n, n + 1), with 5.0 in bucket 5
+RATING_BUCKETS = range(6)
+RATING_STATS_TABLES = {
+    'driver_rating_stats': 'driver_id',
+    'conductor_rating_stats': 'conductor_id',
+}
+
+def _rating_bucket(ref, bucket):
+    return f"(MIN(CAST({ref}.rating AS INTEGER), 5) = {bucket})"
+
+def _rating_add_sql(table, key):
+    hist_columns = ", ".join(f"hist_{b}" for b in RATING_BUCKETS)
+    hist_values = ", ".join(_rating_bucket('NEW', b) for b in RATING_BUCKETS)
+    hist_updates = ",\n            ".join(f"hist_{b} = hist_{b} + excluded.hist_{b}" for b in RATING_BUCKETS)
+    return f'''
+        INSERT INTO {table} ({key}, rating_count, rating_sum, rating_sum_sq, rating_min, rating_max, {hist_columns})
+        SELECT NEW.{key}, 1, NEW.rating, NEW.rating * NEW.rating, NEW.rating, NEW.rating, {hist_values}
+        WHERE NEW.{key} IS NOT NULL AND NEW.rating IS NOT NULL
+        ON CONFLICT ({key}) DO UPDATE SET
+            rating_count = rating_count + 1,
+            rating_sum = rating_sum + excluded.rating_sum,
+            rating_sum_sq = rating_sum_sq + excluded.rating_sum_sq,
+            rating_min = MIN(rating_min, excluded.rating_min),
+            rating_max = MAX(rating_max, excluded.rating_max),
+            {hist_updates};
+    '''
+
+def _rating_remove_sql(table, key):
+    # Min and max cannot be decremented, so they are re-read through idx_feedbacks_{driver,conductor}
+    hist_updates = ",\n            ".join(f"hist_{b} = hist_{b} - {_rating_bucket('OLD', b)}" for b in RATING_BUCKETS)
+    return f'''
+        UPDATE {table} SET
+            rating_count = rating_count - 1,
+            rating_sum = rating_sum - OLD.rating,
+            rating_sum_sq = rating_sum_sq - OLD.rating * OLD.rating,
+            rating_min = (SELECT MIN(rating) FROM feedbacks WHERE {key} = OLD.{key}),
+            rating_max = (SELECT MAX(rating) FROM feedbacks WHERE {key} = OLD.{key}),
+            {hist_updates}
+        WHERE {key} = OLD.{key} AND OLD.rating IS NOT NULL;
+        DELETE FROM {table} WHERE {key} = OLD.{key} AND rating_count <= 0;
+    '''
+
+def rating_stats_triggers(cursor, table, key):
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_insert
+    AFTER INSERT ON feedbacks
+    BEGIN
+        {_rating_add_sql(table, key)}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_delete
+    AFTER DELETE ON feedbacks
+    BEGIN
+        {_rating_remove_sql(table, key)}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_update
+    AFTER UPDATE OF rating, {key} ON feedbacks
+    BEGIN
+        {_rating_remove_sql(table, key)}
+        {_rating_add_sql(table, key)}
+    END
+    ''')
+
+def rebuild_rating_stats(cursor):
+    """Recomputes every rating summary from feedbacks, e.g. after bulk loads with triggers off"""
+    hist_columns = ", ".join(f"hist_{b}" for b in RATING_BUCKETS)
+    hist_sums = ", ".join(f"SUM({_rating_bucket('feedbacks', b)})" for b in RATING_BUCKETS)
+    for table, key in RATING_STATS_TABLES.items():
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(f'''
+        INSERT INTO {table} ({key}, rating_count, rating_sum, rating_sum_sq, rating_min, rating_max, {hist_columns})
+        SELECT {key}, COUNT(*), SUM(rating), SUM(rating * rating), MIN(rating), MAX(rating), {hist_sums}
+        FROM feedbacks
+        WHERE {key} IS NOT NULL AND rating IS NOT NULL
+        GROUP BY {key}
+        ''')
+
+def add_rating_stats(cursor):
+    hist_columns = ",\n        ".join(f"hist_{b} INTEGER NOT NULL DEFAULT 0" for b in RATING_BUCKETS)
+    for table, key in RATING_STATS_TABLES.items():
+        cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            {key} VARCHAR PRIMARY KEY,
+            rating_count INTEGER NOT NULL DEFAULT 0,
+            rating_sum REAL NOT NULL DEFAULT 0,
+            rating_sum_sq REAL NOT NULL DEFAULT 0,
+            rating_min REAL,
+            rating_max REAL,
+            {hist_columns}
+        )
+        ''')
+        rating_stats_triggers(cursor, table, key)
+    rebuild_rating_stats(cursor)
+
+def add_revenue_rollup(cursor):
+    # Filled by revenue_rollup.RevenueRollup; dim_key is '' for dimension 'all' and for NULL keys
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS revenue_rollup (
+        grain VARCHAR NOT NULL,
+        dimension VARCHAR NOT NULL,
+        bucket VARCHAR NOT NULL,
+        dim_key VARCHAR NOT NULL,
+        tx_count INTEGER NOT NULL DEFAULT 0,
+        revenue REAL NOT NULL DEFAULT 0,
+        discount_count INTEGER NOT NULL DEFAULT 0,
+        discount_revenue REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (grain, dimension, bucket, dim_key)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS rollup_watermarks (
+        name VARCHAR PRIMARY KEY,
+        last_rowid INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP
+    )
+    ''')
+
+def add_transaction_partitions(cursor):
+    # Registry for partitions.PartitionManager; path is relative to the live database's directory
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS transaction_partitions (
+        month VARCHAR PRIMARY KEY,
+        path VARCHAR NOT NULL,
+        row_count INTEGER NOT NULL DEFAULT 0,
+        min_date TIMESTAMP,
+        max_date TIMESTAMP,
+        archived_at TIMESTAMP
+    )
+    ''')
+    version_triggers(cursor, 'transaction_partitions')
+
+def add_reference_cache_versions(cursor):
+    # query_cache.QueryCache narrows data_version invalidations to the tables whose counter moved
+    for table in ('drivers', 'conductors', 'vehicles'):
+        version_triggers(cursor, table)
+
+CHANGE_LOG_TABLES = (
+    'users', 'admins', 'drivers', 'conductors', 'commuters', 'vehicles', 'routes', 'fares',
+    'transactions', 'feedbacks', 'vehicle_assignment',
+)
+
+def change_log_triggers(cursor, table):
+    for op, ref in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_change_log_{op.lower()}
+        AFTER {op} ON {table}
+        BEGIN
+            INSERT INTO change_log (table_name, op, row_id) VALUES ('{table}', '{op}', {ref}.rowid);
+        END
+        ''')
+
+def add_change_log(cursor):
+    # Read by change_notifier.ChangeNotifier from a seq cursor and pruned behind it
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name VARCHAR NOT NULL,
+        op VARCHAR NOT NULL CHECK(op IN ('INSERT', 'UPDATE', 'DELETE')),
+        row_id INTEGER,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    for table in CHANGE_LOG_TABLES:
+        change_log_triggers(cursor, table)
+
+def add_fare_snapshots(cursor):
+    # Undo log for fare_repricing.FareRepricer: the fares each bulk repricing overwrote
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS fare_snapshots (
+        snapshot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        formula TEXT,
+        fare_count INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP,
+        restored_at TIMESTAMP
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS fare_snapshot_rows (
+        snapshot_id INTEGER NOT NULL REFERENCES fare_snapshots(snapshot_id) ON DELETE CASCADE,
+        fare_id INTEGER NOT NULL,
+        price_fare REAL,
+        discount_fare REAL,
+        PRIMARY KEY (snapshot_id, fare_id)
+    ) WITHOUT ROWID
+    ''')
+
+def backfill_transaction_ids(cursor):
+    # Rows inserted before id_generator carry NULL ids; give them deterministic time-ordered ones.
+    # Archived partitions are left as they are: their rows keep the rowid-based row_id.
+    # The update trigger is dropped for the backfill so it does not log one change per row; the
+    # schema this step leaves behind is unchanged.
+    cursor.execute("DROP TRIGGER IF EXISTS trg_transactions_change_log_update")
+    while True:
+        rows = cursor.execute(
+            "SELECT rowid, transaction_date FROM transactions WHERE transaction_id IS NULL LIMIT ?",
+            (BACKFILL_CHUNK_SIZE,)
+        ).fetchall()
+        if not rows:
+            break
+        cursor.executemany(
+            "UPDATE transactions SET transaction_id = ? WHERE rowid = ?",
+            [(backfill_id(transaction_date, rowid), rowid) for rowid, transaction_date in rows]
+        )
+    change_log_triggers(cursor, 'transactions')
+
+def add_transaction_sequence(cursor):
+    # transactions has no AUTOINCREMENT, so deleting the newest row hands its rowid out again and a
+    # rowid watermark would skip the new row. transaction_seq gives every live row a position that
+    # is never reused; entries leave with their row (archiving included), so it stays live-sized.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS transaction_seq (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        row_id INTEGER NOT NULL UNIQUE
+    )
+    ''')
+    cursor.execute("INSERT INTO transaction_seq (row_id) SELECT rowid FROM transactions ORDER BY rowid")
+    # OR REPLACE: INSERT OR REPLACE into transactions deletes the old row without firing delete triggers
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_seq_insert
+    AFTER INSERT ON transactions
+    BEGIN
+        INSERT OR REPLACE INTO transaction_seq (row_id) VALUES (NEW.rowid);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_transactions_seq_delete
+    AFTER DELETE ON transactions
+    BEGIN
+        DELETE FROM transaction_seq WHERE row_id = OLD.rowid;
+    END
+    ''')
+    # Existing watermarks were rowids; backfilled positions follow rowid order, so map them across
+    cursor.execute("ALTER TABLE rollup_watermarks RENAME COLUMN last_rowid TO last_seq")
+    cursor.execute('''
+    UPDATE rollup_watermarks SET last_seq = (
+        SELECT COALESCE(MAX(seq), 0) FROM transaction_seq WHERE row_id <= rollup_watermarks.last_seq
+    )
+    ''')
+
+def add_fare_snapshot_new_values(cursor):
+    # The fares each repricing wrote, so undo can refuse when a fare was edited after it.
+    # Snapshots taken before this step keep NULLs and are restored unchecked.
+    cursor.execute("ALTER TABLE fare_snapshot_rows ADD COLUMN new_price_fare REAL")
+    cursor.execute("ALTER TABLE fare_snapshot_rows ADD COLUMN new_discount_fare REAL")
+
+# Ordered (version, description, step). Append new steps; never renumber or edit applied ones.
+MIGRATIONS = [
+    (1, "transaction and feedback access-path indexes", add_transaction_and_feedback_indexes),
+    (2, "vehicle assignment, route and fare indexes", add_assignment_and_route_indexes),
+    (3, "plate and license lookup indexes", add_lookup_expression_indexes),
+    (4, "change counters for routes and fares", add_reference_table_versions),
+    (5, "trigger-maintained driver and conductor rating summaries", add_rating_stats),
+    (6, "revenue rollup buckets and watermarks", add_revenue_rollup),
+    (7, "monthly transaction partition registry", add_transaction_partitions),
+    (8, "change counters for cached reference tables", add_reference_cache_versions),
+    (9, "trigger-populated change log", add_change_log),
+    (10, "fare repricing undo snapshots", add_fare_snapshots),
+    (11, "time-ordered ids for transactions without one", backfill_transaction_ids),
+    (12, "never-reused positions for transaction watermarks", add_transaction_sequence),
+    (13, "applied fares in repricing snapshots", add_fare_snapshot_new_values),
+]
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+def get_table_versions(conn, tables):
+    placeholders = ", ".join("?" for _ in tables)
+    rows = conn.execute(
+        f"SELECT table_name, version FROM table_versions WHERE table_name IN ({placeholders})",
+        tuple(tables)
+    ).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+def base_schema_exists(conn):
+    row = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('transactions', 'feedbacks', 'vehicle_assignment')"
+    ).fetchone()
+    return row[0] == 3
+
+def apply_migrations(conn, target=None):
+    """Applies every pending migration up to target, each in its own transaction"""
+    if not base_schema_exists(conn):
+        return []
+    target = latest_version() if target is None else target
+    current = get_schema_version(conn)
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version <= current or version > target:
+            continue
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            step(cursor)
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        applied.append((version, description))
+    if applied:
+        conn.execute("ANALYZE")
+        conn.commit()
+    return applied
+
+def migrate_database(database_name=DATABASE_NAME):
+    conn = None
+    try:
+        conn = sqlite3.connect(database_name)
+        before = get_schema_version(conn)
+        applied = apply_migrations(conn)
+        for version, description in applied:
+            print(f"Applied migration {version}: {description}")
+        print(f"Schema version {before} -> {get_schema_version(conn)}")
+    except sqlite3.Error as e:
+        print(f"Migration error: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def rebuild_rating_stats_database(database_name=DATABASE_NAME):
+    conn = None
+    try:
+        conn = sqlite3.connect(database_name)
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        rebuild_rating_stats(cursor)
+        conn.commit()
+        for table in RATING_STATS_TABLES:
+            count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            print(f"Rebuilt {table}: {count} rows")
+    except sqlite3.Error as e:
+        if conn:
+            conn.rollback()
+        print(f"Rebuild error: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument('--database', default=DATABASE_NAME)
+    parser.add_argument('--rebuild-ratings', action='store_true',
+                        help="recompute the rating summary tables from feedbacks")
+    args = parser.parse_args()
+    migrate_database(args.database)
+    if args.rebuild_ratings:
+        rebuild_rating_stats_database(args.database)
@@ -0,0 +1,327 @@
+import argparse
+import itertools
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import date
+from migrations import get_table_versions
+
+DATABASE_NAME = 'transport_app.db'
+PARTITION_DIR = 'partitions'
+DEFAULT_CHUNK_SIZE = 5000
+HISTORY_VIEW = 'transactions_history'
+
+REGISTRY_QUERY = "SELECT month, path, row_count, min_date, max_date FROM transaction_partitions ORDER BY month"
+
+def month_bounds(month):
+    """'YYYY-MM' -> ('YYYY-MM-01', first day of the next month) for range scans on transaction_date"""
+    year, mon = (int(part) for part in month.split('-'))
+    start = date(year, mon, 1)
+    end = date(year + (mon == 12), mon % 12 + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+def shift_month(month, delta):
+    year, mon = (int(part) for part in month.split('-'))
+    index = year * 12 + (mon - 1) + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+# Attach names are unique per use, so a history read nested inside another on the same
+# pooled connection never detaches or shadows the partitions the outer one is reading
+_attach_ids = itertools.count(1)
+
+def _alias(month):
+    return f"part_{month.replace('-', '_')}_{next(_attach_ids)}"
+
+class PartitionManager:
+    """Moves closed months of transactions into per-month SQLite files and reads them back.
+
+    Partitions keep the original rowids as row_id. transactions has no AUTOINCREMENT, so once
+    archiving removes the highest rowids SQLite hands them out again: row_id is unique within
+    the live table and within each partition, but the same value can appear in both, and
+    history keyset paging breaks ties on transaction_id. SQLite caps attached databases per connection (10 in stock builds), so history
+    queries attach partitions in batches and concatenate the results; queries must
+    therefore be row-level selects rather than aggregates over the whole history.
+    transactions_history is a common table expression prepended to each query rather than a
+    shared view, so queries must be plain SELECTs without a WITH clause of their own.
+    """
+
+    def __init__(self, db_manager, partition_dir=None, chunk_size=DEFAULT_CHUNK_SIZE, columnar_dir=None):
+        self.db_manager = db_manager
+        self.partition_dir = partition_dir
+        self.columnar_dir = columnar_dir
+        self.chunk_size = chunk_size
+        self._version = None
+        self._partitions = []
+        self._columns = None
+
+    def _base_dir(self):
+        return os.path.dirname(os.path.abspath(self.db_manager.database_name))
+
+    def _partition_dir(self):
+        return self.partition_dir or os.path.join(self._base_dir(), PARTITION_DIR)
+
+    def _export_columnar(self):
+        """Brings an existing columnar archive up to date; it only reads live rows by transaction_seq"""
+        from columnar_archive import META_FILE, ColumnarExporter, default_archive_dir
+        archive_dir = self.columnar_dir or default_archive_dir(self.db_manager.database_name)
+        if os.path.exists(os.path.join(archive_dir, META_FILE)):
+            ColumnarExporter(archive_dir).append(self.db_manager)
+
+    def _resolve(self, path):
+        return path if os.path.isabs(path) else os.path.join(self._base_dir(), path)
+
+    def _transaction_columns(self, conn):
+        if self._columns is None:
+            self._columns = [
+                (row[1], row[2], row[5]) for row in conn.execute("PRAGMA main.table_info(transactions)")
+            ]
+        return self._columns
+
+    def partitions(self):
+        """Registered partitions, re-read only when transaction_partitions has changed"""
+        with self.db_manager.read_connection() as conn:
+            try:
+                version = get_table_versions(conn, ('transaction_partitions',)).get('transaction_partitions', 0)
+            except sqlite3.Error:
+                return []
+            if version != self._version:
+                self._partitions = [dict(row) for row in conn.execute(REGISTRY_QUERY)]
+                self._version = version
+        return self._partitions
+
+    def has_partitions(self):
+        return bool(self.partitions())
+
+    def live_months(self):
+        return [row['month'] for row in self.db_manager.execute_query(
+            "SELECT DISTINCT substr(transaction_date, 1, 7) AS month FROM transactions ORDER BY month"
+        ) or [] if row['month']]
+
+    def _create_partition_table(self, conn, alias):
+        # Same columns and primary key as the live table, without foreign keys the partition cannot satisfy
+        columns = self._transaction_columns(conn)
+        definitions = ", ".join(
+            f"{name} {col_type}{' PRIMARY KEY' if pk else ''}" for name, col_type, pk in columns
+        )
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {alias}.transactions ({definitions})")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {alias}.idx_transactions_commuter_date "
+                     f"ON transactions (commuter_id, transaction_date)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {alias}.idx_transactions_conductor_date "
+                     f"ON transactions (conductor_id, transaction_date)")
+        conn.commit()
+
+    def archive_month(self, month, progress=None):
+        """Moves one month into its partition file in short chunked transactions.
+
+        Each chunk copies with INSERT OR IGNORE and deletes only the rows the partition now holds
+        under the same rowid and transaction_id, so an interrupted run can be repeated safely. A
+        live row whose reused rowid is already taken in the partition (a late-synced ticket, say)
+        is skipped rather than lost and stays live. The writer lock is released between chunks to
+        keep the app responsive. The revenue rollup and the columnar archive only read live rows,
+        so both catch up before any row leaves.
+        """
+        if not self.db_manager.ensure_connection():
+            return 0
+        self.db_manager.get_revenue_rollup().refresh()
+        self._export_columnar()
+        start, end = month_bounds(month)
+        alias = _alias(month)
+        os.makedirs(self._partition_dir(), exist_ok=True)
+        path = os.path.join(self._partition_dir(), f"transactions_{month.replace('-', '_')}.db")
+        with self.db_manager.write_connection() as conn:
+            conn.commit()
+            conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+        moved = 0
+        skipped = 0
+        try:
+            with self.db_manager.write_connection() as conn:
+                self._create_partition_table(conn, alias)
+            names = ", ".join(name for name, _, _ in self._columns)
+            last_rowid = 0
+            while True:
+                with self.db_manager.write_connection() as conn:
+                    # Keyed on rowid so rows left behind after a conflict are not picked up again
+                    rowids = [row[0] for row in conn.execute(
+                        "SELECT rowid FROM main.transactions WHERE transaction_date >= ? AND transaction_date < ? "
+                        "AND rowid > ? ORDER BY rowid LIMIT ?",
+                        (start, end, last_rowid, self.chunk_size)
+                    )]
+                    if not rowids:
+                        break
+                    batch = "[" + ",".join(str(r) for r in rowids) + "]"
+                    try:
+                        conn.execute(f'''
+                            INSERT OR IGNORE INTO {alias}.transactions (rowid, {names})
+                            SELECT rowid, {names} FROM main.transactions
+                            WHERE rowid IN (SELECT value FROM json_each(?))
+                        ''', (batch,))
+                        deleted = conn.execute(f'''
+                            DELETE FROM main.transactions
+                            WHERE rowid IN (SELECT value FROM json_each(?))
+                            AND EXISTS (
+                                SELECT 1 FROM {alias}.transactions p
+                                WHERE p.rowid = main.transactions.rowid
+                                AND p.transaction_id IS main.transactions.transaction_id
+                            )
+                        ''', (batch,)).rowcount
+                        conn.commit()
+                    except sqlite3.Error:
+                        conn.rollback()
+                        raise
+                last_rowid = rowids[-1]
+                moved += deleted
+                skipped += len(rowids) - deleted
+                if progress:
+                    progress(month, moved)
+            if skipped:
+                print(f"Kept {skipped} transactions from {month} live: their rowids are already taken in the partition")
+            with self.db_manager.write_connection() as conn:
+                row_count, min_date, max_date = conn.execute(
+                    f"SELECT COUNT(*), MIN(transaction_date), MAX(transaction_date) FROM {alias}.transactions"
+                ).fetchone()
+                conn.execute('''
+                    INSERT OR REPLACE INTO transaction_partitions (month, path, row_count, min_date, max_date, archived_at)
+                    VALUES (?, ?, ?, ?, ?, datetime('now'))
+                ''', (month, os.path.relpath(path, self._base_dir()), row_count, min_date, max_date))
+                conn.commit()
+        finally:
+            with self.db_manager.write_connection() as conn:
+                conn.commit()
+                conn.execute(f"DETACH DATABASE {alias}")
+        return moved
+
+    def archive_closed_months(self, keep_months=1, progress=None):
+        """Archives every month older than the newest keep_months (counting the current month)"""
+        cutoff = shift_month(date.today().strftime("%Y-%m"), -(keep_months - 1))
+        archived = {}
+        for month in self.live_months():
+            if month < cutoff:
+                archived[month] = self.archive_month(month, progress)
+        return archived
+
+    def vacuum(self):
+        """Returns the space freed by archiving to the filesystem"""
+        with self.db_manager.write_connection() as conn:
+            conn.commit()
+            conn.execute("VACUUM")
+
+    @contextmanager
+    def attached(self, partition):
+        """Private reader connection with one partition attached, yielded with its schema alias"""
+        alias = _alias(partition['month'])
+        with self.db_manager.private_read_connection() as conn:
+            conn.execute(f"ATTACH DATABASE ? AS {alias}", (self._resolve(partition['path']),))
+            try:
+                yield conn, alias
+            finally:
+                conn.execute(f"DETACH DATABASE {alias}")
+
+    def _batches(self, conn, partitions):
+        attached = len(conn.execute("PRAGMA database_list").fetchall()) - 2
+        size = max(1, conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) - max(attached, 0))
+        return [partitions[i:i + size] for i in range(0, len(partitions), size)] or [[]]
+
+    @contextmanager
+    def _history_query(self, conn, query, partitions, include_live):
+        """Attaches partitions and yields query with transactions_history defined over them (and
+        the live table) as a CTE, which lives only as long as the statement"""
+        names = ", ".join(name for name, _, _ in self._transaction_columns(conn))
+        aliases = []
+        try:
+            for partition in partitions:
+                alias = _alias(partition['month'])
+                conn.execute(f"ATTACH DATABASE ? AS {alias}", (self._resolve(partition['path']),))
+                aliases.append(alias)
+            selects = [f"SELECT rowid AS row_id, {names} FROM {alias}.transactions" for alias in aliases]
+            if include_live:
+                selects.append(f"SELECT rowid AS row_id, {names} FROM main.transactions")
+            yield f"WITH {HISTORY_VIEW} AS ({' UNION ALL '.join(selects)}) {query.lstrip()}"
+        finally:
+            for alias in aliases:
+                conn.execute(f"DETACH DATABASE {alias}")
+
+    def _run_batch(self, conn, query, params, partitions, include_live):
+        with self._history_query(conn, query, partitions, include_live) as history_query:
+            started = time.perf_counter()
+            rows = conn.execute(history_query, params).fetchall()
+            self.db_manager.stats.record(query, time.perf_counter() - started, rows=len(rows), conn=conn, params=params)
+            return rows
+
+    def query_history(self, query, params=(), start_month=None, end_month=None):
+        """Runs a query against the transactions_history view (live rows plus partitions).
+
+        Only partitions between start_month and end_month are attached; results come back
+        oldest partitions first and live rows last.
+        """
+        if not self.db_manager.ensure_connection():
+            return None
+        partitions = [
+            p for p in self.partitions()
+            if (start_month is None or p['month'] >= start_month) and (end_month is None or p['month'] <= end_month)
+        ]
+        rows = []
+        with self.db_manager.private_read_connection() as conn:
+            batches = self._batches(conn, partitions)
+            for i, batch in enumerate(batches):
+                rows.extend(self._run_batch(conn, query, params, batch, include_live=i == len(batches) - 1))
+        return rows
+
+    def iter_history(self, query, params=(), batch_size=500):
+        """Streams a query over transactions_history one partition at a time, then the live rows,
+        in fetchmany batches so the full history is never materialized"""
+        if not self.db_manager.ensure_connection():
+            return
+        sources = [([partition], False) for partition in self.partitions()] + [([], True)]
+        with self.db_manager.private_read_connection() as conn:
+            for partitions, include_live in sources:
+                with self._history_query(conn, query, partitions, include_live) as history_query:
+                    started = time.perf_counter()
+                    count = 0
+                    cursor = conn.execute(history_query, params)
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        count += len(rows)
+                        yield from rows
+                    cursor.close()
+                    self.db_manager.stats.record(query, time.perf_counter() - started, rows=count, conn=conn, params=params)
+
+def main(argv=None):
+    from database_manager import DatabaseManager
+    parser = argparse.ArgumentParser(description="Archive closed months of transactions into monthly files.")
+    parser.add_argument('--database', default=DATABASE_NAME)
+    parser.add_argument('--partition-dir', default=None, help=f"defaults to {PARTITION_DIR}/ next to the database")
+    parser.add_argument('--keep-months', type=int, default=1, help="months kept live, counting the current one")
+    parser.add_argument('--month', action='append', help="archive only this YYYY-MM (repeatable)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--columnar-dir', default=None,
+                        help="columnar archive to bring up to date before archiving; defaults to the one next to the database")
+    parser.add_argument('--vacuum', action='store_true', help="shrink the live file afterwards")
+    parser.add_argument('--list', action='store_true', help="show registered partitions and exit")
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager()
+    if not db.use_database(args.database):
+        raise SystemExit(f"Could not open {args.database}")
+    manager = PartitionManager(db, partition_dir=args.partition_dir, chunk_size=args.chunk_size,
+                               columnar_dir=args.columnar_dir)
+    if not args.list:
+        progress = lambda month, moved: print(f"  {month}: moved {moved}", end='\r')
+        started = time.perf_counter()
+        if args.month:
+            archived = {month: manager.archive_month(month, progress) for month in args.month}
+        else:
+            archived = manager.archive_closed_months(args.keep_months, progress)
+        for month, moved in archived.items():
+            print(f"Archived {moved} transactions from {month}")
+        print(f"Done in {time.perf_counter() - started:.1f}s")
+        if args.vacuum:
+            manager.vacuum()
+    for partition in manager.partitions():
+        print(f"{partition['month']}  {partition['row_count']:>10}  {partition['path']}")
+    db.close()
+
+if __name__ == '__main__':
+    main()
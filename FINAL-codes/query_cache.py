@@ -0,0 +1,210 @@
+import functools
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_TTL = 300.0
+DEFAULT_CHECK_INTERVAL = 1.0
+
+_WRITE_TARGET = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+["`\[]?(\w+)',
+    re.IGNORECASE
+)
+
+def written_table(sql):
+    """Table an INSERT/UPDATE/DELETE statement targets, or None for anything else"""
+    match = _WRITE_TARGET.match(sql)
+    return match.group(1).lower() if match else None
+
+def estimate_size(value):
+    """Rough retained size of a cached result, enough to enforce max_bytes"""
+    if isinstance(value, (list, tuple)):
+        size = sys.getsizeof(value)
+        for row in value:
+            size += sys.getsizeof(row)
+            if isinstance(row, (sqlite3.Row, tuple, list)):
+                size += sum(sys.getsizeof(item) for item in row)
+        return size
+    return sys.getsizeof(value)
+
+class QueryCache:
+    """LRU + TTL cache of read-method results, invalidated per table.
+
+    Writes made through DatabaseManager invalidate their table immediately. Writes from any
+    other connection (QtSql admin models, other processes) are noticed when PRAGMA data_version
+    on the cache's own probe connection moves; trigger-maintained table_versions then narrow
+    the invalidation to the tables that actually changed.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 default_ttl=DEFAULT_TTL, check_interval=DEFAULT_CHECK_INTERVAL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.check_interval = check_interval
+        self.enabled = True
+        self._entries = OrderedDict()
+        self._by_table = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._probe = None
+        self._data_version = None
+        self._table_versions = {}
+        self._checked_at = 0.0
+        self._generation = 0
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def bind(self, database_name):
+        """Opens the probe connection used to watch for changes made outside this manager"""
+        with self._lock:
+            self.unbind()
+            self._probe = sqlite3.connect(database_name, check_same_thread=False)
+            self._data_version = self._probe.execute("PRAGMA data_version").fetchone()[0]
+            self._table_versions = self._read_table_versions()
+            self._checked_at = time.monotonic()
+
+    def unbind(self):
+        with self._lock:
+            if self._probe is not None:
+                try:
+                    self._probe.close()
+                except sqlite3.Error:
+                    pass
+            self._probe = None
+            self.clear()
+
+    def _read_table_versions(self):
+        try:
+            return dict(self._probe.execute("SELECT table_name, version FROM table_versions").fetchall())
+        except sqlite3.Error:
+            return {}
+
+    def check_external_changes(self, force=False):
+        with self._lock:
+            if self._probe is None:
+                return
+            now = time.monotonic()
+            if not force and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            data_version = self._probe.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            self._data_version = data_version
+            versions = self._read_table_versions()
+            changed = [
+                table for table in list(self._by_table)
+                if table not in versions or versions[table] != self._table_versions.get(table)
+            ]
+            self._table_versions.update(versions)
+            self.invalidate_tables(changed)
+
+    def _drop(self, key):
+        value, tables, expires, size = self._entries.pop(key)
+        self._bytes -= size
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+
+    def get(self, key):
+        """(True, value) on a live hit, (False, None) otherwise"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return False, None
+            if entry[2] is not None and entry[2] < time.monotonic():
+                self._drop(key)
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return True, entry[0]
+
+    def generation(self):
+        return self._generation
+
+    def put(self, key, value, tables, ttl=None, generation=None):
+        """Stores a result unless an invalidation happened since generation was read"""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, tables, expires, size)
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self._counters['evictions'] += 1
+
+    def invalidate_tables(self, tables):
+        with self._lock:
+            self._generation += 1
+            for table in tables:
+                for key in list(self._by_table.get(table, ())):
+                    if key in self._entries:
+                        self._drop(key)
+                        self._counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return dict(
+                self._counters,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                hit_rate=self._counters['hits'] / lookups if lookups else 0.0,
+            )
+
+    def reset_stats(self):
+        with self._lock:
+            for name in self._counters:
+                self._counters[name] = 0
+
+def cached_query(*tables, ttl=None):
+    """Caches a DatabaseManager read method on (method, args), invalidated by writes to tables.
+
+    Lists are copied on the way out so callers cannot mutate the cached result.
+    """
+    tables = tuple(table.lower() for table in tables)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            cache = self.query_cache
+            if not cache.enabled:
+                return func(self, *args, **kwargs)
+            cache.check_external_changes()
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            hit, value = cache.get(key)
+            if not hit:
+                generation = cache.generation()
+                value = func(self, *args, **kwargs)
+                if value is None:
+                    return None
+                cache.put(key, value, tables, ttl, generation)
+            return list(value) if isinstance(value, list) else value
+        wrapper.cached_tables = tables
+        return wrapper
+    return decorator
@@ -0,0 +1,176 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Upper bounds in milliseconds; the last bucket catches everything slower
+LATENCY_BUCKETS_MS = [0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000, float('inf')]
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+def fingerprint(sql):
+    """Collapses whitespace and literals so equivalent statements share one entry"""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+def is_busy_error(error):
+    if getattr(error, 'sqlite_errorcode', None) in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED):
+        return True
+    message = str(error).lower()
+    return "database is locked" in message or "database is busy" in message
+
+class QueryStats:
+    """Per-fingerprint latency histograms, counters and a slow-query log"""
+
+    def __init__(self, slow_threshold_ms=200, slow_log_path=None, explain_slow=False, max_slow_entries=200):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.slow_log_path = slow_log_path
+        self.explain_slow = explain_slow
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._queries = {}
+        self._slow = deque(maxlen=max_slow_entries)
+        self._counters = {}
+        self._lock_wait_ms = 0.0
+        self._started = time.time()
+
+    def _entry(self, key):
+        entry = self._queries.get(key)
+        if entry is None:
+            entry = {
+                'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                'errors': 0, 'busy': 0, 'histogram': [0] * len(LATENCY_BUCKETS_MS),
+            }
+            self._queries[key] = entry
+        return entry
+
+    def record(self, sql, elapsed, rows=0, error=None, conn=None, params=None):
+        if not self.enabled:
+            return
+        elapsed_ms = elapsed * 1000.0
+        key = fingerprint(sql)
+        busy = error is not None and is_busy_error(error)
+        with self._lock:
+            entry = self._entry(key)
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['rows'] += rows
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    entry['histogram'][i] += 1
+                    break
+            if error is not None:
+                entry['errors'] += 1
+                self._bump('errors')
+            if busy:
+                entry['busy'] += 1
+                self._bump('busy')
+        if elapsed_ms >= self.slow_threshold_ms:
+            self._log_slow(key, sql, elapsed_ms, rows, conn, params)
+
+    def record_lock_wait(self, elapsed):
+        with self._lock:
+            self._lock_wait_ms += elapsed * 1000.0
+            self._bump('writer_checkouts')
+
+    def record_event(self, name):
+        with self._lock:
+            self._bump(name)
+
+    def _bump(self, name):
+        self._counters[name] = self._counters.get(name, 0) + 1
+
+    def _explain(self, conn, sql, params):
+        if conn is None or not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            return None
+        try:
+            rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+            return [row[-1] for row in rows]
+        except sqlite3.Error:
+            return None
+
+    def _log_slow(self, key, sql, elapsed_ms, rows, conn, params):
+        entry = {
+            'at': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'elapsed_ms': round(elapsed_ms, 3),
+            'rows': rows,
+            'query': key,
+        }
+        if self.explain_slow:
+            entry['plan'] = self._explain(conn, sql, params)
+        with self._lock:
+            self._slow.append(entry)
+        if self.slow_log_path:
+            try:
+                with open(self.slow_log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"Slow query log error: {e}")
+
+    def _percentile(self, histogram, count, fraction):
+        """(bound, overflow): the bucket's upper bound, or with overflow set the slowest finite
+        bound as a floor, since the last bucket has no upper bound to report"""
+        target = count * fraction
+        seen = 0
+        bound = LATENCY_BUCKETS_MS[-1]
+        for bucket, n in zip(LATENCY_BUCKETS_MS, histogram):
+            seen += n
+            if seen >= target:
+                bound = bucket
+                break
+        if bound == float('inf'):
+            return LATENCY_BUCKETS_MS[-2], True
+        return bound, False
+
+    def snapshot(self):
+        """Point-in-time copy of every counter, safe to hand to a UI or exporter"""
+        with self._lock:
+            queries = []
+            for key, entry in self._queries.items():
+                count = entry['count']
+                p50, p50_overflow = self._percentile(entry['histogram'], count, 0.50)
+                p95, p95_overflow = self._percentile(entry['histogram'], count, 0.95)
+                queries.append({
+                    'query': key,
+                    'count': count,
+                    'total_ms': round(entry['total_ms'], 3),
+                    'mean_ms': round(entry['total_ms'] / count, 3) if count else 0.0,
+                    'max_ms': round(entry['max_ms'], 3),
+                    'p50_ms': p50,
+                    'p50_overflow': p50_overflow,
+                    'p95_ms': p95,
+                    'p95_overflow': p95_overflow,
+                    'rows': entry['rows'],
+                    'errors': entry['errors'],
+                    'busy': entry['busy'],
+                    'histogram': dict(zip(
+                        [f"<={b}ms" if b != float('inf') else "slower" for b in LATENCY_BUCKETS_MS],
+                        entry['histogram']
+                    )),
+                })
+            queries.sort(key=lambda q: q['total_ms'], reverse=True)
+            return {
+                'since': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self._started)),
+                'counters': dict(self._counters),
+                'lock_wait_ms': round(self._lock_wait_ms, 3),
+                'queries': queries,
+                'slow_queries': list(self._slow),
+            }
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2, allow_nan=False)
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self._slow.clear()
+            self._counters.clear()
+            self._lock_wait_ms = 0.0
+            self._started = time.time()
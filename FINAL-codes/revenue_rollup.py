@@ -0,0 +1,309 @@
+import argparse
+import sqlite3
+import threading
+import time
+import numpy as np
+
+DATABASE_NAME = 'transport_app.db'
+DEFAULT_CHUNK_SIZE = 50000
+WATERMARK_NAME = 'revenue_rollup'
+
+# Bucket keys are prefixes of transaction_date ('YYYY-MM-DD HH:MM:SS')
+GRAINS = {'hour': 13, 'day': 10}
+DIMENSIONS = ('all', 'route', 'vehicle', 'conductor')
+# Hour buckets per route/vehicle/conductor would be nearly one row per ticket, so hours are overall only
+ROLLUPS = {
+    'hour': ('all',),
+    'day': DIMENSIONS,
+}
+
+# Keyed on transaction_seq rather than rowid: rowids of deleted newest rows are handed out again
+ROLLUP_SOURCE_QUERY = '''
+SELECT s.seq, t.transaction_date, t.route_id, t.vehicle_id, t.conductor_id, t.total_fare,
+    COALESCE(c.discount_type, 'None') NOT IN ('None', '') AS discounted
+FROM transaction_seq s
+JOIN transactions t ON t.rowid = s.row_id
+LEFT JOIN commuters c ON t.commuter_id = c.commuter_id
+WHERE s.seq > ?
+ORDER BY s.seq
+LIMIT ?
+'''
+
+# Archived months: partitions keep no sequence, so they are folded whole, ordered by rowid for chunking
+PARTITION_SOURCE_QUERY = '''
+SELECT t.rowid, t.transaction_date, t.route_id, t.vehicle_id, t.conductor_id, t.total_fare,
+    COALESCE(c.discount_type, 'None') NOT IN ('None', '') AS discounted
+FROM {alias}.transactions t
+LEFT JOIN main.commuters c ON t.commuter_id = c.commuter_id
+WHERE t.rowid > ?
+ORDER BY t.rowid
+LIMIT ?
+'''
+
+ROLLUP_UPSERT = '''
+INSERT INTO revenue_rollup (grain, dimension, bucket, dim_key, tx_count, revenue, discount_count, discount_revenue)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (grain, dimension, bucket, dim_key) DO UPDATE SET
+    tx_count = tx_count + excluded.tx_count,
+    revenue = revenue + excluded.revenue,
+    discount_count = discount_count + excluded.discount_count,
+    discount_revenue = discount_revenue + excluded.discount_revenue
+'''
+
+WATERMARK_UPSERT = '''
+INSERT INTO rollup_watermarks (name, last_seq, updated_at) VALUES (?, ?, datetime('now'))
+ON CONFLICT (name) DO UPDATE SET last_seq = excluded.last_seq, updated_at = excluded.updated_at
+'''
+
+def _upper_bound(end):
+    # '~' sorts after digits and spaces, so '2024-05-01~' still covers every hour of that day
+    return end + '~'
+
+def aggregate_chunk(rows):
+    """Groups one chunk of source rows into (grain, dimension, bucket, dim_key, count, revenue,
+    discount_count, discount_revenue) tuples for every rollup at once"""
+    if not rows:
+        return []
+    _, dates, route_ids, vehicle_ids, conductor_ids, fares, discounted = zip(*rows)
+    dates = np.array([d or '' for d in dates], dtype='U19')
+    fares = np.array(fares, dtype=np.float64)
+    discounted = np.array(discounted, dtype=np.float64)
+    discount_fares = fares * discounted
+    dimension_keys = {
+        'all': np.zeros(len(rows), dtype='U1'),
+        'route': np.array(['' if v is None else str(v) for v in route_ids]),
+        'vehicle': np.array(['' if v is None else str(v) for v in vehicle_ids]),
+        'conductor': np.array(['' if v is None else str(v) for v in conductor_ids]),
+    }
+    results = []
+    for grain, width in GRAINS.items():
+        buckets, bucket_codes = np.unique(dates.astype(f'U{width}'), return_inverse=True)
+        for dimension in ROLLUPS[grain]:
+            keys = dimension_keys[dimension]
+            dim_values, dim_codes = np.unique(keys, return_inverse=True)
+            combined = bucket_codes.astype(np.int64) * len(dim_values) + dim_codes
+            groups, inverse = np.unique(combined, return_inverse=True)
+            counts = np.bincount(inverse)
+            revenue = np.bincount(inverse, weights=fares)
+            discount_counts = np.bincount(inverse, weights=discounted)
+            discount_revenue = np.bincount(inverse, weights=discount_fares)
+            results.extend(zip(
+                [grain] * len(groups), [dimension] * len(groups),
+                buckets[groups // len(dim_values)].tolist(), dim_values[groups % len(dim_values)].tolist(),
+                counts.tolist(), revenue.tolist(), discount_counts.astype(np.int64).tolist(), discount_revenue.tolist()
+            ))
+    return results
+
+class RevenueRollup:
+    """Hourly and per-route/vehicle/conductor daily revenue buckets, folded in from a watermark
+    on transaction_seq, whose positions are never reused.
+
+    Only appended transactions are picked up; edits or deletes of rows behind the watermark
+    need rebuild(), which also folds archived partitions back in. Discount vs regular follows
+    the commuter's discount_type at rollup time.
+    """
+
+    def __init__(self, db_manager, chunk_size=DEFAULT_CHUNK_SIZE, auto_refresh=True):
+        self.db_manager = db_manager
+        self.chunk_size = chunk_size
+        self.auto_refresh = auto_refresh
+        self._lock = threading.Lock()
+
+    def watermark(self):
+        result = self.db_manager.execute_query(
+            "SELECT last_seq FROM rollup_watermarks WHERE name = ?", (WATERMARK_NAME,)
+        )
+        return result[0]['last_seq'] if result else 0
+
+    def pending(self):
+        result = self.db_manager.execute_query(
+            "SELECT COUNT(*) AS pending FROM transaction_seq WHERE seq > ?", (self.watermark(),)
+        )
+        return result[0]['pending'] if result else 0
+
+    def _fold_chunk(self):
+        """Rolls up the next chunk and advances the watermark in the same transaction"""
+        with self.db_manager.write_connection() as conn:
+            row = conn.execute(
+                "SELECT last_seq FROM rollup_watermarks WHERE name = ?", (WATERMARK_NAME,)
+            ).fetchone()
+            last_seq = row[0] if row else 0
+            rows = conn.execute(ROLLUP_SOURCE_QUERY, (last_seq, self.chunk_size)).fetchall()
+            if not rows:
+                return 0
+            try:
+                conn.executemany(ROLLUP_UPSERT, aggregate_chunk(rows))
+                conn.execute(WATERMARK_UPSERT, (WATERMARK_NAME, rows[-1][0]))
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            return len(rows)
+
+    def refresh(self, max_chunks=None, progress=None):
+        """Folds in every transaction past the watermark, one committed chunk at a time"""
+        if not self.db_manager.ensure_connection():
+            return 0
+        total = 0
+        chunks = 0
+        with self._lock:
+            while max_chunks is None or chunks < max_chunks:
+                folded = self._fold_chunk()
+                if not folded:
+                    break
+                total += folded
+                chunks += 1
+                if progress:
+                    progress(total)
+        if total:
+            self.db_manager.prune_change_log()
+        return total
+
+    def _fold_partition(self, partition, conn):
+        """Folds one archived month into the rollups on the writer connection, without committing"""
+        total = 0
+        last_rowid = 0
+        with self.db_manager.get_partition_manager().attached(partition) as (reader, alias):
+            query = PARTITION_SOURCE_QUERY.format(alias=alias)
+            while True:
+                rows = reader.execute(query, (last_rowid, self.chunk_size)).fetchall()
+                if not rows:
+                    return total
+                conn.executemany(ROLLUP_UPSERT, aggregate_chunk(rows))
+                last_rowid = rows[-1][0]
+                total += len(rows)
+
+    def rebuild(self, progress=None):
+        """Discards the rollups and refolds everything: archived partitions first, in one
+        transaction with the reset so readers never see them missing, then the live rows"""
+        if not self.db_manager.ensure_connection():
+            return 0
+        total = 0
+        with self._lock:
+            with self.db_manager.write_connection() as conn:
+                try:
+                    conn.execute("DELETE FROM revenue_rollup")
+                    conn.execute(WATERMARK_UPSERT, (WATERMARK_NAME, 0))
+                    for partition in self.db_manager.get_partition_manager().partitions():
+                        total += self._fold_partition(partition, conn)
+                        if progress:
+                            progress(total)
+                    conn.commit()
+                except sqlite3.Error:
+                    conn.rollback()
+                    raise
+        return total + self.refresh(progress=(lambda folded: progress(total + folded)) if progress else None)
+
+    def _rows(self, query, params):
+        if self.auto_refresh:
+            self.refresh()
+        return [
+            {
+                'key': row['key'] if row['key'] != '' else None,
+                'transactions': row['tx_count'],
+                'revenue': row['revenue'],
+                'discount_transactions': row['discount_count'],
+                'discount_revenue': row['discount_revenue'],
+                'regular_transactions': row['tx_count'] - row['discount_count'],
+                'regular_revenue': row['revenue'] - row['discount_revenue'],
+            }
+            for row in self.db_manager.execute_query(query, params) or []
+        ]
+
+    def _range(self, start, end):
+        clause, params = "", []
+        if start:
+            clause += " AND bucket >= ?"
+            params.append(start)
+        if end:
+            clause += " AND bucket < ?"
+            params.append(_upper_bound(end))
+        return clause, params
+
+    def series(self, grain='day', dimension='all', key=None, start=None, end=None):
+        """Time series of buckets between start and end ('YYYY-MM-DD' or 'YYYY-MM-DD HH', inclusive)"""
+        if dimension not in ROLLUPS.get(grain, ()):
+            raise ValueError(f"Unknown rollup {grain}/{dimension}")
+        clause, params = self._range(start, end)
+        return self._rows(f'''
+            SELECT bucket AS key, tx_count, revenue, discount_count, discount_revenue
+            FROM revenue_rollup
+            WHERE grain = ? AND dimension = ? AND dim_key = ?{clause}
+            ORDER BY bucket
+        ''', [grain, dimension, '' if key is None else str(key)] + params)
+
+    def breakdown(self, dimension, start=None, end=None, limit=None):
+        """Totals per route, vehicle or conductor over a date range, highest revenue first"""
+        if dimension not in DIMENSIONS or dimension == 'all':
+            raise ValueError(f"Unknown rollup dimension {dimension}")
+        clause, params = self._range(start, end)
+        query = f'''
+            SELECT dim_key AS key, SUM(tx_count) AS tx_count, SUM(revenue) AS revenue,
+                SUM(discount_count) AS discount_count, SUM(discount_revenue) AS discount_revenue
+            FROM revenue_rollup
+            WHERE grain = 'day' AND dimension = ?{clause}
+            GROUP BY dim_key
+            ORDER BY revenue DESC
+        '''
+        params = [dimension] + params
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return self._rows(query, params)
+
+    def totals(self, start=None, end=None):
+        clause, params = self._range(start, end)
+        rows = self._rows(f'''
+            SELECT '' AS key, COALESCE(SUM(tx_count), 0) AS tx_count, COALESCE(SUM(revenue), 0) AS revenue,
+                COALESCE(SUM(discount_count), 0) AS discount_count, COALESCE(SUM(discount_revenue), 0) AS discount_revenue
+            FROM revenue_rollup
+            WHERE grain = 'day' AND dimension = 'all'{clause}
+        ''', params)
+        return rows[0]
+
+    def revenue_by_day(self, start=None, end=None):
+        return self.series('day', start=start, end=end)
+
+    def revenue_by_hour(self, start=None, end=None):
+        return self.series('hour', start=start, end=end)
+
+    def revenue_by_route(self, start=None, end=None):
+        return self.breakdown('route', start, end)
+
+    def revenue_by_vehicle(self, start=None, end=None):
+        return self.breakdown('vehicle', start, end)
+
+    def revenue_by_conductor(self, start=None, end=None):
+        return self.breakdown('conductor', start, end)
+
+def main(argv=None):
+    from database_manager import DatabaseManager
+    parser = argparse.ArgumentParser(description="Backfill and query the revenue rollups.")
+    parser.add_argument('--database', default=DATABASE_NAME)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--rebuild', action='store_true', help="discard the rollups and backfill from scratch")
+    parser.add_argument('--report', choices=['day', 'hour', 'route', 'vehicle', 'conductor'])
+    parser.add_argument('--start', help="YYYY-MM-DD[ HH]")
+    parser.add_argument('--end', help="YYYY-MM-DD[ HH], inclusive")
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager()
+    if not db.use_database(args.database):
+        raise SystemExit(f"Could not open {args.database}")
+    rollup = RevenueRollup(db, chunk_size=args.chunk_size, auto_refresh=False)
+    started = time.perf_counter()
+    progress = lambda total: print(f"  folded {total} transactions", end='\r')
+    folded = rollup.rebuild(progress) if args.rebuild else rollup.refresh(progress=progress)
+    print(f"Folded {folded} transactions in {time.perf_counter() - started:.1f}s (watermark seq {rollup.watermark()})")
+    if args.report:
+        if args.report in GRAINS:
+            rows = rollup.series(args.report, start=args.start, end=args.end)
+        else:
+            rows = rollup.breakdown(args.report, args.start, args.end)
+        for row in rows:
+            print(f"{str(row['key']):<16} {row['transactions']:>10} {row['revenue']:>14,.2f} "
+                  f"(discount {row['discount_revenue']:,.2f})")
+    db.close()
+
+if __name__ == '__main__':
+    main()
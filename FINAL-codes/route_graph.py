@@ -0,0 +1,219 @@
+import argparse
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from collections import namedtuple
+import numpy as np
+from fare_matrix import FARE_MATRIX_QUERY
+from migrations import get_table_versions
+
+DATABASE_NAME = 'transport_app.db'
+NO_HOP = -1
+
+Leg = namedtuple('Leg', ['route_id', 'origin', 'destination', 'distance', 'price_fare', 'discount_fare'])
+Itinerary = namedtuple('Itinerary', ['stops', 'legs', 'distance', 'price_fare', 'discount_fare'])
+
+def shortest_paths(weights):
+    """All-pairs shortest distances and next hops for a dense (n, n) weight matrix (inf = no edge).
+
+    Vectorized Floyd-Warshall in float32 with preallocated buffers: each pass over an
+    intermediate stop is four whole-matrix operations and no Python-level loop over pairs.
+    """
+    size = len(weights)
+    dist = np.array(weights, dtype=np.float32)
+    np.fill_diagonal(dist, 0.0)
+    next_hop = np.where(np.isfinite(dist), np.arange(size, dtype=np.int32)[None, :], NO_HOP).astype(np.int32)
+    via = np.empty_like(dist)
+    better = np.empty(dist.shape, dtype=bool)
+    for k in range(size):
+        np.add(dist[:, k, None], dist[k, None, :], out=via)
+        np.less(via, dist, out=better)
+        np.copyto(dist, via, where=better)
+        np.copyto(next_hop, next_hop[:, k, None], where=better)
+    return dist, next_hop
+
+class RouteGraph:
+    """Stop graph built from every direct route, with all-pairs shortest paths precomputed.
+
+    Routes are directed origin -> destination legs; parallel routes keep the shortest one.
+    Paths minimise total distance and a multi-leg fare is the sum of the legs' fares, one
+    ride per leg. The precomputation is O(stops^3), so a reload that finds the same edge
+    weights (a fare-only edit, say) keeps the existing paths and only swaps the legs, and
+    reloads after an edit run on a background thread while lookups keep answering from the
+    previous paths until the new ones are swapped in.
+    """
+
+    WATCHED_TABLES = ('routes', 'fares')
+
+    def __init__(self, db_manager, check_interval=2.0, background=True):
+        self.db_manager = db_manager
+        self.check_interval = check_interval
+        self.background = background
+        self.stops = []
+        self.stop_index = {}
+        self.legs = {}
+        self.distances = np.empty((0, 0))
+        self.next_hop = np.empty((0, 0), dtype=np.int32)
+        self.build_seconds = 0.0
+        self._weights = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._rebuild = None
+        self.load()
+
+    def _current_version(self):
+        with self.db_manager.read_connection() as conn:
+            try:
+                versions = get_table_versions(conn, self.WATCHED_TABLES)
+            except sqlite3.Error:
+                return None
+        return tuple(versions.get(t, 0) for t in self.WATCHED_TABLES)
+
+    def load(self):
+        with self._load_lock:
+            self._load()
+
+    def _load(self):
+        if not self.db_manager.ensure_connection():
+            return
+        version = self._current_version()
+        rows = self.db_manager.execute_query(FARE_MATRIX_QUERY) or []
+        started = time.perf_counter()
+        stops = sorted({row['origin'] for row in rows} | {row['destination'] for row in rows})
+        stop_index = {sys.intern(name): i for i, name in enumerate(stops)}
+        size = len(stops)
+        weights = np.full((size, size), np.inf)
+        legs = {}
+        for row in rows:
+            i, j = stop_index[row['origin']], stop_index[row['destination']]
+            distance = row['distance']
+            if i == j or distance is None:
+                continue
+            # Rows arrive in fare_id order, so ties keep the first fare like FareMatrix does
+            if distance < weights[i, j]:
+                weights[i, j] = distance
+                discount = row['discount_fare'] if row['discount_fare'] is not None else row['price_fare']
+                legs[(i, j)] = Leg(row['route_id'], stops[i], stops[j], distance, row['price_fare'], discount)
+        if self._weights is not None and np.array_equal(weights, self._weights) and stops == self.stops:
+            distances, next_hop = self.distances, self.next_hop
+        else:
+            distances, next_hop = shortest_paths(weights)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.stops = stops
+            self.stop_index = stop_index
+            self.legs = legs
+            self.distances = distances
+            self.next_hop = next_hop
+            self.build_seconds = elapsed
+            self._weights = weights
+            self._version = version
+            self._checked_at = time.monotonic()
+
+    def refresh_if_stale(self, force=False, wait=False):
+        """Rebuilds when routes or fares changed; checks at most once per check_interval.
+
+        The rebuild runs in the background unless wait is set or background is off, so a
+        lookup on the GUI thread never waits for the O(stops^3) pass.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        version = self._current_version()
+        if version is None or version != self._version:
+            if wait or not self.background:
+                self.load()
+            else:
+                self._start_rebuild()
+            return True
+        return False
+
+    def _start_rebuild(self):
+        with self._lock:
+            if self._rebuild is not None and self._rebuild.is_alive():
+                return
+            self._rebuild = threading.Thread(target=self._run_rebuild, name='route-graph-rebuild', daemon=True)
+            self._rebuild.start()
+
+    def _run_rebuild(self):
+        try:
+            self.load()
+        except Exception:
+            traceback.print_exc()
+
+    def wait_for_rebuild(self, timeout=None):
+        """Blocks until a background rebuild in progress has swapped its paths in"""
+        rebuild = self._rebuild
+        if rebuild is not None:
+            rebuild.join(timeout)
+
+    def distance(self, origin, destination):
+        """Shortest network distance in km, or None when destination is unreachable"""
+        self.refresh_if_stale()
+        with self._lock:
+            i = self.stop_index.get(origin)
+            j = self.stop_index.get(destination)
+            if i is None or j is None or self.next_hop[i, j] == NO_HOP:
+                return None
+            return float(self.distances[i, j])
+
+    def itinerary(self, origin, destination):
+        """Legs of the shortest path with summed distance and fares, or None when unreachable"""
+        self.refresh_if_stale()
+        with self._lock:
+            i = self.stop_index.get(origin)
+            j = self.stop_index.get(destination)
+            if i is None or j is None or i == j or self.next_hop[i, j] == NO_HOP:
+                return None
+            legs = []
+            while i != j:
+                hop = int(self.next_hop[i, j])
+                legs.append(self.legs[(i, hop)])
+                i = hop
+        stops = [legs[0].origin] + [leg.destination for leg in legs]
+        return Itinerary(
+            stops, legs,
+            round(sum(leg.distance for leg in legs), 2),
+            round(sum(leg.price_fare for leg in legs), 2),
+            round(sum(leg.discount_fare for leg in legs), 2),
+        )
+
+    def fare_for(self, origin, destination, passenger_type='Regular'):
+        itinerary = self.itinerary(origin, destination)
+        if itinerary is None:
+            return None
+        return itinerary.price_fare if passenger_type == 'Regular' else itinerary.discount_fare
+
+def main(argv=None):
+    from database_manager import DatabaseManager
+    parser = argparse.ArgumentParser(description="Plan multi-leg trips over the route network.")
+    parser.add_argument('origin')
+    parser.add_argument('destination')
+    parser.add_argument('--database', default=DATABASE_NAME)
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager()
+    if not db.use_database(args.database):
+        raise SystemExit(f"Could not open {args.database}")
+    graph = db.get_route_graph()
+    print(f"{len(graph.stops)} stops, {len(graph.legs)} legs, paths built in {graph.build_seconds * 1000:.1f} ms")
+    started = time.perf_counter()
+    itinerary = graph.itinerary(args.origin, args.destination)
+    elapsed = time.perf_counter() - started
+    if itinerary is None:
+        print(f"No route from {args.origin} to {args.destination}")
+    else:
+        for leg in itinerary.legs:
+            print(f"  {leg.origin} -> {leg.destination}: {leg.distance} km, {leg.price_fare:.2f} PHP (route {leg.route_id})")
+        print(f"Total {itinerary.distance:.1f} km, {itinerary.price_fare:.2f} PHP regular, "
+              f"{itinerary.discount_fare:.2f} PHP discounted")
+    print(f"Lookup took {elapsed * 1000:.3f} ms")
+    db.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,15 @@
-import sqlite3
 from PyQt5 import QtWidgets
 from PyQt5.QtWidgets import QMessageBox, QButtonGroup, QRadioButton, QLabel, QComboBox, QPushButton
+from database_manager import DatabaseManager
 
 class FareCalculatorApp(QtWidgets.QWidget):
     def __init__(self, db_manager=None):
         super().__init__()
+        if db_manager is None:
+            db_manager = DatabaseManager()
+            db_manager.ensure_connection()
         self.db_manager = db_manager
+        self.fare_matrix = db_manager.get_fare_matrix()
         self.init_ui()
 
     def init_ui(self):
@@ -56,28 +60,12 @@ class FareCalculatorApp(QtWidgets.QWidget):
         self.setLayout(layout)
 
     def fetch_origins(self):
-        if self.db_manager:
-            origins = self.db_manager.execute_query("SELECT DISTINCT origin FROM routes ORDER BY origin")
-            return [row['origin'] for row in origins] if origins else []
-        else:
-            conn = sqlite3.connect('transport_app.db')
-            cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT origin FROM routes ORDER BY origin")
-            result = [row[0] for row in cursor.fetchall()]
-            conn.close()
-            return result
+        self.fare_matrix.refresh_if_stale()
+        return list(self.fare_matrix.origins)
 
     def fetch_destinations(self):
-        if self.db_manager:
-            destinations = self.db_manager.execute_query("SELECT DISTINCT destination FROM routes ORDER BY destination")
-            return [row['destination'] for row in destinations] if destinations else []
-        else:
-            conn = sqlite3.connect('transport_app.db')
-            cursor = conn.cursor()
-            cursor.execute("SELECT DISTINCT destination FROM routes ORDER BY destination")
-            result = [row[0] for row in cursor.fetchall()]
-            conn.close()
-            return result
+        self.fare_matrix.refresh_if_stale()
+        return list(self.fare_matrix.destinations)
 
     def calculate_fare(self):
         origin = self.origin_combo.currentText()
@@ -101,41 +89,30 @@ class FareCalculatorApp(QtWidgets.QWidget):
                 f"Origin: {origin}\nDestination: {destination}\nTotal KM: 0\nTotal Fare: {base_fare:.2f} PHP ({passenger_type})"
             )
             return
-        if self.db_manager:
-            query = '''
-SELECT r.route_id, r.distance, f.price_fare, f.discount_fare
-FROM routes r
-JOIN fares f ON r.route_id = f.route_id
-WHERE r.origin = ? AND r.destination = ?
-'''
-            res = self.db_manager.execute_query(query, (origin, destination))
-            if not res:
-                self.show_message("Error", "Route not found.")
-                return
-            res = res[0]
-            distance = res['distance']
-            price_fare = res['price_fare']
-            discount_fare = res['discount_fare']
-        else:
-            conn = sqlite3.connect('transport_app.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-SELECT r.route_id, r.distance, f.price_fare, f.discount_fare
-FROM routes r
-JOIN fares f ON r.route_id = f.route_id
-WHERE r.origin = ? AND r.destination = ?
-''', (origin, destination))
-            res = cursor.fetchone()
-            conn.close()
-            if not res:
-                self.show_message("Error", "Route not found.")
-                return
-            _, distance, price_fare, discount_fare = res
+        quote = self.fare_matrix.lookup(origin, destination)
+        if quote is None:
+            self.show_itinerary(origin, destination, passenger_type)
+            return
+        distance = quote.distance
+        price_fare = quote.price_fare
+        discount_fare = quote.discount_fare
         fare = price_fare if passenger_type == 'Regular' else discount_fare
         self.result_label.setText(
             f"Origin: {origin}\nDestination: {destination}\nTotal KM: {distance}\nTotal Fare: {fare:.2f} PHP ({passenger_type})"
         )
 
+    def show_itinerary(self, origin, destination, passenger_type):
+        # No direct route: quote the shortest chain of routes, one fare per leg
+        itinerary = self.db_manager.get_route_graph().itinerary(origin, destination)
+        if itinerary is None:
+            self.show_message("Error", "Route not found.")
+            return
+        fare = itinerary.price_fare if passenger_type == 'Regular' else itinerary.discount_fare
+        self.result_label.setText(
+            f"Origin: {origin}\nDestination: {destination}\nVia: {' > '.join(itinerary.stops)}\n"
+            f"Total KM: {itinerary.distance:g}\nTotal Fare: {fare:.2f} PHP ({passenger_type}, {len(itinerary.legs)} rides)"
+        )
+
     def show_message(self, title, message):
         msg_box = QMessageBox(self)
         msg_box.setWindowTitle(title)
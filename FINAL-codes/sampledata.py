@@ -1,7 +1,54 @@
 import sqlite3
+from id_generator import new_transaction_id, timestamp_ms
 
 DATABASE_NAME = 'transport_app.db'
 
+ROUTES_DATA = [
+    ('Antipolo', 'Antipolo', 0), ('Antipolo', 'Cogeo', 6.7), ('Antipolo', 'Penafrancia', 8.7),
+    ('Antipolo', 'Masinag', 10.4), ('Antipolo', 'Cainta', 10.6), ('Antipolo', 'Katipunan', 15.2),
+    ('Antipolo', 'Anonas', 16.7), ('Antipolo', 'T.I.P.', 17.7),
+    ('Cogeo', 'Antipolo', 6.7), ('Cogeo', 'Cogeo', 0), ('Cogeo', 'Penafrancia', 2.7),
+    ('Cogeo', 'Masinag', 5.8), ('Cogeo', 'Cainta', 6.6), ('Cogeo', 'Katipunan', 10.6),
+    ('Cogeo', 'Anonas', 11.5), ('Cogeo', 'T.I.P.', 13.0),
+    ('Penafrancia', 'Antipolo', 8.7), ('Penafrancia', 'Cogeo', 2.7), ('Penafrancia', 'Penafrancia', 0),
+    ('Penafrancia', 'Masinag', 3.1), ('Penafrancia', 'Cainta', 5.8), ('Penafrancia', 'Katipunan', 8.2),
+    ('Penafrancia', 'Anonas', 8.9), ('Penafrancia', 'T.I.P.', 9.3),
+    ('Masinag', 'Antipolo', 10.4), ('Masinag', 'Cogeo', 5.8), ('Masinag', 'Penafrancia', 3.1),
+    ('Masinag', 'Masinag', 0), ('Masinag', 'Cainta', 2.1), ('Masinag', 'Katipunan', 6.0),
+    ('Masinag', 'Anonas', 7.7), ('Masinag', 'T.I.P.', 8.5),
+    ('Cainta', 'Antipolo', 10.6), ('Cainta', 'Cogeo', 6.6), ('Cainta', 'Penafrancia', 5.8),
+    ('Cainta', 'Masinag', 2.1), ('Cainta', 'Cainta', 0), ('Cainta', 'Katipunan', 3.9),
+    ('Cainta', 'Anonas', 5.6), ('Cainta', 'T.I.P.', 6.6),
+    ('Katipunan', 'Antipolo', 15.2), ('Katipunan', 'Cogeo', 10.6), ('Katipunan', 'Penafrancia', 8.2),
+    ('Katipunan', 'Masinag', 6.0), ('Katipunan', 'Cainta', 3.9), ('Katipunan', 'Katipunan', 0),
+    ('Katipunan', 'Anonas', 1.0), ('Katipunan', 'T.I.P.', 1.3),
+    ('Anonas', 'Antipolo', 16.7), ('Anonas', 'Cogeo', 11.5), ('Anonas', 'Penafrancia', 8.9),
+    ('Anonas', 'Masinag', 7.7), ('Anonas', 'Cainta', 5.6), ('Anonas', 'Katipunan', 1.0),
+    ('Anonas', 'Anonas', 0), ('Anonas', 'T.I.P.', 0.4),
+    ('T.I.P.', 'Antipolo', 17.7), ('T.I.P.', 'Cogeo', 13.0), ('T.I.P.', 'Penafrancia', 9.3),
+    ('T.I.P.', 'Masinag', 8.5), ('T.I.P.', 'Cainta', 6.6), ('T.I.P.', 'Katipunan', 1.3),
+    ('T.I.P.', 'Anonas', 0.4), ('T.I.P.', 'T.I.P.', 0)
+]
+
+FARES_DATA = [
+    (1, 15.00, 12.00), (2, 20.94, 16.75), (3, 25.34, 20.27), (4, 29.08, 23.26),
+    (5, 29.52, 23.62), (6, 39.64, 31.71), (7, 42.94, 34.35), (8, 45.14, 36.11),
+    (9, 20.94, 16.75), (10, 15.00, 12.00), (11, 15.00, 12.00), (12, 18.96, 15.17),
+    (13, 20.72, 16.58), (14, 29.52, 23.62), (15, 31.50, 25.20), (16, 34.80, 27.84),
+    (17, 25.34, 20.27), (18, 15.00, 12.00), (19, 15.00, 12.00), (20, 15.00, 12.00),
+    (21, 18.96, 15.17), (22, 24.24, 19.39), (23, 25.78, 20.62), (24, 26.66, 21.33),
+    (25, 29.08, 23.26), (26, 18.96, 15.17), (27, 15.00, 12.00), (28, 15.00, 12.00),
+    (29, 15.00, 12.00), (30, 19.40, 15.52), (31, 23.14, 18.51), (32, 24.90, 19.92),
+    (33, 29.52, 23.62), (34, 20.72, 16.58), (35, 18.96, 15.17), (36, 15.00, 12.00),
+    (37, 15.00, 12.00), (38, 15.00, 12.00), (39, 18.52, 14.82), (40, 20.72, 16.58),
+    (41, 39.64, 31.71), (42, 29.52, 23.62), (43, 24.24, 19.39), (44, 19.40, 15.52),
+    (45, 15.00, 12.00), (46, 15.00, 12.00), (47, 15.00, 12.00), (48, 15.00, 12.00),
+    (49, 42.94, 34.35), (50, 31.50, 25.20), (51, 25.78, 20.62), (52, 23.14, 18.51),
+    (53, 20.72, 16.58), (54, 15.00, 12.00), (55, 15.00, 12.00), (56, 15.00, 12.00),
+    (57, 45.14, 36.11), (58, 34.80, 27.84), (59, 26.66, 21.33), (60, 24.90, 19.92),
+    (61, 20.72, 16.58), (62, 15.00, 12.00), (63, 15.00, 12.00), (64, 15.00, 12.00)
+]
+
 def insert_sample_data(conn):
     cursor = conn.cursor()
 
@@ -123,32 +170,7 @@ def insert_sample_data(conn):
     print("Inserted vehicles")
 
     # Insert Routes (from original code)
-    routes_data = [
-        ('Antipolo', 'Antipolo', 0), ('Antipolo', 'Cogeo', 6.7), ('Antipolo', 'Penafrancia', 8.7),
-        ('Antipolo', 'Masinag', 10.4), ('Antipolo', 'Cainta', 10.6), ('Antipolo', 'Katipunan', 15.2),
-        ('Antipolo', 'Anonas', 16.7), ('Antipolo', 'T.I.P.', 17.7),
-        ('Cogeo', 'Antipolo', 6.7), ('Cogeo', 'Cogeo', 0), ('Cogeo', 'Penafrancia', 2.7),
-        ('Cogeo', 'Masinag', 5.8), ('Cogeo', 'Cainta', 6.6), ('Cogeo', 'Katipunan', 10.6),
-        ('Cogeo', 'Anonas', 11.5), ('Cogeo', 'T.I.P.', 13.0),
-        ('Penafrancia', 'Antipolo', 8.7), ('Penafrancia', 'Cogeo', 2.7), ('Penafrancia', 'Penafrancia', 0),
-        ('Penafrancia', 'Masinag', 3.1), ('Penafrancia', 'Cainta', 5.8), ('Penafrancia', 'Katipunan', 8.2),
-        ('Penafrancia', 'Anonas', 8.9), ('Penafrancia', 'T.I.P.', 9.3),
-        ('Masinag', 'Antipolo', 10.4), ('Masinag', 'Cogeo', 5.8), ('Masinag', 'Penafrancia', 3.1),
-        ('Masinag', 'Masinag', 0), ('Masinag', 'Cainta', 2.1), ('Masinag', 'Katipunan', 6.0),
-        ('Masinag', 'Anonas', 7.7), ('Masinag', 'T.I.P.', 8.5),
-        ('Cainta', 'Antipolo', 10.6), ('Cainta', 'Cogeo', 6.6), ('Cainta', 'Penafrancia', 5.8),
-        ('Cainta', 'Masinag', 2.1), ('Cainta', 'Cainta', 0), ('Cainta', 'Katipunan', 3.9),
-        ('Cainta', 'Anonas', 5.6), ('Cainta', 'T.I.P.', 6.6),
-        ('Katipunan', 'Antipolo', 15.2), ('Katipunan', 'Cogeo', 10.6), ('Katipunan', 'Penafrancia', 8.2),
-        ('Katipunan', 'Masinag', 6.0), ('Katipunan', 'Cainta', 3.9), ('Katipunan', 'Katipunan', 0),
-        ('Katipunan', 'Anonas', 1.0), ('Katipunan', 'T.I.P.', 1.3),
-        ('Anonas', 'Antipolo', 16.7), ('Anonas', 'Cogeo', 11.5), ('Anonas', 'Penafrancia', 8.9),
-        ('Anonas', 'Masinag', 7.7), ('Anonas', 'Cainta', 5.6), ('Anonas', 'Katipunan', 1.0),
-        ('Anonas', 'Anonas', 0), ('Anonas', 'T.I.P.', 0.4),
-        ('T.I.P.', 'Antipolo', 17.7), ('T.I.P.', 'Cogeo', 13.0), ('T.I.P.', 'Penafrancia', 9.3),
-        ('T.I.P.', 'Masinag', 8.5), ('T.I.P.', 'Cainta', 6.6), ('T.I.P.', 'Katipunan', 1.3),
-        ('T.I.P.', 'Anonas', 0.4), ('T.I.P.', 'T.I.P.', 0)
-    ]
+    routes_data = ROUTES_DATA
     cursor.executemany(
         "INSERT INTO routes (origin, destination, distance) VALUES (?, ?, ?)",
         routes_data
@@ -156,24 +178,7 @@ def insert_sample_data(conn):
     print("Inserted routes")
 
     # Insert Fares (from original code)
-    fares_data = [
-            (1, 15.00, 12.00), (2, 20.94, 16.75), (3, 25.34, 20.27), (4, 29.08, 23.26),
-            (5, 29.52, 23.62), (6, 39.64, 31.71), (7, 42.94, 34.35), (8, 45.14, 36.11),
-            (9, 20.94, 16.75), (10, 15.00, 12.00), (11, 15.00, 12.00), (12, 18.96, 15.17),
-            (13, 20.72, 16.58), (14, 29.52, 23.62), (15, 31.50, 25.20), (16, 34.80, 27.84),
-            (17, 25.34, 20.27), (18, 15.00, 12.00), (19, 15.00, 12.00), (20, 15.00, 12.00),
-            (21, 18.96, 15.17), (22, 24.24, 19.39), (23, 25.78, 20.62), (24, 26.66, 21.33),
-            (25, 29.08, 23.26), (26, 18.96, 15.17), (27, 15.00, 12.00), (28, 15.00, 12.00),
-            (29, 15.00, 12.00), (30, 19.40, 15.52), (31, 23.14, 18.51), (32, 24.90, 19.92),
-            (33, 29.52, 23.62), (34, 20.72, 16.58), (35, 18.96, 15.17), (36, 15.00, 12.00),
-            (37, 15.00, 12.00), (38, 15.00, 12.00), (39, 18.52, 14.82), (40, 20.72, 16.58),
-            (41, 39.64, 31.71), (42, 29.52, 23.62), (43, 24.24, 19.39), (44, 19.40, 15.52),
-            (45, 15.00, 12.00), (46, 15.00, 12.00), (47, 15.00, 12.00), (48, 15.00, 12.00),
-            (49, 42.94, 34.35), (50, 31.50, 25.20), (51, 25.78, 20.62), (52, 23.14, 18.51),
-            (53, 20.72, 16.58), (54, 15.00, 12.00), (55, 15.00, 12.00), (56, 15.00, 12.00),
-            (57, 45.14, 36.11), (58, 34.80, 27.84), (59, 26.66, 21.33), (60, 24.90, 19.92),
-            (61, 20.72, 16.58), (62, 15.00, 12.00), (63, 15.00, 12.00), (64, 15.00, 12.00)
-        ]
+    fares_data = FARES_DATA
 
     cursor.executemany(
         "INSERT INTO fares (route_id, price_fare, discount_fare) VALUES (?, ?, ?)",
@@ -191,9 +196,9 @@ def insert_sample_data(conn):
     
     cursor.executemany(
         """INSERT INTO transactions
-        (commuter_id, route_id, vehicle_id, conductor_id, fare_id, total_fare, transaction_date)
-        VALUES (?, ?, ?, ?, ?, ?, ?)""",
-        transactions_data
+        (transaction_id, commuter_id, route_id, vehicle_id, conductor_id, fare_id, total_fare, transaction_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        [(new_transaction_id(timestamp_ms(row[-1])),) + row for row in transactions_data]
     )
     
     print("Inserted transactions")
@@ -0,0 +1,168 @@
+import json
+
+# One statement returns the role record, the latest vehicle assignment and the
+# reference lists the role's panel needs, so logging in costs a single round trip.
+SESSION_QUERY = '''
+SELECT u.*,
+    c.commuter_id, c.contact_no, c.discount_type, c.preferred_route,
+    d.driver_id,
+    COALESCE(d.license_no, k.license_no) AS license_no,
+    k.conductor_id,
+    a.admin_id, a.role,
+    va.vehicle_id AS assigned_vehicle_id,
+    v.plate_no AS assigned_plate_no,
+    va.assignment_date AS assigned_since,
+    CASE WHEN u.user_type IN ('Commuter', 'Conductor') THEN (
+        SELECT json_group_array(json_object('route_id', route_id, 'origin', origin, 'destination', destination))
+        FROM (SELECT route_id, origin, destination FROM routes ORDER BY route_id)
+    ) END AS routes_json,
+    CASE WHEN u.user_type = 'Commuter' THEN (
+        SELECT json_group_array(driver_id) FROM (SELECT driver_id FROM drivers ORDER BY driver_id)
+    ) END AS driver_ids_json,
+    CASE WHEN u.user_type = 'Commuter' THEN (
+        SELECT json_group_array(conductor_id) FROM (SELECT conductor_id FROM conductors ORDER BY conductor_id)
+    ) END AS conductor_ids_json,
+    CASE WHEN u.user_type = 'Conductor' THEN (
+        SELECT json_group_array(commuter_id) FROM (SELECT commuter_id FROM commuters ORDER BY commuter_id)
+    ) END AS commuter_ids_json,
+    CASE WHEN u.user_type = 'Conductor' THEN (
+        SELECT json_group_array(fare_id) FROM (SELECT fare_id FROM fares ORDER BY fare_id)
+    ) END AS fare_ids_json
+FROM users u
+LEFT JOIN commuters c ON u.user_id = c.user_id
+LEFT JOIN drivers d ON u.user_id = d.user_id
+LEFT JOIN conductors k ON u.user_id = k.user_id
+LEFT JOIN admins a ON u.user_id = a.user_id
+LEFT JOIN vehicle_assignment va ON va.assignment_id = COALESCE(
+    (SELECT assignment_id FROM vehicle_assignment
+     WHERE conductor_id = k.conductor_id ORDER BY assignment_date DESC LIMIT 1),
+    (SELECT assignment_id FROM vehicle_assignment
+     WHERE driver_id = d.driver_id ORDER BY assignment_date DESC LIMIT 1)
+)
+LEFT JOIN vehicles v ON va.vehicle_id = v.vehicle_id
+'''
+
+ASSIGNMENT_QUERY = '''
+SELECT va.vehicle_id, v.plate_no, va.assignment_date
+FROM vehicle_assignment va
+JOIN vehicles v ON va.vehicle_id = v.vehicle_id
+WHERE va.{column} = ?
+ORDER BY va.assignment_date DESC
+LIMIT 1
+'''
+
+# Reference lists fetched at login: source table -> (user types that get it, query to re-read it)
+SESSION_LISTS = {
+    'routes': (('Commuter', 'Conductor'), "SELECT route_id, origin, destination FROM routes ORDER BY route_id"),
+    'drivers': (('Commuter',), "SELECT driver_id FROM drivers ORDER BY driver_id"),
+    'conductors': (('Commuter',), "SELECT conductor_id FROM conductors ORDER BY conductor_id"),
+    'commuters': (('Conductor',), "SELECT commuter_id FROM commuters ORDER BY commuter_id"),
+    'fares': (('Conductor',), "SELECT fare_id FROM fares ORDER BY fare_id"),
+}
+_ID_LISTS = {
+    'drivers': ('driver_ids', 'driver_id'),
+    'conductors': ('conductor_ids', 'conductor_id'),
+    'commuters': ('commuter_ids', 'commuter_id'),
+    'fares': ('fare_ids', 'fare_id'),
+}
+
+_JSON_COLUMNS = ('routes_json', 'driver_ids_json', 'conductor_ids_json', 'commuter_ids_json', 'fare_ids_json')
+_ASSIGNMENT_COLUMNS = ('assigned_vehicle_id', 'assigned_plate_no', 'assigned_since')
+
+def _decode(value):
+    return json.loads(value) if value else []
+
+class Session:
+    """Everything a logged-in user's panel needs, fetched at login; refresh_lists() re-reads
+    the reference lists when the change log reports their tables changed"""
+
+    def __init__(self, db_manager, row):
+        self.db_manager = db_manager
+        data = dict(row)
+        self._set_list('routes', _decode(data.get('routes_json')))
+        for table, json_column in (('drivers', 'driver_ids_json'), ('conductors', 'conductor_ids_json'),
+                                   ('commuters', 'commuter_ids_json'), ('fares', 'fare_ids_json')):
+            column = _ID_LISTS[table][1]
+            self._set_list(table, [{column: i} for i in _decode(data.get(json_column))])
+        if data.get('assigned_vehicle_id') is not None:
+            self.assigned_vehicle = {
+                'vehicle_id': data['assigned_vehicle_id'],
+                'plate_no': data['assigned_plate_no'],
+                'assignment_date': data['assigned_since'],
+            }
+        else:
+            self.assigned_vehicle = None
+        for column in _JSON_COLUMNS + _ASSIGNMENT_COLUMNS:
+            data.pop(column, None)
+        self.user = data
+
+    def _set_list(self, table, rows):
+        if table == 'routes':
+            self.routes = rows
+            self.route_ids = [
+                {'route_id': r['route_id'], 'route_desc': f"{r['origin']} to {r['destination']}"}
+                for r in rows
+            ]
+        else:
+            attribute, column = _ID_LISTS[table]
+            setattr(self, attribute, [{column: r[column]} for r in rows])
+
+    @classmethod
+    def login(cls, db_manager, username, password):
+        result = db_manager.execute_query(
+            SESSION_QUERY + "WHERE u.username = ? AND u.password = ?",
+            (username, password)
+        )
+        return cls(db_manager, result[0]) if result else None
+
+    @classmethod
+    def for_user(cls, db_manager, user_id):
+        result = db_manager.execute_query(SESSION_QUERY + "WHERE u.user_id = ?", (user_id,))
+        return cls(db_manager, result[0]) if result else None
+
+    @property
+    def user_type(self):
+        return self.user.get('user_type')
+
+    @property
+    def user_id(self):
+        return self.user.get('user_id')
+
+    @property
+    def assigned_vehicle_id(self):
+        return self.assigned_vehicle['vehicle_id'] if self.assigned_vehicle else None
+
+    def refresh_assignment(self):
+        """Re-reads only the vehicle assignment, e.g. after an admin reassigns the crew"""
+        if self.user.get('conductor_id'):
+            column, key = 'conductor_id', self.user['conductor_id']
+        elif self.user.get('driver_id'):
+            column, key = 'driver_id', self.user['driver_id']
+        else:
+            return None
+        result = self.db_manager.execute_query(ASSIGNMENT_QUERY.format(column=column), (key,))
+        self.assigned_vehicle = dict(result[0]) if result else None
+        return self.assigned_vehicle
+
+    def list_tables(self):
+        """Tables this user's reference lists come from, for change log subscriptions"""
+        return [table for table, (user_types, _) in SESSION_LISTS.items() if self.user_type in user_types]
+
+    def refresh_lists(self, tables=None):
+        """Re-reads the lists fed by tables (all of this user's by default); returns the tables refreshed"""
+        refreshed = []
+        for table in self.list_tables():
+            if tables is not None and table not in tables:
+                continue
+            result = self.db_manager.execute_query(SESSION_LISTS[table][1])
+            if result is None:
+                continue
+            self._set_list(table, [dict(row) for row in result])
+            refreshed.append(table)
+        return refreshed
+
+    def reload(self):
+        fresh = Session.for_user(self.db_manager, self.user_id)
+        if fresh is not None:
+            self.__dict__.update(fresh.__dict__)
+        return self
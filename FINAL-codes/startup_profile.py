@@ -0,0 +1,108 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+DEFAULT_ENTRY = 'main_window'
+DEFAULT_TOP = 25
+# Modules that should only load after a role logs in; finding one at startup is a regression
+DEFERRED_MODULES = (
+    'admin_panel', 'commuter_panel', 'conductor_panel', 'driver_panel',
+    'routes_fares', 'PyQt5.QtSql', 'numpy',
+)
+
+STARTUP_PROBE = '''
+import sys, time
+started = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv[:1])
+import {entry}
+imported = time.perf_counter()
+window = {entry}.MainWindow()
+window.show()
+app.processEvents()
+shown = time.perf_counter()
+print("IMPORT_MS", (imported - started) * 1000.0)
+print("SHOWN_MS", (shown - started) * 1000.0)
+print("LOADED", ",".join(name for name in {deferred!r} if name in sys.modules))
+'''
+
+def parse_importtime(stderr):
+    """Parses `python -X importtime` output into (module, self_us, cumulative_us) tuples"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+def profile_imports(entry=DEFAULT_ENTRY, cwd=None):
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {entry}'],
+        cwd=cwd, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing {entry} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+def profile_startup(entry=DEFAULT_ENTRY):
+    """Wall time until the login window is shown, in a fresh interpreter.
+
+    Runs from a scratch directory so the probe's database file does not land in the checkout.
+    """
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [os.path.dirname(os.path.abspath(__file__)), env.get('PYTHONPATH')])
+    )
+    with tempfile.TemporaryDirectory() as scratch:
+        result = subprocess.run(
+            [sys.executable, '-c', STARTUP_PROBE.format(entry=entry, deferred=DEFERRED_MODULES)],
+            cwd=scratch, capture_output=True, text=True, env=env
+        )
+    if result.returncode != 0:
+        raise SystemExit(f"Starting {entry} failed:\n{result.stderr[-2000:]}")
+    report = {}
+    for line in result.stdout.splitlines():
+        key, _, value = line.partition(' ')
+        if key in ('IMPORT_MS', 'SHOWN_MS'):
+            report[key.lower()] = float(value)
+        elif key == 'LOADED':
+            report['deferred_loaded'] = [name for name in value.split(',') if name]
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report import time and cold start of the app.")
+    parser.add_argument('--entry', default=DEFAULT_ENTRY)
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help="slowest modules to list")
+    parser.add_argument('--runs', type=int, default=3, help="cold starts to take the best of")
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help="exit non-zero if the login window takes longer than this to show")
+    args = parser.parse_args(argv)
+
+    entries = profile_imports(args.entry)
+    total_us = sum(self_us for _, self_us, _ in entries)
+    print(f"{len(entries)} modules imported by '{args.entry}' in {total_us / 1000:.1f} ms")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    runs = [profile_startup(args.entry) for _ in range(max(1, args.runs))]
+    best = min(runs, key=lambda r: r['shown_ms'])
+    print(f"Cold start: imports {best['import_ms']:.1f} ms, login window shown {best['shown_ms']:.1f} ms "
+          f"(best of {len(runs)})")
+    failed = False
+    if best['deferred_loaded']:
+        print(f"Loaded before login: {', '.join(best['deferred_loaded'])}")
+        failed = True
+    if args.budget_ms is not None and best['shown_ms'] > args.budget_ms:
+        print(f"Over budget: {best['shown_ms']:.1f} ms > {args.budget_ms:.1f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
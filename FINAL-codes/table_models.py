@@ -0,0 +1,209 @@
+from datetime import datetime
+from functools import lru_cache
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+
+DEFAULT_PAGE_SIZE = 200
+
+@lru_cache(maxsize=4096)
+def format_datetime(dt_str):
+    """Formats datetime string for display"""
+    try:
+        dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S")
+        return dt.strftime("%b %d, %Y %H:%M")
+    except (TypeError, ValueError):
+        return dt_str
+
+def format_currency(value):
+    try:
+        return f"₱{value:,.2f}"
+    except (TypeError, ValueError):
+        return str(value)
+
+class ColumnTableModel(QAbstractTableModel):
+    """Read-only grid over raw column lists; cells are formatted only when a view asks for them.
+
+    With a page_loader(cursor, limit) the model pulls keyset pages on demand through
+    canFetchMore/fetchMore, and page_key(row) gives the cursor for the page after row.
+    Given a JobRunner, pages load on a pool thread and loading_changed reports progress.
+
+    For newest-first grids, delta_loader(high_water) returns rows newer than the first
+    row's key so refresh_delta() can prepend them instead of reloading the history.
+    """
+
+    loading_changed = pyqtSignal(bool)
+
+    def __init__(self, headers, keys, formatters=None, page_loader=None, page_key=None,
+                 page_size=DEFAULT_PAGE_SIZE, runner=None, delta_loader=None, parent=None):
+        super().__init__(parent)
+        self.runner = runner
+        self.loading = False
+        self._generation = 0
+        self.headers = list(headers)
+        self.keys = list(keys)
+        self.formatters = formatters or {}
+        self.page_loader = page_loader
+        self.page_key = page_key
+        self.page_size = page_size
+        self.delta_loader = delta_loader
+        self._high_water = None
+        self._columns = [[] for _ in self.keys]
+        self._row_count = 0
+        self._cursor = None
+        self._exhausted = page_loader is None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.keys)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and section < len(self.headers):
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            value = self._columns[index.column()][index.row()]
+            formatter = self.formatters.get(self.keys[index.column()])
+            if formatter is not None:
+                return formatter(value)
+            return "" if value is None else str(value)
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
+
+    def raw_value(self, row, key):
+        return self._columns[self.keys.index(key)][row]
+
+    def _split_rows(self, rows):
+        columns = [[] for _ in self.keys]
+        for row in rows:
+            for column, key in zip(columns, self.keys):
+                column.append(row[key])
+        return columns
+
+    def set_rows(self, rows):
+        """Replaces the whole buffer, e.g. for data that is not paginated"""
+        rows = list(rows or [])
+        self.beginResetModel()
+        self._columns = self._split_rows(rows)
+        self._row_count = len(rows)
+        self._cursor = self.page_key(rows[-1]) if rows and self.page_key else None
+        self._high_water = self.page_key(rows[0]) if rows and self.page_key else None
+        self._exhausted = True
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        rows = list(rows or [])
+        if not rows:
+            return
+        first = self._row_count
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        for column, values in zip(self._columns, self._split_rows(rows)):
+            column.extend(values)
+        self._row_count += len(rows)
+        self.endInsertRows()
+
+    def prepend_rows(self, rows):
+        """Inserts rows (newest first) above the buffer and advances the high-water mark"""
+        rows = list(rows or [])
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), 0, len(rows) - 1)
+        for column, values in zip(self._columns, self._split_rows(rows)):
+            column[0:0] = values
+        self._row_count += len(rows)
+        self.endInsertRows()
+        self._high_water = self.page_key(rows[0])
+
+    def _set_loading(self, loading):
+        if loading != self.loading:
+            self.loading = loading
+            self.loading_changed.emit(loading)
+
+    def reload(self):
+        """Drops the buffer and loads the first page"""
+        self._generation += 1
+        if self.runner is not None:
+            self.runner.cancel(('page', id(self)))
+            self._set_loading(False)
+        self.beginResetModel()
+        self._columns = [[] for _ in self.keys]
+        self._row_count = 0
+        self._cursor = None
+        self._high_water = None
+        self._exhausted = self.page_loader is None
+        self.endResetModel()
+        if self.page_loader is not None:
+            self.fetchMore()
+
+    def refresh_delta(self):
+        """Fetches only rows newer than the high-water mark; falls back to reload when there is none"""
+        if self.delta_loader is None or self._high_water is None:
+            self.reload()
+            return
+        if self.runner is None:
+            self.prepend_rows(self.delta_loader(self._high_water))
+            return
+        generation = self._generation
+        self.runner.submit(
+            ('delta', id(self)), self.delta_loader,
+            lambda rows: self._on_delta(generation, rows),
+            lambda message: print(f"Delta load error: {message}"),
+            self._high_water
+        )
+
+    def _on_delta(self, generation, rows):
+        if generation == self._generation:
+            self.prepend_rows(rows)
+
+    def refresh_tail(self):
+        """For oldest-first grids: resumes paging past the last row to pick up newly added rows"""
+        if self.page_loader is None or self.loading:
+            return
+        self._exhausted = False
+        self.fetchMore()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self.loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or self.loading:
+            return
+        if self.runner is None:
+            self._apply_page(self.page_loader(self._cursor, self.page_size))
+            return
+        generation = self._generation
+        self._set_loading(True)
+        self.runner.submit(
+            ('page', id(self)), self.page_loader,
+            lambda rows: self._on_page(generation, rows),
+            lambda message: self._on_page_error(generation, message),
+            self._cursor, self.page_size
+        )
+
+    def _on_page(self, generation, rows):
+        if generation != self._generation:
+            return
+        self._set_loading(False)
+        self._apply_page(rows)
+
+    def _on_page_error(self, generation, message):
+        if generation != self._generation:
+            return
+        print(f"Page load error: {message}")
+        self._exhausted = True
+        self._set_loading(False)
+
+    def _apply_page(self, rows):
+        rows = rows or []
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if rows:
+            if self._row_count == 0:
+                self._high_water = self.page_key(rows[0])
+            self._cursor = self.page_key(rows[-1])
+            self.append_rows(rows)
@@ -0,0 +1,208 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import wait
+from id_generator import id_timestamp, new_transaction_id
+
+JOURNAL_SUFFIX = '.journal.db'
+DEFAULT_SYNC_BATCH = 200
+DEFAULT_MAX_ATTEMPTS = 10
+
+SyncResult = namedtuple('SyncResult', ['synced', 'failed', 'pending'])
+
+JOURNAL_COLUMNS = (
+    'transaction_id', 'commuter_id', 'route_id', 'vehicle_id',
+    'conductor_id', 'fare_id', 'total_fare', 'transaction_date',
+)
+
+# transaction_id is the idempotency key: replaying a ticket the server already has is a no-op.
+# Only that conflict is absorbed; any other constraint failure is reported and counts as an attempt.
+SYNC_INSERT = f'''
+INSERT INTO transactions ({", ".join(JOURNAL_COLUMNS)})
+VALUES ({", ".join("?" for _ in JOURNAL_COLUMNS)})
+ON CONFLICT (transaction_id) DO NOTHING
+'''
+
+def journal_path(database_name):
+    """Journal file next to a database, named after it, so each database replays only its own tickets"""
+    return os.path.splitext(os.path.abspath(database_name))[0] + JOURNAL_SUFFIX
+
+class TicketJournal:
+    """Device-local, append-only SQLite journal that tickets are written to before the main database.
+
+    record() commits to the local file with synchronous=FULL, so a ticket survives a crash
+    or an outage of the shared database the moment it returns. sync() pushes unsynced tickets
+    in batches and marks them only after the main database has committed them; a crash in
+    between just replays the batch, which ON CONFLICT (transaction_id) DO NOTHING absorbs.
+    """
+
+    def __init__(self, db_manager, path=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.db_manager = db_manager
+        path = path or journal_path(db_manager.database_name)
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = FULL")
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock:
+            self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS tickets (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                transaction_id VARCHAR NOT NULL UNIQUE,
+                commuter_id VARCHAR,
+                route_id INTEGER,
+                vehicle_id VARCHAR,
+                conductor_id VARCHAR,
+                fare_id INTEGER,
+                total_fare REAL NOT NULL,
+                transaction_date TIMESTAMP NOT NULL,
+                synced_at TIMESTAMP,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error VARCHAR
+            )
+            ''')
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_tickets_unsynced ON tickets (seq) WHERE synced_at IS NULL"
+            )
+            self._conn.commit()
+
+    def record(self, commuter_id, route_id, vehicle_id, conductor_id, fare_id, total_fare):
+        """Journals one ticket and returns its transaction_id; raises sqlite3.Error if the local write fails"""
+        transaction_id = new_transaction_id()
+        # Stamped from the id itself, in UTC like datetime('now') on the server, so both orders agree
+        transaction_date = id_timestamp(transaction_id).strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO tickets ({', '.join(JOURNAL_COLUMNS)}) VALUES ({', '.join('?' for _ in JOURNAL_COLUMNS)})",
+                (transaction_id, commuter_id, route_id, vehicle_id, conductor_id, fare_id, total_fare, transaction_date)
+            )
+            self._conn.commit()
+        return transaction_id
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM tickets WHERE synced_at IS NULL AND attempts < ?", (self.max_attempts,)
+            ).fetchone()[0]
+
+    def failed(self):
+        """Tickets the main database rejected max_attempts times; they stay journaled for review"""
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(
+                "SELECT * FROM tickets WHERE synced_at IS NULL AND attempts >= ? ORDER BY seq", (self.max_attempts,)
+            )]
+
+    def _unsynced(self, after, limit):
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT seq, {', '.join(JOURNAL_COLUMNS)} FROM tickets "
+                "WHERE synced_at IS NULL AND attempts < ? AND seq > ? ORDER BY seq LIMIT ?",
+                (self.max_attempts, after, limit)
+            ).fetchall()
+
+    def _push(self, rows):
+        """Per-row outcome (None or the sqlite3 error) of inserting rows into transactions"""
+        params = [tuple(row[name] for name in JOURNAL_COLUMNS) for row in rows]
+        queue = self.db_manager.write_queue
+        if queue.is_running():
+            # The queue commits the batch as one group and isolates a bad row behind its own savepoint
+            futures = [queue.submit(SYNC_INSERT, p) for p in params]
+            wait(futures)
+            return [f.exception() for f in futures]
+        outcomes = []
+        with self.db_manager.write_connection() as conn:
+            for p in params:
+                try:
+                    conn.execute(SYNC_INSERT, p)
+                    conn.commit()
+                    outcomes.append(None)
+                except sqlite3.Error as e:
+                    conn.rollback()
+                    outcomes.append(e)
+        return outcomes
+
+    def sync(self, batch_size=DEFAULT_SYNC_BATCH):
+        """Pushes unsynced tickets to the main database; safe to call from any thread.
+
+        Only constraint failures count against a ticket's attempts. Busy or unreachable
+        databases end the run and leave everything pending for the next one.
+        """
+        synced = failed = 0
+        with self._sync_lock:
+            if not self.db_manager.ensure_connection():
+                return SyncResult(0, 0, self.pending_count())
+            after = 0
+            while True:
+                rows = self._unsynced(after, batch_size)
+                if not rows:
+                    break
+                outcomes = self._push(rows)
+                now = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+                done = [(now, row['seq']) for row, error in zip(rows, outcomes) if error is None]
+                rejected = [(str(error), row['seq']) for row, error in zip(rows, outcomes)
+                            if isinstance(error, sqlite3.IntegrityError)]
+                with self._lock:
+                    self._conn.executemany("UPDATE tickets SET synced_at = ? WHERE seq = ?", done)
+                    self._conn.executemany(
+                        "UPDATE tickets SET attempts = attempts + 1, last_error = ? WHERE seq = ?", rejected
+                    )
+                    self._conn.commit()
+                synced += len(done)
+                failed += len(rejected)
+                if len(done) + len(rejected) < len(rows):
+                    break
+                after = rows[-1]['seq']
+        if synced:
+            self.db_manager.invalidate_cache('transactions')
+            self.db_manager.prune_change_log()
+        return SyncResult(synced, failed, self.pending_count())
+
+    def prune(self, keep_days=7):
+        """Drops synced tickets older than keep_days; unsynced ones are never removed"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM tickets WHERE synced_at IS NOT NULL AND synced_at < datetime('now', ?)",
+                (f"-{int(keep_days)} days",)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def main(argv=None):
+    from database_manager import DatabaseManager, DATABASE_NAME
+    parser = argparse.ArgumentParser(description="Replay journaled tickets into the main database.")
+    parser.add_argument('--database', default=DATABASE_NAME)
+    parser.add_argument('--journal', default=None, help=f"defaults to <database>{JOURNAL_SUFFIX} next to the database")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_SYNC_BATCH)
+    parser.add_argument('--prune-days', type=int, default=None, help="also drop synced tickets older than this")
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager()
+    if not db.use_database(args.database):
+        raise SystemExit(f"Could not open {args.database}")
+    journal = TicketJournal(db, args.journal)
+    started = time.perf_counter()
+    result = journal.sync(args.batch_size)
+    print(f"Synced {result.synced} tickets, {result.failed} failed, {result.pending} pending "
+          f"({time.perf_counter() - started:.2f}s)")
+    for ticket in journal.failed():
+        print(f"  gave up on {ticket['transaction_id']}: {ticket['last_error']}")
+    if args.prune_days is not None:
+        print(f"Pruned {journal.prune(args.prune_days)} synced tickets")
+    journal.close()
+    db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import traceback
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+class JobSignals(QObject):
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(object, str)
+
+class Job(QRunnable):
+    """Runs func(*args, **kwargs) on a pool thread; results come back through signals"""
+
+    def __init__(self, key, func, *args, **kwargs):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.key = key
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = JobSignals()
+        self.started = False
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        self.started = True
+        if self.cancelled:
+            return
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            if not self.cancelled:
+                traceback.print_exc()
+                self.signals.failed.emit(self, str(e))
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(self, result)
+
+class JobRunner(QObject):
+    """Schedules panel data loads off the GUI thread.
+
+    Jobs are keyed: submitting a key that is still queued replaces that job (function,
+    arguments and callbacks), and submitting a key that is already running queues exactly
+    one rerun with the newest ones, so bursts of refreshes collapse into at most two loads.
+    A run superseded by a pending rerun delivers nothing, result or error: its arguments
+    (a page cursor, say) are older than the rerun's, so only the rerun's outcome reaches
+    the callbacks. DatabaseManager hands each pool thread its own reader connection.
+    """
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self._jobs = {}
+
+    def submit(self, key, func, on_result=None, on_error=None, *args, **kwargs):
+        entry = self._jobs.get(key)
+        if entry is not None:
+            queued = entry['job']
+            if not queued.started and self.pool.tryTake(queued):
+                # Never started: drop it so the new arguments run instead of the stale ones
+                queued.cancel()
+                del self._jobs[key]
+            else:
+                entry['on_result'] = on_result
+                entry['on_error'] = on_error
+                entry['rerun'] = (func, args, kwargs)
+                return queued
+        job = Job(key, func, *args, **kwargs)
+        job.signals.finished.connect(self._on_finished)
+        job.signals.failed.connect(self._on_failed)
+        self._jobs[key] = {'job': job, 'on_result': on_result, 'on_error': on_error, 'rerun': None}
+        self.pool.start(job)
+        return job
+
+    def is_running(self, key):
+        return key in self._jobs
+
+    def cancel(self, key):
+        entry = self._jobs.pop(key, None)
+        if entry is None:
+            return False
+        job = entry['job']
+        job.cancel()
+        if not job.started:
+            self.pool.tryTake(job)
+        return True
+
+    def cancel_all(self):
+        for key in list(self._jobs):
+            self.cancel(key)
+
+    def _complete(self, job):
+        entry = self._jobs.get(job.key)
+        if entry is None or entry['job'] is not job:
+            return None
+        del self._jobs[job.key]
+        if entry['rerun'] is not None:
+            # Superseded: this run's outcome is dropped and the rerun's is delivered instead
+            func, args, kwargs = entry['rerun']
+            self.submit(job.key, func, entry['on_result'], entry['on_error'], *args, **kwargs)
+            return None
+        return entry
+
+    def _on_finished(self, job, result):
+        entry = self._complete(job)
+        if entry is not None and entry['on_result'] is not None:
+            entry['on_result'](result)
+
+    def _on_failed(self, job, message):
+        entry = self._complete(job)
+        if entry is not None and entry['on_error'] is not None:
+            entry['on_error'](message)
@@ -0,0 +1,252 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from query_cache import written_table
+from query_stats import is_busy_error
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_LATENCY = 0.002
+DEFAULT_MAX_DEPTH = 10000
+DEFAULT_BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.05
+
+WriteResult = namedtuple('WriteResult', ['lastrowid', 'rowcount'])
+
+class WriteQueueFull(sqlite3.OperationalError):
+    pass
+
+class _WriteRequest:
+    __slots__ = ('sql', 'params', 'future', 'enqueued_at')
+
+    def __init__(self, sql, params):
+        self.sql = sql
+        self.params = params
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+class WriteQueue:
+    """Funnels single-statement writes through one thread that commits them in groups.
+
+    Each group runs in one BEGIN IMMEDIATE transaction with a savepoint per statement, so a
+    failing statement only fails its own future while the rest of the group still commits,
+    and the whole group pays for one fsync. The thread commits as soon as the queue is empty;
+    it lingers up to max_latency for more statements only when requests are already queuing
+    up behind each other, so a lone writer is never delayed.
+    """
+
+    def __init__(self, db_manager, max_batch=DEFAULT_MAX_BATCH, max_latency=DEFAULT_MAX_LATENCY,
+                 max_depth=DEFAULT_MAX_DEPTH, busy_retries=DEFAULT_BUSY_RETRIES):
+        self.db_manager = db_manager
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.max_depth = max_depth
+        self.busy_retries = busy_retries
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._metrics = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self._metrics = {
+                'submitted': 0, 'committed': 0, 'failed': 0, 'rejected': 0,
+                'batches': 0, 'busy_retries': 0, 'max_batch_seen': 0, 'max_depth_seen': 0,
+                'commit_ms': 0.0, 'max_commit_ms': 0.0, 'wait_ms': 0.0,
+            }
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+        self._thread.start()
+
+    def submit(self, sql, params=()):
+        """Queues one statement; the Future resolves to a WriteResult or raises its sqlite3 error"""
+        request = _WriteRequest(sql, params or ())
+        with self._lock:
+            depth = self._queue.qsize()
+            if self._stopping.is_set() or not self.is_running():
+                request.future.set_exception(sqlite3.ProgrammingError("Write queue is not running"))
+                return request.future
+            if depth >= self.max_depth:
+                self._metrics['rejected'] += 1
+                request.future.set_exception(WriteQueueFull(f"Write queue is full ({depth} pending)"))
+                return request.future
+            self._metrics['submitted'] += 1
+            self._metrics['max_depth_seen'] = max(self._metrics['max_depth_seen'], depth + 1)
+            self._in_flight += 1
+            self._queue.put(request)
+        return request.future
+
+    def execute(self, sql, params=(), timeout=None):
+        """Blocking submit; returns the WriteResult"""
+        return self.submit(sql, params).result(timeout)
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def flush(self, timeout=None):
+        """Waits until every statement submitted so far has been committed or failed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def stop(self, drain=True, timeout=None):
+        """Stops the writer thread, committing what is queued first unless drain is False"""
+        if self._thread is None:
+            return
+        if drain:
+            self.flush(timeout)
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._finish([request], [sqlite3.ProgrammingError("Write queue stopped")])
+
+    def _collect(self):
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        lingering = False
+        deadline = first.enqueued_at + self.max_latency
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                lingering = True
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if not lingering or remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect()
+            if batch:
+                self._write_batch(batch)
+
+    def _begin(self, conn):
+        for attempt in range(self.busy_retries + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if not is_busy_error(e) or attempt == self.busy_retries:
+                    raise
+                with self._lock:
+                    self._metrics['busy_retries'] += 1
+                time.sleep(BUSY_BACKOFF * (attempt + 1))
+
+    def _write_batch(self, batch):
+        outcomes = [None] * len(batch)
+        stats = self.db_manager.stats
+        started = time.perf_counter()
+        try:
+            with self.db_manager.write_connection() as conn:
+                if conn.in_transaction:
+                    # A commit=False write left an implicit transaction open; the next direct
+                    # write would have committed it too, and BEGIN IMMEDIATE needs it closed
+                    conn.commit()
+                self._begin(conn)
+                try:
+                    for i, request in enumerate(batch):
+                        statement_started = time.perf_counter()
+                        conn.execute("SAVEPOINT queued_write")
+                        try:
+                            cursor = conn.execute(request.sql, request.params)
+                            conn.execute("RELEASE queued_write")
+                            outcomes[i] = WriteResult(cursor.lastrowid, cursor.rowcount)
+                            stats.record(request.sql, time.perf_counter() - statement_started,
+                                         rows=max(cursor.rowcount, 0))
+                        except sqlite3.Error as e:
+                            conn.execute("ROLLBACK TO queued_write")
+                            conn.execute("RELEASE queued_write")
+                            outcomes[i] = e
+                            stats.record(request.sql, time.perf_counter() - statement_started, error=e)
+                    conn.commit()
+                except sqlite3.Error:
+                    conn.rollback()
+                    raise
+        except sqlite3.Error as e:
+            print(f"Write queue commit error: {e}")
+            outcomes = [e] * len(batch)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        self._invalidate(batch, outcomes)
+        with self._lock:
+            self._metrics['batches'] += 1
+            self._metrics['max_batch_seen'] = max(self._metrics['max_batch_seen'], len(batch))
+            self._metrics['commit_ms'] += elapsed_ms
+            self._metrics['max_commit_ms'] = max(self._metrics['max_commit_ms'], elapsed_ms)
+            self._metrics['wait_ms'] += sum(started - request.enqueued_at for request in batch) * 1000.0
+        self._finish(batch, outcomes)
+
+    def _invalidate(self, batch, outcomes):
+        tables = set()
+        for request, outcome in zip(batch, outcomes):
+            if isinstance(outcome, WriteResult):
+                table = written_table(request.sql)
+                if table is None:
+                    self.db_manager.query_cache.clear()
+                    return
+                tables.add(table)
+        if tables:
+            self.db_manager.query_cache.invalidate_tables(tables)
+
+    def _finish(self, batch, outcomes):
+        failed = 0
+        for request, outcome in zip(batch, outcomes):
+            if isinstance(outcome, Exception):
+                failed += 1
+                request.future.set_exception(outcome)
+            else:
+                request.future.set_result(outcome)
+        with self._idle:
+            self._metrics['committed'] += len(batch) - failed
+            self._metrics['failed'] += failed
+            self._in_flight -= len(batch)
+            self._idle.notify_all()
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            batches = metrics['batches']
+            done = metrics['committed'] + metrics['failed']
+            metrics.update(
+                depth=self._queue.qsize(),
+                in_flight=self._in_flight,
+                mean_batch=round(done / batches, 2) if batches else 0.0,
+                mean_commit_ms=round(metrics['commit_ms'] / batches, 3) if batches else 0.0,
+                mean_wait_ms=round(metrics['wait_ms'] / done, 3) if done else 0.0,
+                commit_ms=round(metrics['commit_ms'], 3),
+                max_commit_ms=round(metrics['max_commit_ms'], 3),
+                wait_ms=round(metrics['wait_ms'], 3),
+            )
+            return metrics